@@ -5,6 +5,52 @@ from datetime import datetime
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/system-admin')
 
+ADMIN_PAGE_SIZE = 50  # Users per admin dashboard page (keyset-paginated, newest first)
+
+
+def admin_user_page(after_id=None, limit=ADMIN_PAGE_SIZE):
+    """
+    One page of users, newest first, with per-user aggregates in one query.
+
+    Keyset pagination on users.id: the page ids are picked by index first,
+    then only those rows are joined to their stores and plans.
+    Returns (rows, next_after_id).
+    """
+    from datetime import timezone
+    from sqlalchemy import and_, case, distinct, func, select
+    from models import SubscriptionPlan
+
+    page_ids = select(User.id).order_by(User.id.desc()).limit(limit + 1)
+    if after_id:
+        page_ids = page_ids.where(User.id < after_id)
+    page_ids = page_ids.subquery()
+
+    now = datetime.now(timezone.utc)
+    status = case(
+        (User.is_subscribed == True, "active"),
+        (and_(User.trial_started_at.isnot(None), User.trial_ends_at > now), "trial"),
+        else_="expired",
+    )
+    stmt = (
+        select(
+            User.id, User.email, User.is_subscribed, User.trial_ends_at, User.created_at,
+            status.label("status"),
+            func.count(distinct(ShopifyStore.id)).label("stores"),
+            func.count(distinct(ShopifyStore.id)).filter(ShopifyStore.is_active == True).label("active_stores"),
+            func.max(SubscriptionPlan.plan_type).filter(SubscriptionPlan.status == "active").label("plan"),
+        )
+        .join(page_ids, page_ids.c.id == User.id)
+        .outerjoin(ShopifyStore, ShopifyStore.user_id == User.id)
+        .outerjoin(SubscriptionPlan, SubscriptionPlan.user_id == User.id)
+        .group_by(User.id)
+        .order_by(User.id.desc())
+    )
+    rows = db.session.execute(stmt).mappings().all()
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1]["id"]
+    return rows, None
+
+
 def safe_call(obj, method_name, default=False):
     """Safely call a method on an object"""
     try:
@@ -354,6 +400,7 @@ ADMIN_DASHBOARD_HTML = '''
                         <th>Subscription</th>
                         <th>Status</th>
                         <th>Trial Info</th>
+                        <th>Stores</th>
                         <th>Joined</th>
                         <th style="text-align: right;">Actions</th>
                     </tr>
@@ -369,16 +416,16 @@ ADMIN_DASHBOARD_HTML = '''
                             {% if user.is_subscribed %}
                             <span class="badge badge-success">
                                 <svg width="10" height="10" viewBox="0 0 256 256" fill="currentColor"><path d="M229.66,55.51a8,8,0,0,0-11.32.79L94.55,183.76,37.66,131a8,8,0,0,0-10.89,11.75l62.43,58a8,8,0,0,0,11.37-.53L230.45,66.84A8,8,0,0,0,229.66,55.51Z"></path></svg>
-                                Pro Plan
+                                {{ user.plan|title if user.plan else 'Pro' }} Plan
                             </span>
                             {% else %}
                             <span style="color: #6d7175; font-size: 13px;">Free Plan</span>
                             {% endif %}
                         </td>
                         <td>
-                            {% if user.is_subscribed %}
+                            {% if user.status == 'active' %}
                             <span class="badge badge-success">Active</span>
-                            {% elif safe_call(user, 'is_trial_active') %}
+                            {% elif user.status == 'trial' %}
                             <span class="badge badge-warning">Trial</span>
                             {% else %}
                             <span class="badge badge-error">Expired</span>
@@ -387,7 +434,7 @@ ADMIN_DASHBOARD_HTML = '''
                         <td>
                             {% if user.trial_ends_at %}
                                 <div style="font-size: 13px;">{{ user.trial_ends_at.strftime('%b %d') }}</div>
-                                {% if safe_call(user, 'is_trial_active') %}
+                                {% if user.status == 'trial' %}
                                 <div style="font-size: 11px; color: #d97706;">Ends soon</div>
                                 {% else %}
                                 <div style="font-size: 11px; color: #991b1b;">Ended</div>
@@ -396,6 +443,7 @@ ADMIN_DASHBOARD_HTML = '''
                                 <span style="color: #9ca3af;">-</span>
                             {% endif %}
                         </td>
+                        <td>{{ user.active_stores }}{% if user.stores > user.active_stores %} <span style="color: #9ca3af;">/ {{ user.stores }}</span>{% endif %}</td>
                         <td>{{ user.created_at.strftime('%b %d, %Y') }}</td>
                         <td style="text-align: right;">
                             <form method="POST" action="{{ url_for('admin.delete_user', user_id=user.id) }}" style="display:inline;" onsubmit="return confirm('Permanently delete {{ user.email }} and all associated data? This cannot be undone.')">
@@ -406,6 +454,12 @@ ADMIN_DASHBOARD_HTML = '''
                     {% endfor %}
                 </tbody>
             </table>
+            {% if after_id or next_after %}
+            <div style="display: flex; justify-content: space-between; padding: 16px 20px; font-size: 13px;">
+                {% if after_id %}<a href="{{ url_for('admin.dashboard') }}">&larr; Newest</a>{% else %}<span></span>{% endif %}
+                {% if next_after %}<a href="{{ url_for('admin.dashboard', after=next_after) }}">Older &rarr;</a>{% endif %}
+            </div>
+            {% endif %}
         </div>
     </div>
 </body>
@@ -450,35 +504,22 @@ def dashboard():
             return redirect(url_for('admin.login'))
         
         try:
-            users = User.query.all()
-            total_users = len(users)
-            
-            # Safe attribute checking
-            subscribed_users = 0
-            trial_users = 0
-            
-            for user in users:
-                # Check subscription status safely
-                if hasattr(user, 'is_subscribed'):
-                    try:
-                        if user.is_subscribed:
-                            subscribed_users += 1
-                    except:
-                        pass
-                
-                # Check trial status safely
-                if hasattr(user, 'is_trial_active'):
-                    try:
-                        if callable(user.is_trial_active) and user.is_trial_active():
-                            trial_users += 1
-                    except:
-                        pass
-            
-            total_stores = ShopifyStore.query.filter_by(is_active=True).count()
+            after_id = request.args.get('after', type=int)
+            users, next_after = admin_user_page(after_id)
+
+            from success_metrics import track_conversion_metrics
+            metrics = track_conversion_metrics()
+            if "error" in metrics:
+                raise RuntimeError(metrics["error"])
+            total_users = metrics["total_users"]
+            subscribed_users = metrics["paid_users"]
+            trial_users = metrics["trial_users"]
+            total_stores = metrics["active_stores"]
             
         except Exception as db_error:
             current_app.logger.error(f"Database query error in admin dashboard: {db_error}")
             users = []
+            after_id = next_after = None
             total_users = 0
             subscribed_users = 0
             trial_users = 0
@@ -491,6 +532,8 @@ def dashboard():
             'subscribed_users': subscribed_users,
             'trial_users': trial_users,
             'total_stores': total_stores,
+            'after_id': after_id,
+            'next_after': next_after,
             'url_for': url_for,
             'safe_call': safe_call
         }
@@ -500,6 +543,21 @@ def dashboard():
         current_app.logger.error(f"Admin dashboard error: {str(e)}")
         return f"Admin dashboard error: {str(e)}", 500
 
+@admin_bp.route('/sql-stats')
+def sql_stats():
+    """Per-endpoint/task query counts, DB time and N+1 suspects for this worker"""
+    from flask import jsonify
+    from core import sql_profile
+
+    if not os.getenv('ADMIN_PASSWORD'):
+        return jsonify({"error": "Admin access is disabled"}), 403
+    if not session.get('admin_logged_in'):
+        return jsonify({"error": "Admin login required"}), 401
+
+    if request.args.get('reset') == '1':
+        sql_profile.reset()
+    return jsonify(sql_profile.snapshot())
+
 @admin_bp.route('/delete-user/<int:user_id>', methods=['POST'])
 def delete_user(user_id):
     """Delete a user and their associated data"""
@@ -13,6 +13,26 @@ from datetime import timedelta
 from flask import Flask, request, jsonify, g, session, redirect, url_for, render_template_string, current_app, render_template, send_from_directory, make_response, Response
 from werkzeug.middleware.proxy_fix import ProxyFix
 from models import db, User, ShopifyStore
+from core.middleware import (
+    APP_ROUTES, ROUTE_HEALTH, ROUTE_STATIC, TRAFFIC_ROUTES, MiddlewarePipeline,
+)
+from core import request_log
+from core.startup_profile import phase
+
+
+def _fix_database_url(database_url):
+    """Normalize a DATABASE_URL-style string for SQLAlchemy 2.0 on Render/Neon"""
+    # [ZOMBIE FIX] Aggressive replacement for SQLAlchemy 2.0 Compatibility
+    if database_url:
+        database_url = database_url.replace("postgres://", "postgresql://")
+
+    # [INFRASTRUCTURE FIX] Enforce SSL for Neon/Render (Fixes Connection Timeout)
+    if database_url and "postgresql://" in database_url and "sslmode" not in database_url:
+        if "?" in database_url:
+            database_url += "&sslmode=require"
+        else:
+            database_url += "?sslmode=require"
+    return database_url
 
 
 def create_app():
@@ -39,10 +59,22 @@ def create_app():
         """Derived from the Core, this is the absolute source of truth."""
         return Response("OK", status=200, mimetype='text/plain')
 
+    # Readiness (core.warmup): 503 until this worker has warmed up, so the
+    # platform only routes traffic to warm workers. /health stays liveness.
+    @app.route('/ready')
+    def readiness_check():
+        from core.warmup import readiness
+        payload, status = readiness()
+        return jsonify(payload), status
+
+    # [PIPELINE] One ordered middleware chain instead of stacked hooks.
+    # Stages are defined below and wired up, in execution order, at the end
+    # of create_app(); every stage shows up in the Server-Timing header.
+    middleware = MiddlewarePipeline(app)
+
     # [NUCLEAR BYPASS] Hard-Code 200 OK for Health/Head
-    # Intercepts request BEFORE any other middleware runs
-    @app.before_request
-    def kickstart():
+    # First stage of the chain, before any other middleware runs
+    def kickstart(ctx):
         """The 'Ghost' Bypass: Force 200 OK for health/head checks."""
         if request.path == '/health' or (request.method == 'HEAD' and request.path == '/'):
             return Response("OK", status=200, mimetype='text/plain')
@@ -60,21 +92,19 @@ def create_app():
 
     app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1)
 
+    # Load shedding in front of everything: reserves worker slots for webhooks/health
+    from core.admission import init_admission
+    init_admission(app)
+
     # [DEEP STACK] Force raw exception visibility in Render logs
     app.config['PROPAGATE_EXCEPTIONS'] = True
 
     # [ANTI-STALL] CRITICAL: Fix Database URL Protocol + Disable Blocking Migrations
-    database_url = os.getenv("DATABASE_URL", "sqlite:///app.db")
-    # [ZOMBIE FIX] Aggressive replacement for SQLAlchemy 2.0 Compatibility
-    if database_url:
-        database_url = database_url.replace("postgres://", "postgresql://")
-    
-    # [INFRASTRUCTURE FIX] Enforce SSL for Neon/Render (Fixes Connection Timeout)
-    if database_url and "postgresql://" in database_url and "sslmode" not in database_url:
-        if "?" in database_url:
-            database_url += "&sslmode=require"
-        else:
-            database_url += "?sslmode=require"
+    database_url = _fix_database_url(os.getenv("DATABASE_URL", "sqlite:///app.db"))
+
+    # Optional read replicas (core/db_routing.py): plain reads go to these binds
+    from core.db_routing import replica_binds
+    replicas = replica_binds(os.getenv("DATABASE_REPLICA_URLS", ""), _fix_database_url)
 
     # Enhanced config
     app.config.update(
@@ -85,12 +115,14 @@ def create_app():
             "SHOPIFY_API_KEY": os.getenv("SHOPIFY_API_KEY", ""),
             "SHOPIFY_API_SECRET": os.getenv("SHOPIFY_API_SECRET", ""),
             "SQLALCHEMY_DATABASE_URI": database_url,
+            "SQLALCHEMY_BINDS": replicas,
             "SQLALCHEMY_TRACK_MODIFICATIONS": False,
             "SQLALCHEMY_ENGINE_OPTIONS": os.getenv(
                 "SQLALCHEMY_ENGINE_OPTIONS", # Allow override
                 {
                     # [LAUNCH TIER] Optimized for Production (Neon Launch + Render Starter)
-                    "pool_size": 10,     # Standard production pool
+                    # Standard production pool; >= GUNICORN_THREADS so gthread workers never queue on it
+                    "pool_size": int(os.getenv("DB_POOL_SIZE", max(10, int(os.getenv("GUNICORN_THREADS", "8"))))),
                     "max_overflow": 5,   # Allow spike buffer
                     "pool_timeout": 30,  # Fail fast on cold start
                     "pool_recycle": 280, # Beat the Neon 300s reaper
@@ -112,13 +144,17 @@ def create_app():
             "SESSION_COOKIE_NAME": "__Host-session",
             "PERMANENT_SESSION_LIFETIME": timedelta(days=7),
             
-            # [ANTI-STALL] DISABLE SERVER-SIDE SESSIONS (Redis/DB)
-            # We use strictly client-side signed cookies + Stateless JWT
-            "SESSION_TYPE": None, 
+            # Server-side sessions in Redis (redis_session.py); the cookie is an
+            # opaque id and falls back to signed cookies while Redis is down.
+            # SESSION_TYPE=cookie keeps client-side signed cookies only.
+            "SESSION_TYPE": os.getenv("SESSION_TYPE", "redis"),
+            "SESSION_REFRESH_EACH_REQUEST": False,  # Never re-emit an unchanged session cookie
             "SESSION_PERMANENT": True,
             "SESSION_USE_SIGNER": True,
             "SESSION_KEY_PREFIX": "missioncontrol:session:",
             "SEND_FILE_MAX_AGE_DEFAULT": 31536000,
+            # Per-stage middleware timings in the Server-Timing response header
+            "SERVER_TIMING": os.getenv("SERVER_TIMING", "on").lower() != "off",
         }
     )
 
@@ -126,12 +162,18 @@ def create_app():
     try:
         from models import db
 
-        db.init_app(app)
+        with phase("db.init_app"):
+            db.init_app(app)
 
-        # [ANTI-STALL] Auto-migration check REMOVED. 
-        # User Order: "Go to Render Shell and run flask db upgrade manually"
-        # The previous logic was causing app factory to hang on bad DB connection.
-        app.logger.info("🚀 App Factory: Database initialized. Migration check skipped (ANTI-STALL).")
+        # [ANTI-STALL] Boot reads the one schema_version row; pending migrations
+        # run once per deploy under an advisory lock. MIGRATE_ON_BOOT=off skips it.
+        from migrations import migrate_on_boot
+
+        with phase("migrations"):
+            schema_version = migrate_on_boot(app)
+        app.logger.info(f"🚀 App Factory: Database initialized. Schema version {schema_version}.")
+        if replicas:
+            app.logger.info(f"🚀 App Factory: {len(replicas)} read replica(s) - reads routed off the primary")
 
     except ImportError:
         # Fallback database initialization
@@ -140,7 +182,9 @@ def create_app():
         db = SQLAlchemy()
         db.init_app(app)
 
-    # KILLED SERVER SESSIONS: Verified None above.
+    if app.config.get("SESSION_TYPE") == "redis":
+        from redis_session import init_redis_sessions
+        init_redis_sessions(app)
 
     # Initialize login manager
     try:
@@ -298,25 +342,16 @@ def create_app():
     # ============================================================================
     # TITAN MONITORING: Global Observer Layer
     # ============================================================================
-    @app.before_request
-    def titan_observer_before():
+    def titan_observer_before(ctx):
         """TITAN: Record start time and log incoming request"""
-        # [SURVIVAL MODE] FAST EXIT for Health Check
-        if request.path.startswith('/health'):
-            return None
-
         try:
-            # 1. Total Isolation: Skip if endpoint is None (Health/Static)
+            # 1. Total Isolation: Skip if endpoint is None (Health/Static never reach this stage)
             if not request.endpoint:
                 return None
 
-            # Generate unique request ID for log correlation
+            # Generate unique request ID for log correlation (shared with the after stage)
             from unified_error_boundary import generate_request_id
-            request_id = generate_request_id()
-            
-            # FAST TRACK: Bypass heavy logging for static files
-            if request.path.startswith('/static/') or request.path.endswith('.ico'):
-                return None
+            request_id = ctx.request_id = g.request_id = generate_request_id()
             
             # Filter Render/UptimeRobot User Agents
             user_agent = request.headers.get('User-Agent', '')
@@ -331,10 +366,9 @@ def create_app():
             g.titan_start_time = time.time()
             client_ip = request.headers.get('X-Forwarded-For', request.remote_addr)
             
-            # INFO level for normal requests
-            app.logger.info(
-                f"TITAN [HIT] [{request_id}] {request.method} {request.path} | IP: {client_ip} | Referer: {request.referrer}"
-            )
+            # Structured, sampled by request_id (its out line makes the same call)
+            request_log.log_hit(ctx.route_class, request_id, request.method, request.path,
+                                ip=client_ip, referer=request.referrer)
         except Exception as e:
             # [SUBMISSIVE] Never crash the request
             print(f"Titan Observer Before Error: {e}", file=sys.stderr)
@@ -349,13 +383,8 @@ def create_app():
                 
             return None
 
-    @app.after_request
-    def titan_observer_after(response):
+    def titan_observer_after(ctx, response):
         """TITAN: Calculate latency and log response status"""
-        # [SURVIVAL MODE] FAST EXIT for Health Check
-        if request.path.startswith('/health'):
-            return response
-
         try:
             # [SUBMISSIVE] 1. Ghost Bypass: If DB is dead, Titan is dead.
             # We access db.engine safely via current_app if possible, or just skip complexity
@@ -369,58 +398,25 @@ def create_app():
             if not hasattr(g, 'titan_start_time'):
                 return response
 
-            from unified_error_boundary import generate_request_id
-            # Use existing ID or generate new on fly
-            request_id = getattr(g, 'request_id', generate_request_id())
+            # Reuse the ID minted by titan_observer_before
+            request_id = ctx.request_id or g.get('request_id', 'NONE')
             
             latency = time.time() - g.titan_start_time
             latency_ms = int(latency * 1000)
             
             # Metadata enrichment
-            shop = getattr(g, 'shop_domain', request.args.get('shop', 'NONE'))
-            user_id = getattr(g, 'user_id', 'NONE')
-            
-            # [TITAN SILENCE] Pure "Ghost" Mode for Server Errors
-            if response.status_code >= 500:
-                # If the ship is sinking, don't ask the captain for a status report.
-                # Just return the error page and keep the logs clean of noise.
-                return response
-            
-            # [ZOMBIE FIX] Anonymous Titan Guard
-            # If we don't know who the user is, DO NOT LOG to DB/CloudWatch/etc.
-            # This prevents 3.7s timeouts on the landing page for unauthenticated users.
-            if not g.get('current_user') and user_id == 'NONE':
-                # Reset smoke detector on successful "ignore"
-                current_app.titan_failures = 0 
-                return response
+            shop = ctx.shop or g.get('shop_domain') or request.args.get('shop')
+            user = g.get('current_user')
+            user_id = g.get('user_id') or getattr(user, 'id', None)
 
-            status_code = response.status_code
-            
             # [PASSIVE AUTONOMY] Titan Success - Reset Smoke Detector
             current_app.titan_failures = 0
-            
-            # Log level classification
-            if status_code >= 500:
-                # CRITICAL: Server errors
-                app.logger.critical(
-                    f"TITAN [OUT] [{request_id}] {request.method} {request.path} | "
-                    f"Status: {status_code} | Latency: {latency_ms}ms | "
-                    f"User: {user_id} | Shop: {shop}"
-                )
-            elif status_code >= 400:
-                # WARNING: Client errors
-                app.logger.warning(
-                    f"TITAN [OUT] [{request_id}] {request.method} {request.path} | "
-                    f"Status: {status_code} | Latency: {latency_ms}ms | "
-                    f"User: {user_id} | Shop: {shop}"
-                )
-            else:
-                # INFO: Success
-                app.logger.info(
-                    f"TITAN [OUT] [{request_id}] {request.method} {request.path} | "
-                    f"Status: {status_code} | Latency: {latency_ms}ms | "
-                    f"User: {user_id} | Shop: {shop}"
-                )
+
+            # Errors and slow requests always, successes sampled per route class.
+            # Logging only enqueues (logging_config), so 5xx and anonymous
+            # traffic no longer need the old silence guards.
+            request_log.log_out(ctx.route_class, request_id, request.method, request.path,
+                                response.status_code, latency_ms, shop=shop, user_id=user_id)
         except Exception as e:
             # [SUBMISSIVE] Never crash the response
             print(f"Titan Observer After Error: {e}", file=sys.stderr)
@@ -495,16 +491,18 @@ def create_app():
             "success": False
         }), 500
 
-    @app.after_request
-    def audit_and_enforce_bridge(response):
+    # AUDIT THE COOKIES (Detects the 403 Risk) - config is fixed per process,
+    # so audit it once here instead of on every response
+    if not app.config.get('SESSION_COOKIE_SECURE'):
+        app.logger.error("AUDIT FAILURE: SESSION_COOKIE_SECURE is False. 403s imminent.")
+    if app.config.get('SESSION_COOKIE_SAMESITE') != 'None':
+        app.logger.error("AUDIT FAILURE: SAMESITE is not 'None'. Handshake will fail.")
+
+    def audit_and_enforce_bridge(ctx, response):
         """
         Acts as the 'Internal Auditor' for the $10k/day engine.
         Ensures Shopify never cuts off the connection.
         """
-        # [SURVIVAL MODE] Skip for health check
-        if request.path.startswith('/health'):
-            return response
-            
         # 1. ENFORCE THE BRIDGE (Fixes the White Screen)
         # This ensures the 'frame-ancestors' policy is ALWAYS sent
         if "Content-Security-Policy" not in response.headers:
@@ -514,15 +512,7 @@ def create_app():
                 "connect-src 'self' https://admin.shopify.com https://*.myshopify.com https://monorail-edge.shopifysvc.com https://www.google-analytics.com;"
             )
 
-        # 2. AUDIT THE COOKIES (Detects the 403 Risk)
-        # If the app is in production but flags are missing, log a critical error
-        if not app.config.get('SESSION_COOKIE_SECURE'):
-            app.logger.error("AUDIT FAILURE: SESSION_COOKIE_SECURE is False. 403s imminent.")
-            
-        if app.config.get('SESSION_COOKIE_SAMESITE') != 'None':
-            app.logger.error("AUDIT FAILURE: SAMESITE is not 'None'. Handshake will fail.")
-
-        # 3. LEGACY SUPPORT (For older browsers)
+        # 2. LEGACY SUPPORT (For older browsers)
         response.headers['X-Frame-Options'] = 'ALLOW-FROM https://admin.shopify.com'
         response.headers['X-Content-Type-Options'] = 'nosniff'
 
@@ -535,6 +525,11 @@ def create_app():
     # TITAN: Last Breath Signal Handler
     def titan_last_breath(sig, frame):
         app.logger.info(f"TITAN [SIGNAL] Process {os.getpid()} received {sig}. Taking last breath... Reap confirmed.")
+        try:
+            from logging_config import flush_logging
+            flush_logging()  # Write out whatever is still queued before exiting
+        except Exception:
+            pass
         sys.exit(0)
 
     signal.signal(signal.SIGTERM, titan_last_breath)
@@ -596,7 +591,8 @@ def create_app():
 
     for module_name, blueprint_name in blueprints_to_register:
         try:
-            module = __import__(module_name)
+            with phase(f"blueprint {module_name}"):
+                module = __import__(module_name)
             blueprint = getattr(module, blueprint_name)
 
             app.register_blueprint(blueprint)
@@ -720,23 +716,17 @@ def create_app():
     # ============================================================================
     # LEVEL 100 IDENTITY MIDDLEWARE (Stateless JWT / Context Extraction)
     # ============================================================================
-    # Global 5-minute cache for shop identity (shop_domain -> (user_id, store_id, is_active, expiry))
-    app._shop_identity_cache = {}
-    @app.before_request
-    def extract_identity_context():
+    # Shop identity is cached in identity_cache (per-worker TTL-LRU backed by Redis)
+    def extract_identity_context(ctx):
         """
         Global middleware to extract identity from JWT (Authorization: Bearer <token>)
         or Shopify Headers/Params. Populates request.shop_domain and g.current_user.
+        (Static/health/webhook requests never reach this stage.)
         """
-        # [EBAY-LEVEL] Skip identity checks for static files (Performance + Crash Prevention)
-        if request.endpoint == 'static' or request.path.startswith(('/static', '/health')):
-            return
-        
-        import time
-        from models import User, ShopifyStore, db  # Added db to prevent UnboundLocalError
+        from models import ShopifyStore, db  # Added db to prevent UnboundLocalError
         from shopify_utils import normalize_shop_url
+        from identity_cache import get_identity, identity_from_store, set_identity
         
-        now = time.time()
         g.current_user = None
         
         # 1. Extract Shop Domain from all possible sources (Prioritize Header/Params)
@@ -754,52 +744,63 @@ def create_app():
         else:
             request.shop_domain = None
 
-        # 2. Check 5-minute Cache for this shop
-        if request.shop_domain and request.shop_domain in app._shop_identity_cache:
-            user_id, store_id, is_active, expiry = app._shop_identity_cache[request.shop_domain]
-            if now < expiry and is_active:
-                try:
-                    from sqlalchemy.orm import joinedload
-                    # [LATENCY CRUSH] Single Join lookup for cached hit
-                    g.current_user = db.session.query(User).options(joinedload(User.current_store)).get(user_id)
-                    if g.current_user:
-                        g.current_store = g.current_user.current_store
-                        return # SUCCESS: Cache hit
-                except Exception as e:
-                    # [PRODUCTION HARDENING] Graceful degradation on DB hiccup
-                    app.logger.error(f"Identity cache lookup failed: {e}")
-                    g.current_user = None
+        # 2. Identity cache - a hit serves identity with zero SQL
+        # (views needing ORM rows call g.current_identity.load_user()/load_store())
+        def serve_cached_identity(shop_domain):
+            try:
+                identity = get_identity(shop_domain)
+            except Exception as e:
+                # [PRODUCTION HARDENING] Graceful degradation on cache hiccup
+                app.logger.error(f"Identity cache lookup failed: {e}")
+                return False
+            if identity and identity.store_active:
+                g.current_user = identity
+                g.current_identity = ctx.identity = identity
+                return True
+            return False
+
+        cached_shop = ctx.shop = request.shop_domain
+        if cached_shop and serve_cached_identity(cached_shop):
+            return # SUCCESS: Cache hit
 
         # 3. Handle Stateless JWT (Authorization Header)
-        auth_header = request.headers.get("Authorization")
-        if auth_header and auth_header.startswith("Bearer "):
+        from session_token_verification import get_bearer_token
+        bearer_token = get_bearer_token()
+        if bearer_token:
             try:
                 from session_token_verification import verify_shopify_token
-                payload = verify_shopify_token(auth_header.split(" ")[1])
+                payload = verify_shopify_token(bearer_token)
                 if payload:
                     dest = payload.get("dest", "")
                     request.shop_domain = dest.replace("https://", "").split("/")[0]
             except Exception as e:
                 app.logger.debug(f"JWT stateless extraction failed: {e}")
 
+            ctx.shop = request.shop_domain
+            if request.shop_domain and request.shop_domain != cached_shop:
+                if serve_cached_identity(request.shop_domain):
+                    return # SUCCESS: Cache hit (shop from JWT)
+
         # 4. Database Lookup & Cache Update
         if request.shop_domain:
             try:
                 from models import db
                 from sqlalchemy.orm import joinedload
-                # [HOTFIX] Explicit and Clean Lookup to avoid ambiguous FK stalls
-                store = db.session.query(ShopifyStore).options(joinedload(ShopifyStore.user)).filter(
-                    ShopifyStore.shop_url == request.shop_domain,
-                    ShopifyStore.is_active == True
-                ).first()
+                from core.db_routing import use_primary
+                # [HOTFIX] Explicit and Clean Lookup to avoid ambiguous FK stalls.
+                # Primary, not a replica: this row is re-cached for IDENTITY_CACHE_TTL, and a
+                # lagging replica would re-cache what an uninstall just invalidated.
+                with use_primary():
+                    store = db.session.query(ShopifyStore).options(joinedload(ShopifyStore.user)).filter(
+                        ShopifyStore.shop_url == request.shop_domain,
+                        ShopifyStore.is_active == True
+                    ).first()
                 
                 if store and store.user:
                     g.current_user = store.user
                     g.current_store = store # TITAN MEMOIZATION
-                    # Update 5-minute Cache
-                    app._shop_identity_cache[request.shop_domain] = (
-                        g.current_user.id, store.id, store.is_active, now + 300
-                    )
+                    # Populate the shared identity cache
+                    set_identity(request.shop_domain, identity_from_store(store, store.user))
             except Exception as e:
                 # [PRODUCTION HARDENING] Graceful degradation on DB hiccup (SSL connection errors, etc.)
                 app.logger.error(f"Identity extraction DB lookup failed: {e}")
@@ -819,25 +820,24 @@ def create_app():
         if not g.get('current_user') and is_authed:
             g.current_user = login_manager_user
 
-    @app.before_request
-    def global_jwt_verification():
+    def global_jwt_verification(ctx):
         """
         GLOBAL IDENTITY EXTRACTION: Performs JWT verification for every request.
         Sets request.session_token_verified and request.shop_domain.
         Also performs GLOBAL IDENTITY SYNC to ensure current_user matches JWT.
         """
-        # [SURVIVAL MODE] FAST EXIT for Health Check
-        if request.path.startswith('/health'):
-            return
-            
-        from flask import request
         from flask_login import current_user, login_user
         from models import ShopifyStore
         from session_token_verification import get_bearer_token, verify_shopify_token
 
         token = get_bearer_token() or request.args.get("id_token")
         if token:
-            payload = verify_shopify_token(token)
+            try:
+                # Memoized per request/token - the identity hooks above already paid for it
+                payload = verify_shopify_token(token)
+            except Exception as e:
+                app.logger.debug(f"Global JWT verification error: {e}")
+                payload = None
             if payload:
                 # [FINALITY] Extract shop domain ONLY from 'dest' payload
                 dest = payload.get("dest", "")
@@ -847,7 +847,7 @@ def create_app():
                     return
 
                 shop_domain = dest.replace("https://", "").split("/")[0]
-                request.shop_domain = shop_domain
+                request.shop_domain = ctx.shop = shop_domain
                 request.session_token_verified = True
                 app.logger.debug(f"Global JWT Verified (Legend Tier): {shop_domain}")
                 
@@ -920,20 +920,14 @@ def create_app():
     # ============================================================================
     # GLOBAL ZERO-TRUST HARD-LOCK MIDDLEWARE
     # ============================================================================
-    @app.before_request
-    def hard_lock_middleware():
+    def hard_lock_middleware(ctx):
         """
         MANDATORY SECURITY GATE: Enforces Zero-Trust across all functional routes.
         1. Authentication (Flask-Login)
         2. Active Store Presence (DB Check)
         3. Identity Integrity (Session vs JWT vs URL)
         """
-        # [SURVIVAL MODE] FAST EXIT for Health Check
-        if request.path.startswith('/health'):
-            return
-
-        from flask import jsonify, redirect, request, session, url_for
-        from flask_login import current_user, logout_user
+        from flask_login import logout_user
         from shopify_utils import normalize_shop_url
 
         # [LOOP-BREAKER] Strict Endpoint Whitelisting
@@ -970,7 +964,6 @@ def create_app():
             return
 
         # [NEW] Allow if identity was already established by HMAC/JWT in this request
-        from flask import g
         if getattr(g, 'current_user', None) and g.current_user.is_authenticated:
             return
 
@@ -1037,63 +1030,21 @@ def create_app():
                 return None # Let the view/decorator handle it
 
 
-    @app.after_request
-    def set_safari_compatible_cookies(response):
-        """
-        SAFARI FIX: Ensure all cookies have SameSite=Lax; Secure for Safari compatibility.
-        Critical for embedded Shopify apps in Safari which blocks third-party cookies by default.
-        """
-        from flask import request
-
-        # Only apply to embedded app requests
-        if request.args.get("embedded") or request.args.get("host"):
-            # Force SameSite=None; Secure for Safari compatibility
-            session_name = app.config.get("SESSION_COOKIE_NAME", "session")
-            for cookie_name in [session_name, "remember_token"]:
-                if any(header.startswith(f"{cookie_name}=") for header in response.headers.getlist("Set-Cookie")):
-                    # Modify existing Set-Cookie headers
-                    cookies = []
-                    for header in response.headers.getlist("Set-Cookie"):
-                        if header.startswith(f"{cookie_name}="):
-                            # Ensure SameSite=None; Secure
-                            if "SameSite" not in header:
-                                header += "; SameSite=None; Secure"
-                            else:
-                                # Replace any existing SameSite with None
-                                import re
-                                header = re.sub(r'SameSite=(Lax|Strict)', 'SameSite=None', header)
-                                if "Secure" not in header:
-                                    header += "; Secure"
-                        cookies.append(header)
-
-                    # Replace Set-Cookie headers
-                    response.headers.remove("Set-Cookie")
-                    for cookie in cookies:
-                        response.headers.add("Set-Cookie", cookie)
-
-            app.logger.debug(f"🍪 Safari-compatible cookies set for {request.path}")
-
-        return response
-
-    @app.after_request
-    def force_session_commit(response):
+    def force_session_commit(ctx, response):
         """
-        CRITICAL FIX: Force session to commit before response is sent.
+        Keep the session's _user_id in step with the authenticated user.
         Prevents session loss between routes (especially /dashboard → /settings/shopify).
+        Only a real change marks the session dirty, so unchanged sessions are
+        never re-written or re-sent.
         """
         try:
-            from flask import session
             from flask_login import current_user
 
-            # Only force commit for successful responses
             if response.status_code < 400:
-                # Mark session as modified to force save
-                session.modified = True
-
-                # If user is authenticated, ensure session has user_id
                 if hasattr(current_user, "is_authenticated") and current_user.is_authenticated:
                     user_id = current_user.get_id()
-                    if user_id and session.get("_user_id") != user_id:
+                    # Compare as strings: the identity stage stores an int id
+                    if user_id and str(session.get("_user_id")) != user_id:
                         session["_user_id"] = user_id
                         session.permanent = True
                         app.logger.debug(
@@ -1104,45 +1055,45 @@ def create_app():
 
         return response
 
-    @app.before_request
-    def cctv_watchdog():
-        """THE WATCHDOG: Surveillance & Neutralization"""
-        # [SURVIVAL MODE] FAST EXIT for Health Check
-        if request.path.startswith('/health'):
-            return
-            
-        from flask import session
-        
-        from models import ShopifyStore, db
-        from shopify_utils import normalize_shop_url
-        
-        # 1. SCAN THE PORCH
-        shop = request.args.get('shop')
-        user_id = session.get('_user_id')
-        
-        # 2. DETECT THE BS
-        if shop and user_id:
-            try:
-                shop = normalize_shop_url(shop)
-                store = ShopifyStore.query.filter_by(shop_url=shop).first()
-                
-                # 3. NEUTRALIZE & REPORT
-                if store and store.user_id != int(user_id):
-                    old_id = store.user_id
-                    store.user_id = int(user_id) # The Hijack
-                    db.session.commit()
-                    
-                    # THE SNITCH (Speed of Light notification)
-                    app.logger.info(f"🚨 CCTV: Re-homed {shop} from User {old_id} to User {user_id}. Threat neutralized.")
-            except Exception as e:
-                app.logger.warning(f"⚠️ CCTV Watchdog encountered an issue: {e}")
-                db.session.rollback()
-
-
     # [REMOVED] Conflicting internal health_check that caused DB crashes. 
     # The authoritative 'dumb' health check is in core_routes.py
 
-
+    # ============================================================================
+    # MIDDLEWARE CHAIN - execution order, top to bottom
+    # ============================================================================
+    from core import sql_profile
+    from core.admission import admit_heavy
+    from core.cctv import cctv_watchdog
+    from performance import compress_response
+    from rate_limiter import enforce_rate_limit, init_limiter, rate_limit_headers
+    from response_audit import audit_response_discrepancies
+
+    init_limiter(app)
+    sql_profile.install()
+
+    # Health exits at kickstart, static skips everything but the bridge
+    # headers, webhooks (HMAC-verified in their views) skip identity/auth.
+    middleware.add_before("kickstart", kickstart, routes={ROUTE_HEALTH})
+    middleware.add_before("sql_begin", sql_profile.begin_request, routes=TRAFFIC_ROUTES)
+    middleware.add_before("observer_in", titan_observer_before, routes=TRAFFIC_ROUTES)
+    middleware.add_before("identity", extract_identity_context, routes=APP_ROUTES)
+    middleware.add_before("jwt", global_jwt_verification, routes=APP_ROUTES)
+    middleware.add_before("rate_limit", enforce_rate_limit, routes=APP_ROUTES)
+    middleware.add_before("admission", admit_heavy, routes=APP_ROUTES)
+    middleware.add_before("hard_lock", hard_lock_middleware, routes=APP_ROUTES)
+    middleware.add_before("cctv", cctv_watchdog, routes=APP_ROUTES)
+
+    middleware.add_after("session_commit", force_session_commit, routes=APP_ROUTES)
+    middleware.add_after("sql_end", sql_profile.end_request, routes=TRAFFIC_ROUTES)
+    middleware.add_after("rate_limit", rate_limit_headers, routes=APP_ROUTES)
+    middleware.add_after("bridge", audit_and_enforce_bridge, routes=TRAFFIC_ROUTES | {ROUTE_STATIC})
+    middleware.add_after("audit", lambda ctx, response: audit_response_discrepancies(response), routes=APP_ROUTES)
+    middleware.add_after("compress", lambda ctx, response: compress_response(response), routes=TRAFFIC_ROUTES | {ROUTE_STATIC})
+    middleware.add_after("observer_out", titan_observer_after, routes=TRAFFIC_ROUTES)
+
+    # Warm-up (core.warmup) is started by the serving process only - gunicorn's
+    # when_ready/post_worker_init or main.py - never here, because Celery
+    # tasks call create_app() too
     return app
 
 
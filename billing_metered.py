@@ -4,7 +4,7 @@ Handles syncing UsageEvents with the appUsageRecordCreate GraphQL mutation.
 """
 import logging
 import requests
-from typing import Dict, Any, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -120,3 +120,102 @@ def get_subscription_line_item_id(shop_url: str, access_token: str) -> Optional[
     except Exception as e:
         logger.error(f"Failed to fetch subscription line item for {shop_url}: {e}")
         return None
+
+
+# Usage records per aliased mutation - keeps each request well under
+# Shopify's GraphQL query cost limit
+USAGE_RECORDS_PER_REQUEST = 10
+
+# Line item IDs only change when the merchant re-subscribes
+LINE_ITEM_CACHE_TTL = 86400
+
+
+def get_subscription_line_item_id_cached(shop_url: str, access_token: str) -> Optional[str]:
+    """
+    Cached wrapper around get_subscription_line_item_id (Redis, 24h).
+    """
+    cache_key = f"billing:line_item:{shop_url}"
+    try:
+        from cache_utils import cache_get, cache_set
+    except Exception:
+        return get_subscription_line_item_id(shop_url, access_token)
+
+    line_item_id = cache_get(cache_key)
+    if line_item_id:
+        return line_item_id
+
+    line_item_id = get_subscription_line_item_id(shop_url, access_token)
+    if line_item_id:
+        cache_set(cache_key, line_item_id, expire=LINE_ITEM_CACHE_TTL)
+    return line_item_id
+
+
+def invalidate_subscription_line_item(shop_url: str) -> None:
+    """Drop the cached line item ID (subscription changed or rejected it)"""
+    try:
+        from cache_utils import cache_delete
+        cache_delete(f"billing:line_item:{shop_url}")
+    except Exception:
+        pass
+
+
+def sync_usage_events_batch(shop_url: str, access_token: str, subscription_line_item_id: str,
+                            usage_events: List[Dict[str, Any]], session: Optional[requests.Session] = None) -> Dict[int, str]:
+    """
+    Push several UsageEvents in one request using aliased appUsageRecordCreate mutations.
+
+    usage_events are plain dicts (id, event_type, description, price, idempotency_key)
+    so the call is safe to run off the request/DB thread.
+    Returns {event id: Shopify UsageRecord GID} for the records Shopify accepted.
+    """
+    if not usage_events:
+        return {}
+
+    variable_defs = ["$line: ID!"]
+    variables: Dict[str, Any] = {"line": subscription_line_item_id}
+    fields = []
+    for index, event in enumerate(usage_events):
+        variable_defs.extend([f"$d{index}: String!", f"$p{index}: MoneyInput!", f"$k{index}: String!"])
+        variables[f"d{index}"] = event.get("description") or f"Usage: {event['event_type']}"
+        variables[f"p{index}"] = {"amount": float(event["price"]), "currencyCode": "USD"}
+        variables[f"k{index}"] = event["idempotency_key"]
+        fields.append(
+            f"u{index}: appUsageRecordCreate(description: $d{index}, price: $p{index}, "
+            f"subscriptionLineItemId: $line, idempotencyKey: $k{index}) "
+            f"{{ appUsageRecord {{ id }} userErrors {{ field message }} }}"
+        )
+
+    mutation = f"mutation appUsageRecordBatch({', '.join(variable_defs)}) {{ {' '.join(fields)} }}"
+
+    headers = {
+        "X-Shopify-Access-Token": access_token,
+        "Content-Type": "application/json"
+    }
+
+    url = f"https://{shop_url}/admin/api/2024-04/graphql.json"
+
+    try:
+        poster = session or requests
+        response = poster.post(url, json={"query": mutation, "variables": variables}, headers=headers, timeout=30)
+        response.raise_for_status()
+
+        result = response.json()
+        if result.get("errors"):
+            logger.error(f"Shopify Billing batch errors ({shop_url}): {result['errors']}")
+        data = result.get("data") or {}
+
+        synced = {}
+        for index, event in enumerate(usage_events):
+            payload = data.get(f"u{index}") or {}
+            for error in payload.get("userErrors") or []:
+                logger.error(f"Shopify Billing Error ({shop_url}): {error.get('field')} - {error.get('message')}")
+            record_id = (payload.get("appUsageRecord") or {}).get("id")
+            if record_id:
+                synced[event["id"]] = record_id
+
+        logger.info(f"✅ [BILLING] Synced {len(synced)}/{len(usage_events)} usage records to Shopify for {shop_url}")
+        return synced
+
+    except Exception as e:
+        logger.error(f"❌ [BILLING] Batch Sync Connection Failed for {shop_url}: {e}")
+        return {}
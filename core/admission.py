@@ -0,0 +1,204 @@
+"""
+Admission control - priority-aware load shedding in front of the Flask app.
+
+Each worker has a fixed number of request slots (its gthread threads). The
+WSGI wrapper counts in-flight requests per route class and sheds page/API
+traffic with 429 + Retry-After before it can take the slots reserved for
+webhooks and health checks, which Shopify needs answered quickly. Heavy
+report endpoints are additionally capped per worker and, via the
+`admit_heavy` pipeline stage, per verified shop: a shop's extra report
+requests queue briefly for its slot and are then turned away.
+
+Slot counts are only known under gunicorn: gunicorn.conf.py exports
+ADMISSION_CAPACITY from its thread/connection settings. Elsewhere (the
+threaded dev server, Celery) nothing is shed unless ADMISSION_CAPACITY
+is set explicitly.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from werkzeug.wsgi import ClosingIterator
+
+from core.middleware import ROUTE_HEALTH, ROUTE_WEBHOOK, classify_route
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_ROUTES = frozenset({ROUTE_HEALTH, ROUTE_WEBHOOK})  # Never shed
+
+ADMISSION_RESERVED = 2  # Slots per worker only webhooks/health may use
+HEAVY_COST = 10  # rate_limiter.route_cost at or above this is a heavy computation
+SHOP_HEAVY_LIMIT = 1  # Concurrent heavy requests per shop per worker
+SHOP_QUEUE_SECONDS = 2.0  # How long a shop's extra heavy request waits for its slot
+SHED_RETRY_AFTER = 1
+HEAVY_RETRY_AFTER = 5
+
+_SHOP_SLOT_KEY = "admission.shop_slot"
+
+
+def _worker_capacity():
+    """Concurrent requests one worker can run; 0 (admission off) when unknown"""
+    return int(os.getenv("ADMISSION_CAPACITY") or 0)
+
+
+def is_heavy(path):
+    from rate_limiter import route_cost
+    return route_cost(path) >= HEAVY_COST
+
+
+class AdmissionController:
+    """In-flight accounting per route class and per shop for one worker"""
+
+    def __init__(self, capacity=None, reserved=ADMISSION_RESERVED, shop_heavy_limit=SHOP_HEAVY_LIMIT,
+                 queue_seconds=SHOP_QUEUE_SECONDS):
+        self.capacity = capacity if capacity is not None else _worker_capacity()
+        self.reserved = reserved
+        # Heavy work may take at most half the general slots
+        self.heavy_limit = max(1, (self.capacity - reserved) // 2)
+        self.shop_heavy_limit = shop_heavy_limit
+        self.queue_seconds = queue_seconds
+        self.in_flight = {}  # route class -> count
+        self.heavy_in_flight = 0
+        self.shop_heavy = {}  # shop -> count
+        self.shed = 0
+        self._cond = threading.Condition()
+
+    @property
+    def enabled(self):
+        # A worker with no slots beyond the reserve (sync) can't shed usefully
+        return self.capacity > self.reserved
+
+    def _general_in_flight(self):
+        return sum(n for cls, n in self.in_flight.items() if cls not in PRIORITY_ROUTES)
+
+    def try_enter(self, route_class, heavy=False):
+        """Take a slot for a request; False when it should be shed"""
+        with self._cond:
+            if route_class not in PRIORITY_ROUTES and self.enabled:
+                if self._general_in_flight() >= self.capacity - self.reserved:
+                    self.shed += 1
+                    return False
+                if heavy and self.heavy_in_flight >= self.heavy_limit:
+                    self.shed += 1
+                    return False
+            self.in_flight[route_class] = self.in_flight.get(route_class, 0) + 1
+            if heavy:
+                self.heavy_in_flight += 1
+            return True
+
+    def leave(self, route_class, heavy=False):
+        with self._cond:
+            self.in_flight[route_class] = max(self.in_flight.get(route_class, 1) - 1, 0)
+            if heavy:
+                self.heavy_in_flight = max(self.heavy_in_flight - 1, 0)
+
+    def acquire_shop(self, shop):
+        """Take one of the shop's heavy slots, waiting up to queue_seconds"""
+        deadline = time.monotonic() + self.queue_seconds
+        with self._cond:
+            while self.shop_heavy.get(shop, 0) >= self.shop_heavy_limit:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.shed += 1
+                    return False
+                self._cond.wait(remaining)
+            self.shop_heavy[shop] = self.shop_heavy.get(shop, 0) + 1
+            return True
+
+    def release_shop(self, shop):
+        with self._cond:
+            count = self.shop_heavy.get(shop, 0) - 1
+            if count > 0:
+                self.shop_heavy[shop] = count
+            else:
+                self.shop_heavy.pop(shop, None)
+            self._cond.notify_all()
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "capacity": self.capacity,
+                "reserved": self.reserved,
+                "in_flight": dict(self.in_flight),
+                "heavy_in_flight": self.heavy_in_flight,
+                "shops_running_heavy": len(self.shop_heavy),
+                "shed": self.shed,
+            }
+
+    def wrap(self, wsgi_app):
+        return AdmissionMiddleware(wsgi_app, self)
+
+
+def _too_busy(start_response, retry_after, message):
+    body = json.dumps({"error": message, "retry_after": retry_after}).encode("utf-8")
+    start_response("429 Too Many Requests", [
+        ("Content-Type", "application/json"),
+        ("Content-Length", str(len(body))),
+        ("Retry-After", str(retry_after)),
+    ])
+    return [body]
+
+
+class AdmissionMiddleware:
+    """WSGI wrapper: admit or shed, and release slots when the body is closed"""
+
+    def __init__(self, wsgi_app, controller):
+        self.wsgi_app = wsgi_app
+        self.controller = controller
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "/")
+        route_class = classify_route(path, environ.get("REQUEST_METHOD", "GET"))
+        heavy = route_class not in PRIORITY_ROUTES and is_heavy(path)
+
+        if not self.controller.try_enter(route_class, heavy):
+            logger.warning(f"TITAN [ADMISSION] Shedding {route_class} request {path} - worker at capacity")
+            return _too_busy(start_response, SHED_RETRY_AFTER, "Server busy")
+
+        try:
+            body = self.wsgi_app(environ, start_response)
+        except BaseException:
+            self._release(environ, route_class, heavy)
+            raise
+        return ClosingIterator(body, lambda: self._release(environ, route_class, heavy))
+
+    def _release(self, environ, route_class, heavy):
+        shop = environ.pop(_SHOP_SLOT_KEY, None)
+        if shop:
+            self.controller.release_shop(shop)
+        self.controller.leave(route_class, heavy)
+
+
+def admit_heavy(ctx):
+    """Pipeline stage: cap concurrent heavy computations per verified shop"""
+    from flask import current_app, jsonify, request
+    from rate_limiter import rate_limit_key
+
+    controller = current_app.extensions.get("admission")
+    if controller is None or not is_heavy(request.path):
+        return None
+    key = rate_limit_key(ctx)  # Verified shop, else client IP
+    if not controller.acquire_shop(key):
+        logger.warning(f"TITAN [ADMISSION] {key} already running a heavy report, rejecting {request.path}")
+        response = jsonify({"error": "A report for this shop is already running", "retry_after": HEAVY_RETRY_AFTER})
+        response.status_code = 429
+        response.headers["Retry-After"] = str(HEAVY_RETRY_AFTER)
+        return response
+    # Released by AdmissionMiddleware when the response body is closed
+    request.environ[_SHOP_SLOT_KEY] = key
+    return None
+
+
+def init_admission(app):
+    """Wrap app.wsgi_app with this worker's admission controller"""
+    controller = AdmissionController()
+    app.extensions["admission"] = controller
+    app.wsgi_app = controller.wrap(app.wsgi_app)
+    logger.info(
+        f"TITAN [ADMISSION] capacity={controller.capacity} reserved={controller.reserved} "
+        f"heavy_limit={controller.heavy_limit} enabled={controller.enabled}"
+    )
+    return controller
@@ -0,0 +1,84 @@
+"""
+CCTV watchdog - re-homes a store whose ?shop= belongs to another user.
+
+Ownership is checked against the identity cache (no SQL on the request
+path). A mismatch is published to the rehome_store Celery task from a
+background thread, so a slow or unreachable broker never adds its connect
+timeout to a page load.
+"""
+
+import logging
+import threading
+import time
+
+from flask import request, session
+
+logger = logging.getLogger(__name__)
+
+CCTV_REQUEUE_SECONDS = 300  # Per (shop, user): one re-home in flight at a time
+
+# (shop, user_id) -> monotonic expiry; stops a mismatched page from
+# enqueueing a re-home on every request while the task is in flight.
+# Expired entries are dropped on insert so the dict stays bounded.
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def _claim(key, now):
+    """True when no re-home for key is in flight (and marks one)"""
+    with _pending_lock:
+        if _pending.get(key, 0) > now:
+            return False
+        for stale in [k for k, expiry in _pending.items() if expiry <= now]:
+            del _pending[stale]
+        _pending[key] = now + CCTV_REQUEUE_SECONDS
+        return True
+
+
+def _publish_rehome(shop, user_id):
+    """Enqueue rehome_store; on a broker error release the claim so a later request retries"""
+    try:
+        from worker import rehome_store
+        rehome_store.apply_async((shop, user_id), retry=False)
+    except Exception as e:
+        with _pending_lock:
+            _pending.pop((shop, user_id), None)
+        logger.warning(f"⚠️ CCTV: could not queue re-home of {shop}: {e}")
+
+
+def cctv_watchdog(ctx):
+    """
+    THE WATCHDOG: Surveillance & Neutralization
+
+    Pipeline stage; never short-circuits the request.
+    """
+    from shopify_utils import normalize_shop_url
+
+    # 1. SCAN THE PORCH
+    shop = request.args.get('shop')
+    user_id = session.get('_user_id')
+
+    # 2. DETECT THE BS
+    if not (shop and user_id):
+        return
+    try:
+        shop = normalize_shop_url(shop)
+        identity = ctx.identity if ctx.shop == shop else None
+        if identity is None:
+            from identity_cache import get_identity
+            identity = get_identity(shop)
+        # Unknown/inactive stores are re-homed by the OAuth callback at auth time
+        if identity is None or identity.id == int(user_id):
+            return
+
+        # 3. NEUTRALIZE & REPORT (deferred, off the request thread)
+        if not _claim((shop, int(user_id)), time.monotonic()):
+            return
+        threading.Thread(
+            target=_publish_rehome, args=(shop, int(user_id)), name="cctv-rehome", daemon=True
+        ).start()
+
+        # THE SNITCH (Speed of Light notification)
+        logger.info(f"🚨 CCTV: Queued re-home of {shop} from User {identity.id} to User {user_id}.")
+    except Exception as e:
+        logger.warning(f"⚠️ CCTV Watchdog encountered an issue: {e}")
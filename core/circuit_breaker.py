@@ -3,6 +3,7 @@ Circuit breaker for production deployment with actual circuit breaking
 """
 
 import logging
+import threading
 import time
 from functools import wraps
 from collections import defaultdict
@@ -11,6 +12,8 @@ logger = logging.getLogger(__name__)
 
 # Simple circuit state tracking
 _circuit_states = defaultdict(lambda: {'failures': 0, 'last_failure': 0, 'state': 'closed'})
+# State transitions are shared by every thread/greenlet in the worker
+_circuit_lock = threading.Lock()
 FAILURE_THRESHOLD = 5
 TIMEOUT_SECONDS = 60
 
@@ -20,40 +23,47 @@ def with_circuit_breaker(name, fallback_data=None):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            circuit = _circuit_states[name]
             now = time.time()
-            
-            # Check if circuit should reset
-            if circuit['state'] == 'open' and (now - circuit['last_failure']) > TIMEOUT_SECONDS:
-                circuit['state'] = 'half-open'
-                circuit['failures'] = 0
+            with _circuit_lock:
+                circuit = _circuit_states[name]
+                
+                # Check if circuit should reset
+                if circuit['state'] == 'open' and (now - circuit['last_failure']) > TIMEOUT_SECONDS:
+                    circuit['state'] = 'half-open'
+                    circuit['failures'] = 0
+                
+                is_open = circuit['state'] == 'open'
             
             # If circuit is open, return fallback immediately
-            if circuit['state'] == 'open':
+            if is_open:
                 logger.warning(f"Circuit {name} is OPEN, returning fallback")
                 return fallback_data
             
             try:
                 result = func(*args, **kwargs)
                 # Success - reset circuit
-                if circuit['failures'] > 0:
-                    circuit['failures'] = 0
-                    circuit['state'] = 'closed'
+                with _circuit_lock:
+                    if circuit['failures'] > 0 or circuit['state'] != 'closed':
+                        circuit['failures'] = 0
+                        circuit['state'] = 'closed'
                 return result
                 
             except Exception as e:
-                circuit['failures'] += 1
-                circuit['last_failure'] = now
-                
-                # Open circuit if threshold reached
-                if circuit['failures'] >= FAILURE_THRESHOLD:
-                    circuit['state'] = 'open'
-                    logger.error(f"Circuit {name} OPENED after {circuit['failures']} failures")
+                with _circuit_lock:
+                    circuit['failures'] += 1
+                    circuit['last_failure'] = now
+                    
+                    # Open circuit if threshold reached
+                    if circuit['failures'] >= FAILURE_THRESHOLD:
+                        circuit['state'] = 'open'
+                        logger.error(f"Circuit {name} OPENED after {circuit['failures']} failures")
+                    
+                    is_open = circuit['state'] == 'open'
                 
                 logger.error(f"{name} operation failed: {e}")
                 
                 # Return fallback or re-raise based on circuit state
-                if circuit['state'] == 'open' and fallback_data is not None:
+                if is_open and fallback_data is not None:
                     return fallback_data
                 raise
                 
@@ -0,0 +1,88 @@
+"""
+Read-replica routing for db.session.
+
+Replicas are ordinary Flask-SQLAlchemy binds named replica_0, replica_1, ...
+(app_factory builds them from DATABASE_REPLICA_URLS). RoutingSession sends
+plain ORM SELECTs on the default bind to a replica and everything else -
+writes, flushes, SELECT ... FOR UPDATE, raw SQL - to the primary.
+
+Read-your-writes: once a session has written (flush, bulk DML, raw SQL) it
+stays on the primary until it is removed at the end of the request/app
+context, so a commit is always visible to the reads that follow it.
+use_primary() forces the primary for a block, e.g. right after a redirect
+from a request that wrote.
+"""
+
+import itertools
+import logging
+from contextlib import contextmanager
+
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+REPLICA_PREFIX = "replica_"  # Bind key prefix of the read replicas
+STICKY_KEY = "db_routing.wrote"  # session.info flag: this session has written
+FORCE_KEY = "db_routing.force_primary"  # session.info nesting depth of use_primary()
+
+_round_robin = itertools.count()
+
+
+def replica_keys(engines):
+    """Bind keys of the configured replicas, in a stable order"""
+    return sorted(key for key in engines if key and key.startswith(REPLICA_PREFIX))
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that reads from replicas when it safely can"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        primary = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not self._can_use_replica(clause):
+            return primary
+
+        engines = self._db.engines
+        if primary is not engines.get(None):
+            return primary  # Model on its own bind - not ours to route
+        keys = replica_keys(engines)
+        if not keys:
+            return primary
+        return engines[keys[next(_round_robin) % len(keys)]]
+
+    def _can_use_replica(self, clause):
+        if self._flushing or self.info.get(STICKY_KEY) or self.info.get(FORCE_KEY):
+            return False
+        if clause is None or not getattr(clause, "is_select", False):
+            return False
+        return getattr(clause, "_for_update_arg", None) is None
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _stick_after_flush(session, flush_context):
+    session.info[STICKY_KEY] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _stick_after_dml(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info[STICKY_KEY] = True
+
+
+@contextmanager
+def use_primary(session=None):
+    """Route every statement in the block to the primary"""
+    if session is None:
+        from models import db
+        session = db.session()
+    session.info[FORCE_KEY] = session.info.get(FORCE_KEY, 0) + 1
+    try:
+        yield session
+    finally:
+        session.info[FORCE_KEY] -= 1
+
+
+def replica_binds(urls, normalize=None):
+    """SQLALCHEMY_BINDS entries for a comma-separated list of replica URLs"""
+    urls = [u.strip() for u in (urls or "").split(",") if u.strip()]
+    return {f"{REPLICA_PREFIX}{i}": normalize(url) if normalize else url for i, url in enumerate(urls)}
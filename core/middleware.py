@@ -0,0 +1,182 @@
+"""
+Ordered request middleware pipeline.
+
+One before_request and one after_request hook run an explicit list of
+stages. Each stage declares the route classes it applies to, so static,
+health and webhook traffic exits early instead of walking the whole auth
+stack. Every stage is timed and reported in a Server-Timing header.
+"""
+
+import logging
+import re
+import time
+
+from flask import current_app, g, request
+
+logger = logging.getLogger(__name__)
+
+ROUTE_HEALTH = "health"
+ROUTE_STATIC = "static"
+ROUTE_WEBHOOK = "webhook"
+ROUTE_API = "api"
+ROUTE_PAGE = "page"
+
+ALL_ROUTES = frozenset({ROUTE_HEALTH, ROUTE_STATIC, ROUTE_WEBHOOK, ROUTE_API, ROUTE_PAGE})
+APP_ROUTES = frozenset({ROUTE_API, ROUTE_PAGE})  # Routes that carry a merchant identity
+TRAFFIC_ROUTES = frozenset({ROUTE_WEBHOOK, ROUTE_API, ROUTE_PAGE})  # Everything but health/static
+
+STATIC_SUFFIXES = (".ico", ".css", ".js", ".png", ".jpg", ".svg", ".map", ".woff", ".woff2")
+
+_METRIC_NAME = re.compile(r"[^A-Za-z0-9_-]")
+
+
+def classify_route(path, method="GET", endpoint=None):
+    """Bucket a request into one of the route classes"""
+    if path.startswith("/health") or path == "/ready" or (method == "HEAD" and path == "/"):
+        return ROUTE_HEALTH
+    if endpoint == "static" or path.startswith("/static") or path.endswith(STATIC_SUFFIXES):
+        return ROUTE_STATIC
+    if path.startswith(("/webhooks/", "/webhook/")):
+        return ROUTE_WEBHOOK
+    if path.startswith("/api/"):
+        return ROUTE_API
+    return ROUTE_PAGE
+
+
+class RequestContext:
+    """Per-request state shared by every middleware stage (g.request_ctx)"""
+
+    __slots__ = (
+        "route_class", "started", "request_id", "shop", "identity",
+        "timings", "before_count", "before_finished", "metrics",
+    )
+
+    def __init__(self, route_class):
+        self.route_class = route_class
+        self.started = time.perf_counter()
+        self.request_id = None
+        self.shop = None  # Normalized shop domain, resolved once by the identity stage
+        self.identity = None
+        self.timings = []  # [(stage name, milliseconds)]
+        self.before_count = 0
+        self.before_finished = None
+        self.metrics = []  # [(name, milliseconds, description)] - not stages, e.g. DB time
+
+    def record(self, name, started):
+        self.timings.append((name, (time.perf_counter() - started) * 1000))
+
+    def add_metric(self, name, ms, description=None):
+        """Extra Server-Timing entry that is not a middleware stage"""
+        self.metrics.append((name, ms, description))
+
+    def server_timing(self):
+        """Server-Timing header value: each stage, the view, and the total"""
+        now = time.perf_counter()
+        parts = [f"{_METRIC_NAME.sub('_', name)};dur={ms:.2f}" for name, ms in self.timings]
+        if self.before_finished is not None:
+            after_ms = sum(ms for _, ms in self.timings[self.before_count:])
+            view_ms = (now - self.before_finished) * 1000 - after_ms
+            parts.append(f"app;dur={max(view_ms, 0):.2f}")
+        for name, ms, description in self.metrics:
+            desc = f';desc="{description}"' if description else ""
+            parts.append(f"{_METRIC_NAME.sub('_', name)};dur={ms:.2f}{desc}")
+        parts.append(f"total;dur={(now - self.started) * 1000:.2f}")
+        return ", ".join(parts)
+
+
+def get_request_context():
+    """The current request's RequestContext (built lazily outside the pipeline)"""
+    ctx = g.get("request_ctx")
+    if ctx is None:
+        ctx = RequestContext(classify_route(request.path, request.method, request.endpoint))
+        g.request_ctx = ctx
+    return ctx
+
+
+class _Stage:
+    __slots__ = ("name", "func", "routes")
+
+    def __init__(self, name, func, routes):
+        self.name = name
+        self.func = func
+        self.routes = frozenset(routes)
+
+
+class MiddlewarePipeline:
+    """
+    Explicit, ordered replacement for stacked before/after_request hooks.
+
+    Before stages run in registration order and may short-circuit by
+    returning a response. After stages also run in registration order
+    (unlike Flask's reverse order for after_request) and must return the
+    response.
+    """
+
+    def __init__(self, app=None):
+        self.before_stages = []
+        self.after_stages = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self._run_before)
+        app.after_request(self._run_after)
+        app.extensions["middleware_pipeline"] = self
+
+    def add_before(self, name, func, routes=TRAFFIC_ROUTES):
+        """Append a before stage: func(ctx) -> Optional[response]"""
+        self.before_stages.append(_Stage(name, func, routes))
+        return func
+
+    def add_after(self, name, func, routes=TRAFFIC_ROUTES):
+        """Append an after stage: func(ctx, response) -> response"""
+        self.after_stages.append(_Stage(name, func, routes))
+        return func
+
+    def before(self, name, routes=TRAFFIC_ROUTES):
+        """Decorator form of add_before"""
+        return lambda func: self.add_before(name, func, routes)
+
+    def after(self, name, routes=TRAFFIC_ROUTES):
+        """Decorator form of add_after"""
+        return lambda func: self.add_after(name, func, routes)
+
+    def _run_before(self):
+        ctx = RequestContext(classify_route(request.path, request.method, request.endpoint))
+        g.request_ctx = ctx
+        try:
+            for stage in self.before_stages:
+                if ctx.route_class not in stage.routes:
+                    continue
+                started = time.perf_counter()
+                try:
+                    rv = stage.func(ctx)
+                finally:
+                    ctx.record(stage.name, started)
+                if rv is not None:
+                    return rv
+            return None
+        finally:
+            ctx.before_count = len(ctx.timings)
+            ctx.before_finished = time.perf_counter()
+
+    def _run_after(self, response):
+        ctx = get_request_context()
+        for stage in self.after_stages:
+            if ctx.route_class not in stage.routes:
+                continue
+            started = time.perf_counter()
+            try:
+                response = stage.func(ctx, response)
+            except Exception as e:
+                # [SUBMISSIVE] A broken after stage never costs the response
+                logger.error(f"Middleware stage {stage.name} failed: {e}")
+            finally:
+                ctx.record(stage.name, started)
+
+        if current_app.config.get("SERVER_TIMING", True):
+            try:
+                response.headers["Server-Timing"] = ctx.server_timing()
+            except Exception as e:
+                logger.debug(f"Server-Timing header skipped: {e}")
+        return response
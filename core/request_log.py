@@ -0,0 +1,109 @@
+"""
+Sampled, structured request events.
+
+The TITAN observer stages emit one "request.hit" and one "request.out"
+event per kept request instead of free-text INFO lines. The fields
+(route class, method, path, status, latency, shop, user, request_id)
+are rendered as JSON by logging_config.StructuredFormatter.
+
+Errors and slow requests are always kept; successes are sampled per
+route class. The sampling decision hashes the request_id, so a sampled
+hit always has its out line. Error/slow outs are kept even when their
+hit was sampled away.
+
+    REQUEST_LOG_SAMPLE="page=0.1,api=0.05,webhook=0.25,4xx=1,5xx=1"
+    REQUEST_LOG_SLOW_MS=1000
+    REQUEST_LOG=off                 # no request events at all
+"""
+
+import logging
+import os
+import zlib
+
+logger = logging.getLogger("missioncontrol.request")
+
+REQUEST_LOG_ENABLED = os.getenv("REQUEST_LOG", "on").lower() != "off"
+REQUEST_LOG_SLOW_MS = int(os.getenv("REQUEST_LOG_SLOW_MS", "1000"))  # Always keep requests at least this slow
+
+# Keep rate per route class (successes) and per status class
+DEFAULT_SAMPLE_RATES = {
+    "page": 0.1,
+    "api": 0.05,
+    "webhook": 0.25,
+    "4xx": 1.0,
+    "5xx": 1.0,
+}
+
+
+def parse_sample_rates(spec):
+    """'page=0.1,api=0.05,5xx=1' -> rates merged over the defaults; bad entries are ignored"""
+    rates = dict(DEFAULT_SAMPLE_RATES)
+    for item in (spec or "").split(","):
+        name, _, value = item.partition("=")
+        try:
+            rates[name.strip()] = min(max(float(value), 0.0), 1.0)
+        except ValueError:
+            continue
+    return rates
+
+
+SAMPLE_RATES = parse_sample_rates(os.getenv("REQUEST_LOG_SAMPLE"))
+
+
+def keep(request_id, rate):
+    """Deterministic per request_id: the same id gets the same answer in both stages"""
+    if rate >= 1.0:
+        return True
+    if rate <= 0.0 or not request_id:
+        return False
+    return zlib.crc32(str(request_id).encode()) / 0xFFFFFFFF < rate
+
+
+def out_reason(route_class, request_id, status, latency_ms):
+    """Why this response is logged ('5xx', '4xx', 'slow', 'sampled'), or None to skip it"""
+    if status >= 500 and keep(request_id, SAMPLE_RATES["5xx"]):
+        return "5xx"
+    if 400 <= status < 500 and keep(request_id, SAMPLE_RATES["4xx"]):
+        return "4xx"
+    if latency_ms >= REQUEST_LOG_SLOW_MS:
+        return "slow"
+    if keep(request_id, SAMPLE_RATES.get(route_class, 1.0)):
+        return "sampled"
+    return None
+
+
+def log_hit(route_class, request_id, method, path, ip=None, referer=None):
+    """request.hit - only for requests whose route-class sample keeps them"""
+    if not REQUEST_LOG_ENABLED or not keep(request_id, SAMPLE_RATES.get(route_class, 1.0)):
+        return
+    logger.info("request.hit", extra={
+        "event": "request.hit",
+        "request_id": request_id,
+        "route_class": route_class,
+        "method": method,
+        "path": path,
+        "ip": ip,
+        "referer": referer.split("?", 1)[0] if referer else None,  # Query strings carry session tokens
+    })
+
+
+def log_out(route_class, request_id, method, path, status, latency_ms, shop=None, user_id=None):
+    """request.out - errors and slow requests always, successes when sampled"""
+    if not REQUEST_LOG_ENABLED:
+        return
+    reason = out_reason(route_class, request_id, status, latency_ms)
+    if reason is None:
+        return
+    level = logging.ERROR if status >= 500 else logging.WARNING if status >= 400 or reason == "slow" else logging.INFO
+    logger.log(level, "request.out", extra={
+        "event": "request.out",
+        "request_id": request_id,
+        "route_class": route_class,
+        "method": method,
+        "path": path,
+        "status": status,
+        "latency_ms": latency_ms,
+        "shop": shop,
+        "user_id": user_id,
+        "sample_reason": reason,
+    })
@@ -0,0 +1,181 @@
+"""
+Single-flight request coalescing for identical upstream fetches.
+
+Concurrent callers asking for the same key share one in-flight call:
+within a process via a per-key Event, across gunicorn workers via a
+short-lived Redis lock plus a result slot that followers poll.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on how long a follower waits for the leader (matches the
+# worst case of a paginated Shopify fetch with retries)
+WAIT_TIMEOUT_SECONDS = 30
+# Redis lock TTL - released early by the leader, expires if it dies
+LOCK_TTL_MS = 30000
+# How long a published result stays readable for late followers
+RESULT_TTL_SECONDS = 5
+POLL_INTERVAL_SECONDS = 0.05
+
+LOCK_PREFIX = "singleflight:lock:"
+RESULT_PREFIX = "singleflight:result:"
+
+# Release the lock only if we still own it
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class _Call:
+    """An in-flight call that followers in this process wait on"""
+
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {"leader": 0, "shared_local": 0, "shared_remote": 0}
+
+    def do(self, key, fn):
+        """Run fn() once for all concurrent callers of key and return its result"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            if call.event.wait(WAIT_TIMEOUT_SECONDS):
+                self.stats["shared_local"] += 1
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            # Leader is stuck - fetch independently rather than hang the request
+            logger.warning(f"Single-flight wait timed out for {key}, fetching directly")
+            return fn()
+
+        try:
+            call.result = self._do_distributed(key, fn)
+            self.stats["leader"] += 1
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def _do_distributed(self, key, fn):
+        """Coalesce across workers through Redis; degrade to fn() without it"""
+        redis_client = _get_redis()
+        if redis_client is None:
+            return fn()
+
+        lock_key = LOCK_PREFIX + key
+        result_key = RESULT_PREFIX + key
+        token = uuid.uuid4().hex
+
+        try:
+            acquired = redis_client.set(lock_key, token, nx=True, px=LOCK_TTL_MS)
+        except Exception as e:
+            logger.debug(f"Single-flight Redis lock unavailable: {e}")
+            return fn()
+
+        if acquired:
+            try:
+                result = fn()
+                _publish(redis_client, result_key, result)
+                return result
+            finally:
+                try:
+                    redis_client.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+                except Exception as e:
+                    logger.debug(f"Single-flight lock release failed for {key}: {e}")
+
+        # Another worker is fetching - wait for its published result
+        deadline = time.monotonic() + WAIT_TIMEOUT_SECONDS
+        try:
+            while time.monotonic() < deadline:
+                payload = redis_client.get(result_key)
+                if payload is not None:
+                    self.stats["shared_remote"] += 1
+                    return json.loads(payload)
+                if not redis_client.exists(lock_key):
+                    # Leader finished without publishing (error result or crash)
+                    break
+                time.sleep(POLL_INTERVAL_SECONDS)
+        except Exception as e:
+            logger.debug(f"Single-flight remote wait failed for {key}: {e}")
+        return fn()
+
+
+def _get_redis():
+    """Shared Redis client from cache_utils, or None when Redis is down"""
+    try:
+        from cache_utils import redis_client
+        return redis_client
+    except Exception:
+        return None
+
+
+def _publish(redis_client, result_key, result):
+    """Share a successful result with followers in other workers"""
+    # Error dicts are not shared so each worker can retry on its own
+    if isinstance(result, dict) and "error" in result:
+        return
+    try:
+        redis_client.setex(result_key, RESULT_TTL_SECONDS, json.dumps(result, default=str))
+    except Exception as e:
+        logger.debug(f"Single-flight publish failed for {result_key}: {e}")
+
+
+# Process-wide group shared by all Shopify clients
+shopify_flight = SingleFlight()
+
+
+def single_flight(prefix, group=None):
+    """
+    Decorator for ShopifyClient fetch methods.
+
+    Keys on the method prefix, the client's shop_url and the call arguments,
+    so identical fetches for one shop share a single upstream run.
+    """
+    flight = group or shopify_flight
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            arg_string = json.dumps(
+                {"args": args, "kwargs": sorted(kwargs.items())}, sort_keys=True, default=str
+            )
+            arg_hash = hashlib.md5(arg_string.encode()).hexdigest()
+            key = f"{prefix}:{self.shop_url}:{arg_hash}"
+            return flight.do(key, lambda: func(self, *args, **kwargs))
+
+        return wrapper
+
+    return decorator
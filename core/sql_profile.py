@@ -0,0 +1,226 @@
+"""
+Per-request / per-task SQL instrumentation and N+1 detection.
+
+Engine-level cursor events count every statement, its time and its shape
+(the SQL with literals and IN-lists collapsed) against the unit of work
+running on the current thread: a request (begin/end middleware stages) or
+a Celery task (task_prerun/task_postrun). A shape repeated
+N_PLUS_ONE_THRESHOLD times in one unit is logged as an N+1 suspect.
+
+Per-unit numbers go to Server-Timing (db;dur=...;desc="N queries"), and
+per-label aggregates for this worker back /system-admin/sql-stats.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("SQL_PROFILE", "on").lower() != "off"
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))  # Same shape this often in one unit
+MAX_LABELS = 300  # Aggregated endpoints/tasks kept per worker
+MAX_SHAPES_PER_LABEL = 20  # Repeated shapes remembered per label
+SHAPE_PREVIEW_CHARS = 240
+
+_IN_LIST = re.compile(r"\bIN\s*\((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+
+_local = threading.local()
+_stats = {}  # label -> aggregate dict
+_stats_lock = threading.Lock()
+_installed = False
+
+
+@lru_cache(maxsize=2048)
+def statement_shape(statement):
+    """(fingerprint, preview) of a statement with its literal values collapsed"""
+    shape = _IN_LIST.sub("IN (?)", statement)
+    shape = _STRING.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _SPACE.sub(" ", shape).strip()
+    fingerprint = hashlib.blake2b(shape.encode(), digest_size=8).hexdigest()
+    return fingerprint, shape[:SHAPE_PREVIEW_CHARS]
+
+
+class QueryProfile:
+    """Statements issued by one request or task"""
+
+    __slots__ = ("label", "count", "seconds", "shapes", "previews")
+
+    def __init__(self, label):
+        self.label = label
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = {}  # fingerprint -> executions
+        self.previews = {}  # fingerprint -> normalized SQL
+
+    def add(self, statement, seconds):
+        fingerprint, preview = statement_shape(statement)
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[fingerprint] = self.shapes.get(fingerprint, 0) + 1
+        self.previews.setdefault(fingerprint, preview)
+
+    @property
+    def ms(self):
+        return self.seconds * 1000
+
+    def repeated(self, minimum=2):
+        """[(executions, normalized SQL)] for shapes run at least `minimum` times"""
+        hits = [(n, self.previews[fp]) for fp, n in self.shapes.items() if n >= minimum]
+        return sorted(hits, reverse=True)
+
+    def n_plus_one(self):
+        return self.repeated(N_PLUS_ONE_THRESHOLD)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and getattr(_local, "profile", None) is not None:
+        context._sql_profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = getattr(_local, "profile", None)
+    started = getattr(context, "_sql_profile_started", None)
+    if profile is None or started is None:
+        return
+    profile.add(statement, time.perf_counter() - started)
+
+
+def install():
+    """Listen on every engine (primary and replicas); idempotent"""
+    global _installed
+    if _installed or not ENABLED:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _installed = True
+
+
+def begin(label):
+    """Start profiling a unit of work on this thread"""
+    if not _installed:
+        return None
+    _local.profile = QueryProfile(label)
+    return _local.profile
+
+
+def current():
+    return getattr(_local, "profile", None)
+
+
+def end():
+    """Finish this thread's unit: log N+1 suspects, fold it into the aggregates"""
+    profile = getattr(_local, "profile", None)
+    _local.profile = None
+    if profile is None:
+        return None
+
+    suspects = profile.n_plus_one()
+    for executions, preview in suspects:
+        logger.warning(
+            f"TITAN [SQL] N+1 suspect in {profile.label}: {executions}x {preview}"
+        )
+    _aggregate(profile, suspects)
+    return profile
+
+
+def _aggregate(profile, suspects):
+    with _stats_lock:
+        entry = _stats.get(profile.label)
+        if entry is None:
+            if len(_stats) >= MAX_LABELS:
+                return
+            entry = _stats[profile.label] = {
+                "units": 0, "queries": 0, "db_ms": 0.0, "max_queries": 0,
+                "n_plus_one_units": 0, "repeated": {},
+            }
+        entry["units"] += 1
+        entry["queries"] += profile.count
+        entry["db_ms"] += profile.ms
+        entry["max_queries"] = max(entry["max_queries"], profile.count)
+        if suspects:
+            entry["n_plus_one_units"] += 1
+        repeated = entry["repeated"]
+        for executions, preview in profile.repeated():
+            if preview in repeated:
+                repeated[preview] = max(repeated[preview], executions)
+            elif len(repeated) < MAX_SHAPES_PER_LABEL:
+                repeated[preview] = executions
+
+
+def snapshot():
+    """Per-label aggregates for this worker, heaviest DB time first"""
+    with _stats_lock:
+        rows = []
+        for label, entry in _stats.items():
+            units = entry["units"] or 1
+            rows.append({
+                "label": label,
+                "units": entry["units"],
+                "avg_queries": round(entry["queries"] / units, 2),
+                "max_queries": entry["max_queries"],
+                "avg_db_ms": round(entry["db_ms"] / units, 2),
+                "total_db_ms": round(entry["db_ms"], 1),
+                "n_plus_one_units": entry["n_plus_one_units"],
+                "repeated_shapes": sorted(
+                    ({"sql": sql, "max_executions": n} for sql, n in entry["repeated"].items()),
+                    key=lambda shape: shape["max_executions"], reverse=True,
+                ),
+            })
+    rows.sort(key=lambda row: row["total_db_ms"], reverse=True)
+    return {"pid": os.getpid(), "n_plus_one_threshold": N_PLUS_ONE_THRESHOLD, "labels": rows}
+
+
+def reset():
+    with _stats_lock:
+        _stats.clear()
+
+
+# Middleware stages -----------------------------------------------------------
+
+def begin_request(ctx):
+    """Before stage: open the request's profile"""
+    from flask import request
+    begin(request.endpoint or "unmatched")  # Endpoint, not path: bounded label set
+
+
+def end_request(ctx, response):
+    """After stage: close the profile and report it in Server-Timing"""
+    profile = end()
+    if profile is not None:
+        ctx.add_metric("db", profile.ms, f"{profile.count} queries")
+    return response
+
+
+# Celery ----------------------------------------------------------------------
+
+def install_celery_hooks():
+    """Profile every Celery task in this process"""
+    if not ENABLED:
+        return
+    from celery.signals import task_postrun, task_prerun
+
+    install()
+
+    @task_prerun.connect(weak=False)
+    def _task_started(task=None, **kwargs):
+        begin(f"task:{getattr(task, 'name', 'unknown')}")
+
+    @task_postrun.connect(weak=False)
+    def _task_finished(task=None, **kwargs):
+        profile = end()
+        if profile is not None:
+            logger.info(
+                f"TITAN [SQL] {profile.label}: {profile.count} queries, {profile.ms:.1f}ms DB"
+            )
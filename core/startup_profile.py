@@ -0,0 +1,79 @@
+"""
+Startup profiling - STARTUP_PROFILE=1 prints where boot time goes.
+
+Times every first-time import (cumulative and self time) plus named boot
+phases from create_app, then prints a breakdown once the app is built.
+Disabled, install() is a no-op and phase() costs one attribute check.
+"""
+
+import builtins
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+ENABLED = os.getenv("STARTUP_PROFILE", "").lower() in ("1", "true", "on")
+REPORT_TOP = int(os.getenv("STARTUP_PROFILE_TOP", "25"))
+
+_original_import = builtins.__import__
+_stack = []  # Child time accumulated for each import in progress
+_imports = {}  # module -> [cumulative seconds, self seconds]
+_phases = []  # [(name, seconds)]
+_started = time.perf_counter()
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    started = time.perf_counter()
+    _stack.append(0.0)
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - started
+        children = _stack.pop()
+        if _stack:
+            _stack[-1] += elapsed
+        record = _imports.setdefault(name, [0.0, 0.0])
+        record[0] += elapsed
+        record[1] += elapsed - children
+
+
+def install():
+    """Start timing imports (call before the heavy imports)"""
+    global _started
+    if ENABLED and builtins.__import__ is not _timed_import:
+        _started = time.perf_counter()
+        builtins.__import__ = _timed_import
+
+
+@contextmanager
+def phase(name):
+    """Time a named boot phase"""
+    if not ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append((name, time.perf_counter() - started))
+
+
+def report(stream=None):
+    """Print the breakdown and stop timing imports"""
+    if not ENABLED:
+        return
+    builtins.__import__ = _original_import
+    stream = stream or sys.stderr
+    total = time.perf_counter() - _started
+
+    lines = [f"=== STARTUP PROFILE: {total * 1000:.0f}ms since install ==="]
+    lines.append("-- phases --")
+    for name, seconds in _phases:
+        lines.append(f"{seconds * 1000:9.1f}ms  {name}")
+    lines.append(f"-- top {REPORT_TOP} imports (cumulative / self) --")
+    ranked = sorted(_imports.items(), key=lambda item: item[1][0], reverse=True)
+    for name, (cumulative, own) in ranked[:REPORT_TOP]:
+        lines.append(f"{cumulative * 1000:9.1f}ms {own * 1000:9.1f}ms  {name}")
+    print("\n".join(lines), file=stream, flush=True)
@@ -0,0 +1,194 @@
+"""
+Warm-up before serving - pay first-request costs up front, report readiness.
+
+Two phases:
+- shared: CPU-only work (PBKDF2 cipher, Jinja templates). Under preload
+  it runs once in the gunicorn master (when_ready) and every forked worker
+  inherits the result; otherwise it runs first in the worker phase.
+- worker: lazy imports, DNS, DB pool connections, Redis. Runs in a
+  background thread of each serving process (gunicorn's post_worker_init,
+  or main.py's dev server); under preload the master already did the
+  imports, so they stay shared too.
+
+Only serving processes warm up: create_app() also runs inside every Celery
+task, which has no use for templates or a readiness gate.
+
+/ready answers 503 until this worker's warm-up is done and its required
+steps (cipher, templates, DB pool) succeeded; a failed required step is
+retried in the background when /ready is polled. DNS, Redis and the lazy
+imports are not required: the app serves without them (cookie sessions,
+local caches), so their failure must not take every worker out of
+rotation. /health stays the dumb liveness check.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+WARMUP_TEMPLATES = ("layout_polaris.html", "dashboard.html", "settings.html", "subscribe.html")
+WARMUP_MODULES = ("jwt", "requests", "shopify_integration")  # Lazy on the boot path, needed by the first embedded request
+WARMUP_HOSTS = ("admin.shopify.com", "cdn.shopify.com")
+WARMUP_DB_CONNECTIONS = int(os.getenv("WARMUP_DB_CONNECTIONS", "2"))
+REQUIRED_STEPS = ("cipher", "templates", "db_pool")  # /ready stays 503 while any of these failed
+WARMUP_RETRY_SECONDS = 5  # Min gap between retries of failed required steps
+
+_state = {"shared": None, "worker": None, "steps": {}, "pid": None, "failed": {}, "retrying": False, "retried_at": 0.0}
+_state_lock = threading.Lock()
+
+
+def _step(name, func):
+    """Run one warm-up step; failures are logged, never raised"""
+    started = time.perf_counter()
+    try:
+        detail = func()
+        ok = True
+    except Exception as e:
+        detail = str(e)
+        ok = False
+        logger.warning(f"TITAN [WARMUP] {name} failed: {e}")
+    with _state_lock:
+        _state["steps"][name] = {
+            "ok": ok,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+            "detail": detail,
+        }
+        if ok:
+            _state["failed"].pop(name, None)
+        else:
+            _state["failed"][name] = func  # Kept for a retry from readiness()
+    return ok
+
+
+def _prime_cipher():
+    from data_encryption import prime_encryption
+    return "available" if prime_encryption() else "disabled"
+
+
+def warm_imports():
+    """Import the boot-lazy modules the first requests need"""
+    import importlib
+    for name in WARMUP_MODULES:
+        importlib.import_module(name)
+    return len(WARMUP_MODULES)
+
+
+def _compile_templates(app):
+    for name in WARMUP_TEMPLATES:
+        app.jinja_env.get_template(name)
+    return len(WARMUP_TEMPLATES)
+
+
+def _resolve_hosts():
+    hosts = list(WARMUP_HOSTS) + [h for h in os.getenv("WARMUP_HOSTS", "").split(",") if h]
+    resolved = 0
+    for host in hosts:
+        try:
+            socket.getaddrinfo(host, 443, proto=socket.IPPROTO_TCP)
+            resolved += 1
+        except OSError as e:
+            logger.debug(f"TITAN [WARMUP] DNS {host}: {e}")
+    return f"{resolved}/{len(hosts)}"
+
+
+def _open_pool(app):
+    """Check out WARMUP_DB_CONNECTIONS at once so the pool holds that many"""
+    from models import db
+
+    with app.app_context():
+        connections = []
+        try:
+            for _ in range(WARMUP_DB_CONNECTIONS):
+                conn = db.engine.connect()
+                conn.exec_driver_sql("SELECT 1")
+                connections.append(conn)
+        finally:
+            for conn in connections:
+                conn.close()  # Back to the pool, still open
+    return len(connections)
+
+
+def _ping_redis():
+    from cache_utils import redis_client
+    if redis_client is None:
+        return "unavailable"
+    redis_client.ping()
+    return "ok"
+
+
+def enabled():
+    return os.getenv("WARMUP", "on").lower() != "off"
+
+
+def warm_shared(app):
+    """CPU-only warm-up - safe before a fork"""
+    started = time.perf_counter()
+    _step("cipher", _prime_cipher)
+    _step("templates", lambda: _compile_templates(app))
+    _state["shared"] = time.perf_counter() - started
+    logger.info(f"TITAN [WARMUP] Shared warm-up done in {_state['shared'] * 1000:.0f}ms")
+
+
+def warm_worker(app):
+    """Per-process warm-up (sockets) - after the fork"""
+    if _state["shared"] is None:  # No preloading master did it for us
+        warm_shared(app)
+    started = time.perf_counter()
+    _step("imports", warm_imports)
+    _step("dns", _resolve_hosts)
+    _step("db_pool", lambda: _open_pool(app))
+    _step("redis", _ping_redis)
+    _state["worker"] = time.perf_counter() - started
+    _state["pid"] = os.getpid()
+    logger.info(f"TITAN [WARMUP] Worker {os.getpid()} warm in {_state['worker'] * 1000:.0f}ms")
+
+
+def start_worker_warmup(app):
+    """Run warm_worker in the background; /ready flips once it finishes"""
+    with _state_lock:
+        _state["worker"] = None
+        _state["pid"] = None
+    thread = threading.Thread(target=warm_worker, args=(app,), name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def is_ready():
+    if not enabled():
+        return True
+    if _state["shared"] is None or _state["worker"] is None or _state["pid"] != os.getpid():
+        return False
+    return not any(name in _state["failed"] for name in REQUIRED_STEPS)
+
+
+def _retry_failed():
+    """Re-run failed required steps in the background, at most every WARMUP_RETRY_SECONDS"""
+    with _state_lock:
+        failed = [(name, func) for name, func in _state["failed"].items() if name in REQUIRED_STEPS]
+        now = time.monotonic()
+        if not failed or _state["retrying"] or now - _state["retried_at"] < WARMUP_RETRY_SECONDS:
+            return
+        _state["retrying"] = True
+        _state["retried_at"] = now
+
+    def run():
+        try:
+            for name, func in failed:
+                _step(name, func)
+        finally:
+            _state["retrying"] = False
+
+    threading.Thread(target=run, name="warmup-retry", daemon=True).start()
+
+
+def readiness():
+    """(payload, status) for the /ready endpoint"""
+    with _state_lock:
+        steps = {name: dict(step) for name, step in _state["steps"].items()}
+    ready = is_ready()
+    if not ready and _state["worker"] is not None:
+        _retry_failed()
+    return {"status": "ready" if ready else "warming", "pid": os.getpid(), "steps": steps}, 200 if ready else 503
@@ -559,6 +559,22 @@ def cron_trial_warnings():
         return jsonify({"error": str(e)}), 500
 
 
+@core_bp.route("/cron/usage-maintenance", methods=["GET", "POST"])
+def cron_usage_maintenance():
+    secret = request.args.get("secret") or request.form.get("secret")
+    if secret != os.getenv("CRON_SECRET"):
+        return jsonify({"error": "Unauthorized"}), 401
+
+    from models import db
+    from usage_storage import run_usage_maintenance
+
+    try:
+        result = run_usage_maintenance(db.engine)
+        return jsonify({"success": True, **result}), 200
+    except Exception as e:
+        return jsonify({"error": str(e), "success": False}), 500
+
+
 @core_bp.route("/cron/database-backup", methods=["GET", "POST"])
 def cron_database_backup():
     secret = request.args.get("secret") or request.form.get("secret")
@@ -992,11 +1008,15 @@ def api_comprehensive_dashboard():
             }), 403
 
         result = {"success": True, "errors": []}
-        
+
+        # One store lookup, token decrypt and client for all three reports
+        from shop_context import get_shop_context
+        shop = get_shop_context(user.id)
+
         # Try to get orders
         try:
-            from order_processing import process_orders
-            orders_result = process_orders(user_id=user.id)
+            from order_processing import process_orders_for
+            orders_result = process_orders_for(shop)
             if orders_result.get("success"):
                 result["orders"] = orders_result
             else:
@@ -1014,8 +1034,8 @@ def api_comprehensive_dashboard():
 
         # Try to get inventory
         try:
-            from inventory import update_inventory
-            inventory_result = update_inventory(user_id=user.id)
+            from inventory import update_inventory_for
+            inventory_result = update_inventory_for(shop)
             if inventory_result.get("success"):
                 result["inventory"] = inventory_result
             else:
@@ -1033,8 +1053,8 @@ def api_comprehensive_dashboard():
 
         # Try to get revenue
         try:
-            from reporting import generate_report
-            revenue_result = generate_report(user_id=user.id)
+            from reporting import generate_report_for
+            revenue_result = generate_report_for(shop)
             if revenue_result.get("success"):
                 result["revenue"] = revenue_result
             else:
@@ -7,6 +7,7 @@ import hashlib
 import hmac
 import logging
 import secrets
+import threading
 import time
 from functools import wraps
 from typing import Any, Dict, Optional
@@ -25,6 +26,8 @@ class SimpleCSRFManager:
         self.app = app
         # Token storage (in production, use Redis or database)
         self._tokens: Dict[str, Dict[str, Any]] = {}
+        # Shared across gthread/gevent request handlers
+        self._tokens_lock = threading.Lock()
 
         if app:
             self.init_app(app)
@@ -106,14 +109,15 @@ class SimpleCSRFManager:
         full_token = f"{token_payload}:{signature}"
 
         # Store token metadata
-        self._tokens[token_data] = {
-            "session_id": session_id,
-            "created_at": timestamp,
-            "used": False,
-        }
+        with self._tokens_lock:
+            self._tokens[token_data] = {
+                "session_id": session_id,
+                "created_at": timestamp,
+                "used": False,
+            }
 
-        # Clean up old tokens
-        self._cleanup_old_tokens()
+            # Clean up old tokens
+            self._cleanup_old_tokens()
 
         return full_token
 
@@ -146,11 +150,11 @@ class SimpleCSRFManager:
                 return False
 
             # Check if token exists
-            if token_data not in self._tokens:
+            with self._tokens_lock:
+                token_info = self._tokens.get(token_data)
+            if token_info is None:
                 return False
 
-            token_info = self._tokens[token_data]
-
             # Check session matching
             if session_id is None:
                 session_id = session.get("_id", "anonymous")
@@ -171,7 +175,7 @@ class SimpleCSRFManager:
             return False
 
     def _cleanup_old_tokens(self):
-        """Remove expired tokens from storage"""
+        """Remove expired tokens from storage (caller holds _tokens_lock)"""
         current_time = int(time.time())
         time_limit = self.app.config.get("CSRF_TIME_LIMIT", 3600)
         expired_tokens = []
@@ -7,14 +7,27 @@ import base64
 import hashlib
 import logging
 import os
-from typing import Optional, Union
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Optional, Tuple, Union
 
-from cryptography.fernet import Fernet, InvalidToken
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+# cryptography is imported on first use so it stays off the boot path
+if TYPE_CHECKING:
+    from cryptography.fernet import Fernet
 
 logger = logging.getLogger("missioncontrol.encryption")
 
+# Derived Fernet keys, keyed by a hash of the password (PBKDF2 runs once per process)
+_derived_keys: Dict[str, bytes] = {}
+_derived_keys_lock = threading.Lock()
+
+# Decrypted access tokens, keyed by a hash of the ciphertext
+TOKEN_CACHE_TTL = 600  # 10 minutes
+TOKEN_CACHE_MAX_ENTRIES = 1024
+_token_cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
 
 class EncryptionError(Exception):
     """Custom exception for encryption-related errors"""
@@ -54,13 +67,15 @@ class EncryptionManager:
         if len(self.encryption_key) < 32:
             raise EncryptionError("Encryption key must be at least 32 characters long")
 
-    def _get_cipher(self) -> Optional[Fernet]:
+    def _get_cipher(self) -> Optional["Fernet"]:
         """Get or create Fernet cipher instance"""
         if not self.encryption_key:
             return None
 
         if self._cipher is None:
             try:
+                from cryptography.fernet import Fernet
+
                 key = self._derive_key(self.encryption_key)
                 self._cipher = Fernet(key)
             except Exception as e:
@@ -70,7 +85,23 @@ class EncryptionManager:
         return self._cipher
 
     def _derive_key(self, password: str) -> bytes:
-        """Derive a proper Fernet key from password using PBKDF2"""
+        """Derive a proper Fernet key from password using PBKDF2 (memoized per process)"""
+        password_bytes = password.encode() if isinstance(password, str) else password
+        fingerprint = hashlib.sha256(password_bytes).hexdigest()
+
+        with _derived_keys_lock:
+            cached = _derived_keys.get(fingerprint)
+            if cached is None:
+                cached = self._run_kdf(password_bytes)
+                _derived_keys[fingerprint] = cached
+        return cached
+
+    @staticmethod
+    def _run_kdf(password_bytes: bytes) -> bytes:
+        """Run PBKDF2 - expensive, only called through _derive_key"""
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
         # Use a fixed salt for key derivation (in production, consider per-app salts)
         salt = b"missioncontrol_2025_salt"
 
@@ -82,7 +113,6 @@ class EncryptionManager:
             iterations=100000,  # 100k iterations for security
         )
 
-        password_bytes = password.encode() if isinstance(password, str) else password
         derived_key = kdf.derive(password_bytes)
 
         # Return base64-encoded key for Fernet
@@ -201,6 +231,19 @@ def is_encryption_available() -> bool:
     return get_encryption_manager().is_encryption_available()
 
 
+def prime_encryption() -> bool:
+    """
+    Build the global cipher now so PBKDF2 runs at startup, not on the
+    first request that touches a token.
+    """
+    started = time.perf_counter()
+    available = is_encryption_available()
+    logger.info(
+        f"Encryption primed in {(time.perf_counter() - started) * 1000:.1f}ms - Available: {available}"
+    )
+    return available
+
+
 def encrypt_data(data: Union[str, bytes]) -> Optional[str]:
     """
     Encrypt data using the global encryption manager
@@ -265,6 +308,14 @@ def decrypt_access_token(encrypted_token: str) -> Optional[str]:
         logger.debug("Token appears to be plaintext, returning as-is")
         return encrypted_token
 
+    cache_key = hashlib.sha256(encrypted_token.encode("utf-8")).hexdigest()
+    now = time.monotonic()
+    with _token_cache_lock:
+        entry = _token_cache.get(cache_key)
+        if entry and entry[1] > now:
+            _token_cache.move_to_end(cache_key)
+            return entry[0]
+
     # Try to decrypt
     decrypted = decrypt_data(encrypted_token)
 
@@ -275,11 +326,26 @@ def decrypt_access_token(encrypted_token: str) -> Optional[str]:
                 f"Decrypted token doesn't match expected format: {decrypted[:10]}..."
             )
 
+        with _token_cache_lock:
+            _token_cache[cache_key] = (decrypted, now + TOKEN_CACHE_TTL)
+            _token_cache.move_to_end(cache_key)
+            while len(_token_cache) > TOKEN_CACHE_MAX_ENTRIES:
+                _token_cache.popitem(last=False)
+
         return decrypted
 
     return None
 
 
+def invalidate_token_cache(encrypted_token: Optional[str] = None) -> None:
+    """Forget one cached decrypted token (or all of them)"""
+    with _token_cache_lock:
+        if encrypted_token is None:
+            _token_cache.clear()
+        else:
+            _token_cache.pop(hashlib.sha256(encrypted_token.encode("utf-8")).hexdigest(), None)
+
+
 def encrypt_user_data(data_dict: dict) -> dict:
     """
     Encrypt sensitive fields in a user data dictionary
@@ -361,6 +427,8 @@ def generate_encryption_key() -> str:
     Returns:
         Base64-encoded encryption key
     """
+    from cryptography.fernet import Fernet
+
     key = Fernet.generate_key()
     return key.decode("ascii")
 
@@ -385,6 +453,3 @@ def validate_encryption_key(key: str) -> bool:
     except EncryptionError:
         return False
 
-
-# Initialize logging for this module
-logger.info(f"Encryption module loaded - Available: {is_encryption_available()}")
@@ -49,9 +49,19 @@ def run_diagnostic():
                 print(f"✅ Step 3: Schema is ALIVE (Found {table_check[0]} records)")
             except Exception as schema_error:
                 print(f"❌ Step 3 FAILED: Schema missing or corrupt. Error: {schema_error}")
-                print("👉 Fix: Tables are missing. You need to run: flask db upgrade")
+                print("👉 Fix: Tables are missing. You need to run: python migrations.py")
                 return
 
+            # Test 4: Schema version (versioned migrations, see migrations.py)
+            from migrations import LATEST_VERSION, current_version
+
+            version = current_version(engine)
+            if version is None or version < LATEST_VERSION:
+                print(f"⚠️  Step 4: Schema version {version}, latest is {LATEST_VERSION}")
+                print("👉 Fix: Pending migrations. Run: python migrations.py (or restart the app)")
+            else:
+                print(f"✅ Step 4: Schema is current (version {version})")
+
             print("\n🎉 DIAGNOSIS: The Database is HEALTHY. If the app is still crashing, check your application logs (app_factory.py).")
             
     except Exception as e:
@@ -63,7 +73,7 @@ def run_diagnostic():
         elif "remaining connection slots" in error_str or "too many clients" in error_str:
             print("\n👉 Fix: You hit the Neon 10-connection limit. Restart the service to clear ghosts or kill local tabs!")
         elif "relation" in error_str and "does not exist" in error_str:
-             print("\n👉 Fix: The 'users' table is missing. You need to run: flask db upgrade")
+             print("\n👉 Fix: The 'users' table is missing. You need to run: python migrations.py")
         elif "password" in error_str or "authentication" in error_str:
              print("\n👉 Fix: Invalid credentials. Check DATABASE_URL username/password.")
 
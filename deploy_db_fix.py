@@ -2,12 +2,11 @@
 import os
 import sys
 import sqlalchemy
-from sqlalchemy import text
 
 def deploy_fix():
     print("🚀 Database Fix Deployer")
     print("========================")
-    print("This script will run 'optimize_db.sql' against your database.")
+    print("This script applies any pending schema migrations (migrations.py) to your database.")
     
     
     # Get DB URL
@@ -37,37 +36,22 @@ def deploy_fix():
         connection = engine.connect()
         print("✅ Connected successfully.")
         
-        # Read SQL file
-        try:
-            with open("optimize_db.sql", "r") as f:
-                sql_content = f.read()
-        except FileNotFoundError:
-            print("❌ 'optimize_db.sql' not found in current directory.")
-            sys.exit(1)
+        connection.close()
 
-        print("\nRUNNING migration...")
-        # Split by ; for rudimentary statement parsing if needed, but text() often handles blocks.
-        # However, for safety and better error reporting, executing the whole block is usually fine with psycopg2.
-        # But let's try statement by statement to be safe.
-        statements = sql_content.split(';')
-        
-        trans = connection.begin()
-        count = 0
+        from migrations import LATEST_VERSION, current_version, migrate
+
+        print(f"\nSchema version: {current_version(engine)} (latest {LATEST_VERSION})")
+        print("\nRUNNING migrations...")
         try:
-            for statement in statements:
-                if statement.strip():
-                    connection.execute(text(statement))
-                    count += 1
-            trans.commit()
-            print(f"✅ Executed {count} SQL statements.")
-            print("\n🎉 SUCCESS! Database schema is now optimized.")
+            version = migrate(engine)
+            print(f"✅ Schema at version {version}.")
+            print("\n🎉 SUCCESS! Database schema is up to date.")
             print("You can now restart your Render service.")
-            
+
         except Exception as e:
-            trans.rollback()
-            print(f"\n❌ SQL Error: {e}")
+            print(f"\n❌ Migration Error: {e}")
             sys.exit(1)
-            
+
     except Exception as e:
         print(f"\n❌ Connection Error: {e}")
         print("Check your password and firewall rules.")
@@ -11,9 +11,10 @@ from typing import Dict, List, Optional
 import os
 
 from models import ScheduledReport, ShopifyStore, User, db
-from order_processing import process_orders
-from inventory import update_inventory
-from reporting import generate_report
+from order_processing import process_orders_for
+from inventory import update_inventory_for
+from reporting import generate_report_for
+from shop_context import ShopContext
 
 logger = logging.getLogger(__name__)
 
@@ -85,19 +86,21 @@ def send_report(report: ScheduledReport) -> bool:
 def generate_report_data(store: ShopifyStore, report_type: str, user_id: int) -> Dict:
     """Generate report data for email"""
     try:
+        # The store is already loaded: one token decrypt and client for every report
+        shop = ShopContext(user_id, store=store)
         if report_type == 'orders':
-            return process_orders(user_id=user_id)
+            return process_orders_for(shop)
         elif report_type == 'inventory':
-            return update_inventory(user_id=user_id)
+            return update_inventory_for(shop)
         elif report_type == 'revenue':
             # Get last 30 days for revenue report
             start_date = (datetime.utcnow() - timedelta(days=30)).isoformat()
-            return generate_report(user_id=user_id, start_date=start_date)
+            return generate_report_for(shop, start_date=start_date)
         else:
             # 'all' - get summary data
-            orders_data = process_orders(user_id=user_id)
-            inventory_data = update_inventory(user_id=user_id)
-            revenue_data = generate_report(user_id=user_id, start_date=(datetime.utcnow() - timedelta(days=30)).isoformat())
+            orders_data = process_orders_for(shop)
+            inventory_data = update_inventory_for(shop)
+            revenue_data = generate_report_for(shop, start_date=(datetime.utcnow() - timedelta(days=30)).isoformat())
             
             return {
                 "success": True,
@@ -2,6 +2,7 @@
 Email service with optional SendGrid dependency
 """
 
+import importlib.util
 import logging
 import os
 import smtplib
@@ -10,21 +11,31 @@ from email.mime.multipart import MIMEMultipart
 
 logger = logging.getLogger(__name__)
 
-try:
-    from sendgrid import SendGridAPIClient
-    from sendgrid.helpers.mail import Mail
-
+# SendGrid is only located here; the package itself is imported on first send
+if importlib.util.find_spec("sendgrid") is not None:
     SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
     if not SENDGRID_API_KEY:
         logger.warning("SENDGRID_API_KEY not set - email functionality disabled")
         SENDGRID_AVAILABLE = False
     else:
         SENDGRID_AVAILABLE = True
-except ImportError:
+else:
     logger.warning("SendGrid not available - email functionality disabled")
     SENDGRID_AVAILABLE = False
     SENDGRID_API_KEY = None
 
+
+def SendGridAPIClient(*args, **kwargs):
+    """Lazy stand-in for sendgrid.SendGridAPIClient"""
+    from sendgrid import SendGridAPIClient as _SendGridAPIClient
+    return _SendGridAPIClient(*args, **kwargs)
+
+
+def Mail(*args, **kwargs):
+    """Lazy stand-in for sendgrid.helpers.mail.Mail"""
+    from sendgrid.helpers.mail import Mail as _Mail
+    return _Mail(*args, **kwargs)
+
 # SMTP Configuration (fallback when SendGrid unavailable)
 SMTP_SERVER = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
 SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
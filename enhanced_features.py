@@ -17,9 +17,9 @@ from enhanced_models import (
     get_user_settings, get_user_plan, is_automated_plan, PLAN_MANUAL, PLAN_AUTOMATED
 )
 from date_filtering import parse_date_range, filter_orders_by_date, get_date_range_options
-from order_processing import process_orders
-from inventory import update_inventory
-from reporting import generate_report
+from order_processing import process_orders_for
+from inventory import update_inventory_for
+from reporting import generate_report_for
 from data_encryption import encrypt_access_token, decrypt_access_token
 from logging_config import logger
 from access_control import require_access  # Use existing require_access decorator
@@ -421,19 +421,21 @@ def send_scheduled_report(report):
             logger.warning(f"No active store for user {report.user_id}")
             return False
         
-        # Generate reports based on type
+        # Generate reports based on type (one token decrypt and client for all of them)
+        from shop_context import ShopContext
+        shop = ShopContext(report.user_id, store=store)
         reports_data = {}
         
         if report.report_type in ['orders', 'all']:
-            orders_result = process_orders(user_id=report.user_id)
+            orders_result = process_orders_for(shop)
             reports_data['orders'] = orders_result
         
         if report.report_type in ['inventory', 'all']:
-            inventory_result = update_inventory(user_id=report.user_id)
+            inventory_result = update_inventory_for(shop)
             reports_data['inventory'] = inventory_result
         
         if report.report_type in ['revenue', 'all']:
-            revenue_result = generate_report(user_id=report.user_id)
+            revenue_result = generate_report_for(shop)
             reports_data['revenue'] = revenue_result
         
         # Build email content
@@ -531,8 +533,16 @@ def send_sms_notification(phone_number, message):
 def get_comprehensive_dashboard():
     """Get comprehensive dashboard with all 3 reports"""
     try:
+        user_id = current_user.get_id() or session.get('user_id')
+        if not user_id:
+            return jsonify({"success": False, "error": "Not authenticated"}), 401
+
         # Get date range
         start_date, end_date = parse_date_range()
+
+        # One store lookup, token decrypt and client for all three reports
+        from shop_context import get_shop_context
+        shop = get_shop_context(user_id)
         
         # Get all three reports with error handling
         results = {
@@ -544,7 +554,7 @@ def get_comprehensive_dashboard():
         
         # Try to get orders
         try:
-            orders_result = process_orders()
+            orders_result = process_orders_for(shop)
             results['orders'] = orders_result
         except Exception as e:
             error_msg = str(e)
@@ -563,7 +573,7 @@ def get_comprehensive_dashboard():
         
         # Try to get inventory
         try:
-            inventory_result = update_inventory()
+            inventory_result = update_inventory_for(shop)
             results['inventory'] = inventory_result
         except Exception as e:
             error_msg = str(e)
@@ -582,7 +592,7 @@ def get_comprehensive_dashboard():
         
         # Try to get revenue
         try:
-            revenue_result = generate_report()
+            revenue_result = generate_report_for(shop)
             results['revenue'] = revenue_result
         except Exception as e:
             error_msg = str(e)
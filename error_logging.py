@@ -89,14 +89,17 @@ class ErrorLogger:
             system_handler.setLevel(logging.INFO)
             system_handler.setFormatter(simple_formatter)
             
-            # Add handlers to loggers
-            for logger in [self.error_logger, self.api_logger, self.user_logger, self.system_logger]:
-                logger.addHandler(console_handler)
-                
-            self.error_logger.addHandler(error_handler)
-            self.api_logger.addHandler(api_handler)
-            self.user_logger.addHandler(user_handler)
-            self.system_logger.addHandler(system_handler)
+            # Add handlers to loggers - behind the async log queue, so the
+            # request thread never waits on the console or a log file
+            from logging_config import async_handler
+
+            for logger, file_handler in [
+                (self.error_logger, error_handler),
+                (self.api_logger, api_handler),
+                (self.user_logger, user_handler),
+                (self.system_logger, system_handler),
+            ]:
+                logger.addHandler(async_handler(logger.name, [console_handler, file_handler]))
             
         except Exception as e:
             print(f"Failed to setup file logging: {e}")
@@ -4,9 +4,10 @@ import csv
 import io
 from models import db, User, ShopifyStore, ScheduledReport
 from shopify_integration import ShopifyClient
-from reporting import generate_report
-from order_processing import process_orders
-from inventory import update_inventory
+from reporting import generate_report_for
+from order_processing import process_orders_for
+from inventory import update_inventory_for
+from shop_context import get_shop_context
 from email_service import send_report_email
 import logging
 from session_token_verification import stateless_auth
@@ -82,9 +83,9 @@ def comprehensive_dashboard_api():
         if not user_id:
             return jsonify({"success": False, "error": "Not authenticated"}), 401
 
-        # Get user's store
-        store = ShopifyStore.query.filter_by(user_id=user_id, is_active=True).first()
-        if not store:
+        # One store lookup, token decrypt and client for all three reports
+        shop = get_shop_context(user_id)
+        if not shop.store:
             return jsonify({
                 "success": False, 
                 "error": "No store connected",
@@ -96,7 +97,7 @@ def comprehensive_dashboard_api():
 
         # Get orders data
         try:
-            orders_result = process_orders(user_id=user_id)
+            orders_result = process_orders_for(shop)
             if orders_result and orders_result.get('success'):
                 results['orders'] = orders_result
             else:
@@ -109,7 +110,7 @@ def comprehensive_dashboard_api():
 
         # Get inventory data
         try:
-            inventory_result = update_inventory(user_id=user_id)
+            inventory_result = update_inventory_for(shop)
             if inventory_result and inventory_result.get('success'):
                 results['inventory'] = inventory_result
             else:
@@ -122,7 +123,7 @@ def comprehensive_dashboard_api():
 
         # Get revenue data
         try:
-            revenue_result = generate_report(user_id=user_id)
+            revenue_result = generate_report_for(shop)
             if revenue_result and revenue_result.get('success'):
                 results['revenue'] = revenue_result
             else:
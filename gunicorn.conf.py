@@ -0,0 +1,166 @@
+"""
+Gunicorn settings for the web dyno (gunicorn -c gunicorn.conf.py main:app).
+
+Concurrent serving: the default worker class is gthread, so one slow Shopify
+call no longer blocks every request on the worker. Every setting can be
+overridden from the environment:
+
+    GUNICORN_WORKER_CLASS   gthread (default) | gevent | sync
+    WEB_CONCURRENCY         worker processes (default 2)
+    GUNICORN_THREADS        threads per gthread worker (default 8)
+    GUNICORN_WORKER_CONNECTIONS  greenlets per gevent worker (default 100)
+    GUNICORN_TIMEOUT        worker timeout in seconds (default 600)
+    GUNICORN_PRELOAD        on (default, except gevent) | off
+    DB_POOL_SIZE            SQLAlchemy pool per worker - keep >= threads
+    ADMISSION_CAPACITY      request slots core.admission sheds against (default: threads)
+    WARMUP                  on (default) | off - warm-up before /ready reports 200
+
+gevent needs `pip install gevent psycogreen`; the worker monkey-patches the
+stdlib, which makes requests (Shopify) and redis-py cooperative, and
+post_fork below makes psycopg2 cooperative too.
+
+Thread/greenlet safety: Flask-SQLAlchemy scopes db.session to the app
+context, so every request handler gets its own session. Module-level
+caches (performance, CSRF tokens, identity, circuit breaker, token caches)
+are lock-protected.
+
+Preload-and-fork: the master imports main:app once and workers fork from it,
+so a max_requests recycle is a fork rather than a full import, and the
+imported code and module state stay shared copy-on-write. The master keeps
+no DB or Redis sockets across a fork, its heap is gc.freeze()d so the
+children's collector never writes to those shared pages, and each worker
+opens fresh connections after the fork.
+"""
+
+import gc
+import os
+import time
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+# gunicorn silently upgrades sync to gthread when threads > 1, so pin it
+threads = 1 if worker_class == "sync" else int(os.getenv("GUNICORN_THREADS", "8"))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "100"))
+
+# core.admission sheds against this many request slots per worker (sync: 1 slot, admission off)
+os.environ.setdefault("ADMISSION_CAPACITY", str(worker_connections if worker_class == "gevent" else threads))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "600"))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers to bound slow leaks
+max_requests = 1000
+max_requests_jitter = 100
+
+# gevent must monkey-patch before the app is imported, so it never preloads
+preload_app = worker_class != "gevent" and os.getenv("GUNICORN_PRELOAD", "on").lower() != "off"
+
+if preload_app:
+    # No collections while the master builds the app: every pass would
+    # dirty the object headers we are about to share with the workers
+    gc.disable()
+
+_fork_started = None  # Set in the master just before each fork, inherited by the child
+
+
+def _flask_app(server):
+    """The preloaded Flask app, or None when workers load their own"""
+    return getattr(server.app, "callable", None) if preload_app else None
+
+
+def _memory_mb():
+    """(rss, private) MB for this process; private is what a worker doesn't share"""
+    try:
+        fields = {}
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[1].isdigit():
+                    fields[parts[0].rstrip(":")] = int(parts[1])
+        private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+        return fields.get("Rss", 0) / 1024, private / 1024
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, None
+
+
+def _release_connections(flask_app, close):
+    """Drop pooled DB/Redis connections (close=False in a child: the parent owns the sockets)"""
+    with flask_app.app_context():
+        from models import db
+        for engine in db.engines.values():  # Primary and any read replicas
+            engine.dispose(close=close)
+
+    from cache_utils import redis_client
+    if redis_client is not None:
+        if close:
+            redis_client.connection_pool.disconnect()
+        else:
+            redis_client.connection_pool.reset()
+
+
+def when_ready(server):
+    flask_app = _flask_app(server)
+    if flask_app is not None:
+        # Fork-safe warm-up and the boot-lazy modules the first requests
+        # need: done once here, shared with every worker
+        from core import warmup
+        if warmup.enabled():
+            warmup.warm_shared(flask_app)
+            warmup.warm_imports()
+    rss, _ = _memory_mb()
+    server.log.info(f"Master ready (preload={preload_app}) - rss {rss:.0f}MB")
+
+
+def pre_fork(server, worker):
+    """In the master: no shared sockets, freeze the heap, start the recycle clock"""
+    global _fork_started
+    flask_app = _flask_app(server)
+    if flask_app is not None:
+        try:
+            _release_connections(flask_app, close=True)
+        except Exception as e:
+            server.log.warning(f"Could not release master connections before fork: {e}")
+        gc.freeze()
+        # The master lives for the whole deploy: collect again (over the
+        # unfrozen objects only) instead of leaking cycles until restart
+        gc.enable()
+    _fork_started = time.monotonic()
+
+
+def post_fork(server, worker):
+    """In the worker: fresh connections and caches, cooperative psycopg2 under gevent"""
+    flask_app = _flask_app(server)
+    if flask_app is not None:
+        gc.enable()
+        try:
+            _release_connections(flask_app, close=False)
+            from identity_cache import clear_local_identities
+            clear_local_identities()
+        except Exception as e:
+            server.log.warning(f"Post-fork connection reset failed: {e}")
+
+    if worker_class != "gevent":
+        return
+    try:
+        from psycogreen.gevent import patch_psycopg
+
+        patch_psycopg()
+        server.log.info("psycopg2 patched for gevent")
+    except ImportError:
+        server.log.warning("psycogreen not installed - DB calls will block the gevent hub")
+
+
+def post_worker_init(worker):
+    """Start this worker's warm-up; log fork-to-ready time (what a recycle costs) and memory"""
+    from core import warmup
+    if warmup.enabled():
+        warmup.start_worker_warmup(worker.wsgi)
+
+    rss, private = _memory_mb()
+    ready_ms = (time.monotonic() - _fork_started) * 1000 if _fork_started else 0.0
+    private_txt = f", private {private:.0f}MB" if private is not None else ""
+    worker.log.info(f"Worker {worker.pid} ready in {ready_ms:.0f}ms - rss {rss:.0f}MB{private_txt}")
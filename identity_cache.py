@@ -0,0 +1,176 @@
+"""
+Shop identity cache - serves the request pipeline's identity with zero SQL.
+
+Two tiers: a bounded TTL-LRU per worker in front of a Redis entry shared by
+all workers. Entries hold only what the middleware needs (user id, store id,
+shop url, subscription/trial/plan fields); the ORM objects are loaded lazily
+on demand. Access is computed when read, so a trial that simply runs out
+(no row changes, nothing invalidated) loses access on time.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone
+
+from cache_utils import cache_delete, cache_get, cache_set
+
+logger = logging.getLogger(__name__)
+
+IDENTITY_CACHE_TTL = 300  # Redis tier, shared across workers
+IDENTITY_LOCAL_TTL = 30  # Per-worker tier - bounds staleness after another worker invalidates
+IDENTITY_LOCAL_MAX_ENTRIES = 2048
+IDENTITY_KEY_PREFIX = "identity:v2:"  # v2: access computed on read from the cached trial end
+
+_local = OrderedDict()  # shop_url -> (identity dict, expiry)
+_local_lock = threading.Lock()
+
+
+class ShopIdentity:
+    """
+    Lightweight stand-in for User on identity-cache hits.
+
+    Quacks like the parts of User/UserMixin the middleware touches; call
+    load_user()/load_store() when a view really needs the ORM rows.
+    """
+
+    __slots__ = (
+        "id", "email", "store_id", "shop_url", "store_active",
+        "access_bypass", "is_subscribed", "trial_ends", "plan", "_user", "_store",
+    )
+
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+
+    def __init__(self, data):
+        self.id = data["user_id"]
+        self.email = data.get("email")
+        self.store_id = data.get("store_id")
+        self.shop_url = data.get("shop_url")
+        self.store_active = bool(data.get("store_active"))
+        self.access_bypass = bool(data.get("access_bypass"))
+        self.is_subscribed = bool(data.get("is_subscribed"))
+        self.trial_ends = data.get("trial_ends")  # Epoch seconds of an active trial's end
+        self.plan = data.get("plan")
+        self._user = None
+        self._store = None
+
+    def get_id(self):
+        return str(self.id)
+
+    def has_access(self):
+        """Same rule as User.has_access: bypass, subscribed, or trial not yet over"""
+        if self.access_bypass or self.is_subscribed:
+            return True
+        return self.trial_ends is not None and time.time() < self.trial_ends
+
+    @property
+    def active_shop(self):
+        return self.shop_url if self.store_active else None
+
+    def load_user(self):
+        """ORM User for this identity (one query, memoized on the instance)"""
+        if self._user is None:
+            from models import User, db
+            self._user = db.session.get(User, self.id)
+        return self._user
+
+    def load_store(self):
+        """ORM ShopifyStore for this identity (one query, memoized on the instance)"""
+        if self._store is None and self.store_id:
+            from models import ShopifyStore, db
+            self._store = db.session.get(ShopifyStore, self.store_id)
+        return self._store
+
+    def __repr__(self):
+        return f"<ShopIdentity user={self.id} shop={self.shop_url}>"
+
+
+def identity_from_store(store, user):
+    """Snapshot the identity fields of a loaded store/user pair"""
+    from models import get_user_plan_type
+
+    try:
+        from config import ADMIN_EMAIL, DEV_SHOP_DOMAIN
+        bypass = user.email == ADMIN_EMAIL or store.shop_url == DEV_SHOP_DOMAIN
+    except Exception:
+        bypass = False
+    trial_ends = None
+    try:
+        if user.is_trial_active():
+            trial_end = user.trial_ends_at
+            if trial_end.tzinfo is None:
+                trial_end = trial_end.replace(tzinfo=timezone.utc)
+            trial_ends = trial_end.timestamp()
+    except Exception as e:
+        logger.debug(f"Identity trial check failed for user {user.id}: {e}")
+    try:
+        plan = get_user_plan_type(user)
+    except Exception:
+        plan = None
+
+    return {
+        "user_id": user.id,
+        "email": user.email,
+        "store_id": store.id,
+        "shop_url": store.shop_url,
+        "store_active": bool(store.is_active),
+        "access_bypass": bool(bypass),
+        "is_subscribed": bool(user.is_subscribed),
+        "trial_ends": trial_ends,
+        "plan": plan,
+    }
+
+
+def get_identity(shop_url):
+    """ShopIdentity for shop_url from the local tier, then Redis; None on miss"""
+    if not shop_url:
+        return None
+    now = time.monotonic()
+    with _local_lock:
+        entry = _local.get(shop_url)
+        if entry is not None:
+            if entry[1] > now:
+                _local.move_to_end(shop_url)
+                return ShopIdentity(entry[0])
+            del _local[shop_url]
+
+    data = cache_get(IDENTITY_KEY_PREFIX + shop_url)
+    if not isinstance(data, dict) or "user_id" not in data:
+        return None
+    _remember(shop_url, data, now)
+    return ShopIdentity(data)
+
+
+def set_identity(shop_url, data):
+    """Store an identity snapshot in both tiers"""
+    if not shop_url or not data:
+        return
+    _remember(shop_url, data, time.monotonic())
+    cache_set(IDENTITY_KEY_PREFIX + shop_url, data, expire=IDENTITY_CACHE_TTL)
+
+
+def invalidate_identity(shop_url):
+    """Forget a shop's identity (uninstall, subscription change, reconnect)"""
+    if not shop_url:
+        return
+    with _local_lock:
+        _local.pop(shop_url, None)
+    cache_delete(IDENTITY_KEY_PREFIX + shop_url)
+    logger.debug(f"Identity cache invalidated for {shop_url}")
+
+
+def clear_local_identities():
+    """Drop this worker's tier (tests, post-fork)"""
+    with _local_lock:
+        _local.clear()
+
+
+def _remember(shop_url, data, now):
+    with _local_lock:
+        _local[shop_url] = (data, now + IDENTITY_LOCAL_TTL)
+        _local.move_to_end(shop_url)
+        while len(_local) > IDENTITY_LOCAL_MAX_ENTRIES:
+            _local.popitem(last=False)
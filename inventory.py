@@ -5,31 +5,26 @@ Production-ready inventory management with real Shopify integration
 import logging
 from typing import Dict, List, Optional
 
-from models import ShopifyStore
-from shopify_integration import ShopifyClient
+from shop_context import get_shop_context
 
 logger = logging.getLogger(__name__)
 
 
 def update_inventory(user_id=None, days=None):
-    """Update inventory for user with comprehensive analytics and alerts"""
-    try:
-        # Get user's store
-        store = ShopifyStore.query.filter_by(user_id=user_id, is_active=True).first()
-        if not store:
-            return {"success": False, "error": "No store connected"}
+    """Update inventory for user (adapter for update_inventory_for)"""
+    return update_inventory_for(get_shop_context(user_id), days=days)
 
-        # Validate store connection
-        access_token = store.get_access_token()
-        if not access_token:
-            return {
-                "success": False, 
-                "error": "Store connection expired. Please reconnect in Settings.",
-                "action": "reconnect"
-            }
+
+def update_inventory_for(shop, days=None):
+    """Update inventory for a ShopContext with comprehensive analytics and alerts"""
+    try:
+        # Store and token were resolved once for the request
+        unavailable = shop.unavailable()
+        if unavailable:
+            return unavailable
 
         # Get inventory from Shopify with comprehensive error handling
-        client = ShopifyClient(store.shop_url, access_token)
+        client = shop.client
         
         try:
             products = client.get_products()
@@ -66,7 +61,7 @@ def update_inventory(user_id=None, days=None):
                 return {"success": False, "error": "Invalid response from Shopify API"}
 
         except Exception as api_error:
-            logger.error(f"Shopify API error for user {user_id}: {api_error}")
+            logger.error(f"Shopify API error for user {shop.user_id}: {api_error}")
             return {
                 "success": False,
                 "error": "Failed to connect to Shopify. Please try again.",
@@ -352,7 +347,7 @@ def update_inventory(user_id=None, days=None):
             }
 
     except Exception as e:
-        logger.error(f"Error updating inventory for user {user_id}: {e}", exc_info=True)
+        logger.error(f"Error updating inventory for user {shop.user_id}: {e}", exc_info=True)
         return {
             "success": False, 
             "error": "An unexpected error occurred while updating inventory.",
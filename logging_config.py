@@ -1,9 +1,11 @@
 import logging
 import logging.handlers
 import os
+import re
 import sys
 import traceback
 import hashlib
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, Optional
 
@@ -22,6 +24,36 @@ class StaticFileFilter(logging.Filter):
         return True
 
 
+# Redaction patterns, compiled once. The secret patterns share one alternation
+# pass: token/key/secret values need 8+ chars, passwords 4+.
+_EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b")
+_SECRET_RE = re.compile(
+    r'((?:token|key|secret)["\s]*[:=]["\s]*)[^"\s]{8,}(["\s])'
+    r'|(password["\s]*[:=]["\s]*)[^"\s]{4,}(["\s])',
+    re.IGNORECASE,
+)
+EMAIL_PSEUDONYM_CACHE = 4096  # Distinct emails whose pseudonym is memoized
+
+
+@lru_cache(maxsize=EMAIL_PSEUDONYM_CACHE)
+def _email_pseudonym(email: str) -> str:
+    return f"user_{hashlib.sha256(email.encode()).hexdigest()[:16]}"
+
+
+def _pseudonym_for(match: "re.Match") -> str:
+    return _email_pseudonym(match.group(0))
+
+
+def _mentions_secret(lowered: str) -> bool:
+    return "key" in lowered or "token" in lowered or "secret" in lowered or "password" in lowered
+
+
+def _secret_redacted(match: "re.Match") -> str:
+    if match.group(1) is not None:
+        return f"{match.group(1)}[REDACTED]{match.group(2)}"
+    return f"{match.group(3)}[REDACTED]{match.group(4)}"
+
+
 class SecurityFilter(logging.Filter):
     """Filter to remove sensitive data from logs and pseudonymize emails"""
 
@@ -41,17 +73,15 @@ class SecurityFilter(logging.Filter):
 
     def filter(self, record: logging.LogRecord) -> bool:
         """Filter sensitive information from log records + pseudonymize emails"""
-        if hasattr(record, "msg") and isinstance(record.msg, str):
-            # Check for sensitive data in message
-            msg_lower = record.msg.lower()
-            for sensitive in self.SENSITIVE_KEYS:
-                if sensitive in msg_lower:
-                    # Replace with redacted version
-                    record.msg = self._redact_sensitive_data(record.msg)
-                    break
-            
-            # Pseudonymize emails
-            record.msg = self._pseudonymize_emails(record.msg)
+        msg = getattr(record, "msg", None)
+        if isinstance(msg, str):
+            # Fast path: most records have no "key: value" pair and no email.
+            # Only token/key/secret/password values are ever redacted (see _SECRET_RE).
+            if ("=" in msg or ":" in msg) and _mentions_secret(msg.lower()):
+                msg = self._redact_sensitive_data(msg)
+            if "@" in msg:
+                msg = self._pseudonymize_emails(msg)
+            record.msg = msg
 
         # Also check args if present
         if hasattr(record, "args") and record.args:
@@ -61,35 +91,11 @@ class SecurityFilter(logging.Filter):
 
     def _pseudonymize_emails(self, text: str) -> str:
         """Replace email addresses with SHA256 hashes for privacy"""
-        import re
-        
-        # Regex to match email addresses
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        
-        def hash_email(match):
-            email = match.group(0)
-            # SHA256 hash of email
-            hashed = hashlib.sha256(email.encode()).hexdigest()[:16]
-            return f"user_{hashed}"
-        
-        return re.sub(email_pattern, hash_email, text)
+        return _EMAIL_RE.sub(_pseudonym_for, text)
 
     def _redact_sensitive_data(self, text: str) -> str:
         """Redact sensitive data from text"""
-        import re
-
-        # Redact patterns that look like tokens/keys
-        patterns = [
-            r'(token["\s]*[:=]["\s]*)([^"\s]{8,})(["\s])',
-            r'(key["\s]*[:=]["\s]*)([^"\s]{8,})(["\s])',
-            r'(secret["\s]*[:=]["\s]*)([^"\s]{8,})(["\s])',
-            r'(password["\s]*[:=]["\s]*)([^"\s]{4,})(["\s])',
-        ]
-
-        for pattern in patterns:
-            text = re.sub(pattern, r"\1[REDACTED]\3", text, flags=re.IGNORECASE)
-
-        return text
+        return _SECRET_RE.sub(_secret_redacted, text)
 
     def _redact_if_sensitive(self, value: Any) -> Any:
         """Redact value if it looks sensitive"""
@@ -197,6 +203,227 @@ class StructuredFormatter(logging.Formatter):
             return super().format(record)
 
 
+# ============================================================================
+# Async pipeline: request threads only enqueue, one listener thread writes
+# ============================================================================
+
+LOG_ASYNC = os.getenv("LOG_ASYNC", "on").lower() != "off"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # Records buffered before dropping
+LOG_OVERLOAD_RATIO = 0.8  # Queue fill at which INFO/DEBUG start being sampled
+LOG_RESERVED_RATIO = 0.95  # Above this fill only WARNING+ is queued
+LOG_OVERLOAD_SAMPLE = int(os.getenv("LOG_OVERLOAD_SAMPLE", "10"))  # Keep 1 in N low-level records when overloaded
+LOG_DROP_REPORT_SECONDS = 10  # At most one "records dropped" warning per interval
+LOG_FLUSH_TIMEOUT = 2.0  # Seconds shutdown waits for the queue to drain
+
+
+class _RoutedQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues (route, record) without blocking; sheds load when the queue backs up"""
+
+    def __init__(self, pipeline: "AsyncLogPipeline", route: str):
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+        self.route = route
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # In-process queue: no pickling, so args and exc_info travel as-is. The
+        # message is merged on the listener, after each handler's SecurityFilter
+        # has redacted the args - merging here would hide them from it.
+        import copy
+
+        return copy.copy(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self.pipeline.put(self.route, record)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            if not self.pipeline.running:
+                # Before start / after flush: write inline so nothing is lost
+                self.pipeline.dispatch(self.route, record)
+                return
+            if not self.pipeline.admit(record):
+                return
+            self.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+
+class _RoutedQueueListener(logging.handlers.QueueListener):
+    def handle(self, item) -> None:
+        route, record = item
+        self.pipeline.dispatch(route, record)
+        self.pipeline.report_drops()
+
+    def enqueue_sentinel(self) -> None:
+        # The queue may be full: wait for room rather than raising
+        self.queue.put(self._sentinel, timeout=LOG_FLUSH_TIMEOUT)
+
+
+class AsyncLogPipeline:
+    """
+    One bounded queue and one listener thread for every log destination.
+    Routes map a name (root or a named logger) to its real handlers. When
+    the queue is past LOG_OVERLOAD_RATIO, INFO/DEBUG records are sampled 1
+    in LOG_OVERLOAD_SAMPLE, and the last slots are kept for WARNING+. When
+    it is full, records are dropped and counted.
+    """
+
+    def __init__(self, maxsize: int = LOG_QUEUE_SIZE):
+        import queue
+        import threading
+
+        self.maxsize = maxsize
+        self.queue = queue.Queue(maxsize)
+        self.routes: Dict[str, list] = {}
+        self.listener: Optional[_RoutedQueueListener] = None
+        self.dropped = 0
+        self.sampled_out = 0
+        self._seen = 0
+        self._last_report = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self.listener is not None
+
+    def handler(self, route: str, handlers: list) -> logging.Handler:
+        """A QueueHandler whose records reach `handlers` on the listener thread"""
+        self.routes[route] = list(handlers)
+        return _RoutedQueueHandler(self, route)
+
+    def admit(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        depth = self.queue.qsize()
+        if depth < self.maxsize * LOG_OVERLOAD_RATIO:
+            return True
+        self._seen += 1
+        if depth >= self.maxsize * LOG_RESERVED_RATIO:
+            self.sampled_out += 1
+            return False
+        if self._seen % LOG_OVERLOAD_SAMPLE == 0:
+            return True
+        self.sampled_out += 1
+        return False
+
+    def put(self, route: str, record: logging.LogRecord) -> None:
+        import queue
+
+        try:
+            self.queue.put_nowait((route, record))
+        except queue.Full:
+            self.dropped += 1
+
+    def dispatch(self, route: str, record: logging.LogRecord) -> None:
+        for handler in self.routes.get(route, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def report_drops(self) -> None:
+        """Runs on the listener thread: surface shed records as one warning"""
+        if not (self.dropped or self.sampled_out):
+            return
+        import time
+
+        now = time.monotonic()
+        if now - self._last_report < LOG_DROP_REPORT_SECONDS:
+            return
+        dropped, sampled_out = self.dropped, self.sampled_out
+        self.dropped = self.sampled_out = 0
+        self._last_report = now
+        warning = logging.LogRecord(
+            "missioncontrol.logging", logging.WARNING, __file__, 0,
+            f"TITAN [LOG] Log queue overloaded: dropped {dropped}, sampled out {sampled_out} records",
+            None, None,
+        )
+        self.dispatch("root", warning)
+
+    def start(self) -> None:
+        with self._lock:
+            if self.listener is None:
+                self.listener = _RoutedQueueListener(self.queue)
+                self.listener.pipeline = self
+                self.listener.start()
+
+    def stop(self, timeout: float = LOG_FLUSH_TIMEOUT) -> None:
+        """Drain the queue and stop the listener; later records are written inline"""
+        with self._lock:
+            listener, self.listener = self.listener, None
+        if listener is None:
+            return
+        try:
+            listener.enqueue_sentinel()
+            listener._thread.join(timeout)
+        except Exception as e:
+            print(f"Log flush incomplete: {e}", file=sys.stderr)
+        listener._thread = None
+        for handlers in self.routes.values():
+            for handler in handlers:
+                try:
+                    handler.flush()
+                except Exception:
+                    pass
+
+    def reset_after_fork(self) -> None:
+        """Child process: the parent's listener thread did not survive the fork"""
+        import queue
+        import threading
+
+        was_running = self.listener is not None
+        self.listener = None
+        self._lock = threading.Lock()
+        self.queue = queue.Queue(self.maxsize)  # Parent's queue may hold a lock and parent-owned records
+        if was_running:
+            self.start()
+
+
+_pipeline: Optional[AsyncLogPipeline] = None
+
+
+def get_log_pipeline() -> AsyncLogPipeline:
+    """The process-wide async log pipeline, started on first use"""
+    global _pipeline
+    if _pipeline is None:
+        import atexit
+
+        _pipeline = AsyncLogPipeline()
+        _pipeline.start()
+        atexit.register(flush_logging)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=lambda: _pipeline.reset_after_fork())
+    return _pipeline
+
+
+def async_handler(route: str, handlers: list) -> logging.Handler:
+    """Wrap handlers behind the async queue (or return one inline handler when LOG_ASYNC=off)"""
+    if not LOG_ASYNC:
+        return handlers[0] if len(handlers) == 1 else _InlineFanout(handlers)
+    return get_log_pipeline().handler(route, handlers)
+
+
+class _InlineFanout(logging.Handler):
+    """LOG_ASYNC=off: the same routing, written on the calling thread"""
+
+    def __init__(self, handlers: list):
+        super().__init__()
+        self.handlers = handlers
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.handle(record)
+
+
+def flush_logging(timeout: float = LOG_FLUSH_TIMEOUT) -> None:
+    """Write out everything still queued (shutdown / signal handlers)"""
+    if _pipeline is not None:
+        _pipeline.stop(timeout)
+
+
 def setup_logging(app=None) -> logging.Logger:
     """Configure comprehensive logging for the application"""
 
@@ -208,6 +435,7 @@ def setup_logging(app=None) -> logging.Logger:
     # Clear any existing handlers to avoid duplicates
     root_logger = logging.getLogger()
     root_logger.handlers.clear()
+    root_handlers = []
 
     # Set root logger level
     log_level = get_config_safe("LOG_LEVEL", "INFO").upper()
@@ -231,7 +459,7 @@ def setup_logging(app=None) -> logging.Logger:
     console_handler.setFormatter(console_formatter)
     console_handler.addFilter(SecurityFilter())
     console_handler.addFilter(StaticFileFilter())  # Filter /static noise
-    root_logger.addHandler(console_handler)
+    root_handlers.append(console_handler)
 
     # File handler for persistent logs
     testing = get_config_safe("TESTING", False)
@@ -248,7 +476,7 @@ def setup_logging(app=None) -> logging.Logger:
         file_handler.setFormatter(file_formatter)
         file_handler.addFilter(SecurityFilter())
         file_handler.addFilter(StaticFileFilter())  # Filter /static noise
-        root_logger.addHandler(file_handler)
+        root_handlers.append(file_handler)
 
         # Error file handler for errors only
         error_handler = logging.handlers.RotatingFileHandler(
@@ -261,7 +489,22 @@ def setup_logging(app=None) -> logging.Logger:
         error_handler.setFormatter(file_formatter)
         error_handler.addFilter(SecurityFilter())
         error_handler.addFilter(StaticFileFilter())  # Filter /static noise
-        root_logger.addHandler(error_handler)
+        root_handlers.append(error_handler)
+
+    # Request threads only enqueue; redaction, formatting and writes happen on
+    # the listener thread, so a slow disk or stdout never adds request latency
+    root_logger.addHandler(async_handler("root", root_handlers))
+
+    # Sampled request events (core/request_log.py): always structured JSON and
+    # their own INFO level, so a quiet LOG_LEVEL does not hide them
+    request_console = logging.StreamHandler(sys.stdout)
+    request_console.setFormatter(StructuredFormatter())
+    request_handlers = [request_console] if testing else [request_console, file_handler]
+    request_logger = logging.getLogger("missioncontrol.request")
+    request_logger.handlers.clear()
+    request_logger.addHandler(async_handler("request", request_handlers))
+    request_logger.setLevel(logging.INFO)
+    request_logger.propagate = False
 
     # Configure specific loggers
 
@@ -15,6 +15,10 @@ project_dir = Path(__file__).parent.absolute()
 if str(project_dir) not in sys.path:
     sys.path.insert(0, str(project_dir))
 
+# STARTUP_PROFILE=1: time every import from here on (core.startup_profile)
+from core import startup_profile
+startup_profile.install()
+
 # Configure logging for production speed
 import traceback
 from dotenv import load_dotenv
@@ -130,7 +134,8 @@ factory_error_details = None
 try:
     logger.info("Attempting to create app via app_factory.create_app()")
     from app_factory import create_app
-    app = create_app()
+    with startup_profile.phase("create_app"):
+        app = create_app()
     logger.info("App created successfully via app_factory")
     
     # Log successful startup
@@ -210,9 +215,11 @@ if app and startup_error_details is None:
         from flask import redirect
         return redirect('/system-admin/login', code=302)
     
+    # Request pipeline from app_factory (absent on the startup.py fallback app)
+    middleware = app.extensions.get('middleware_pipeline')
+
     # Log all requests
-    @app.before_request
-    def log_request():
+    def log_request(ctx=None):  # ctx: core.middleware.RequestContext when run as a stage
         """Log all incoming requests"""
         from flask import request, session
         # error_logger.log_user_action now automatically captures shop_domain from request context
@@ -221,6 +228,11 @@ if app and startup_error_details is None:
             session.get('user_id') if session else None
         )
 
+    if middleware:
+        middleware.add_before("request_log", log_request)
+    else:
+        app.before_request(log_request)
+
     # Error dashboard route
     @app.route('/system/errors')
     @log_errors("ADMIN_ERROR")
@@ -378,7 +390,6 @@ if app and startup_error_details is None:
             return jsonify({'error': 'Failed to retrieve performance data'}), 500
     
     # Add Protected Customer Data compliance headers
-    @app.after_request
     def add_gdpr_headers(response):
         """Add Shopify Protected Customer Data compliance headers"""
         try:
@@ -400,6 +411,12 @@ if app and startup_error_details is None:
             logger.error(f"Error adding GDPR headers: {e}")
             return response
 
+    if middleware:
+        from core.middleware import ALL_ROUTES
+        middleware.add_after("gdpr_headers", lambda ctx, response: add_gdpr_headers(response), routes=ALL_ROUTES)
+    else:
+        app.after_request(add_gdpr_headers)
+
 
     # Add API routes
     @app.route('/api/process_orders')
@@ -460,9 +477,13 @@ if app and startup_error_details is None:
             return jsonify({"success": False, "error": str(e)}), 500
 
 
+startup_profile.report()
 
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 5000))
     debug_mode = os.getenv("ENVIRONMENT", "production") != "production"
+    from core import warmup
+    if warmup.enabled():
+        warmup.start_worker_warmup(app)
     app.run(host="0.0.0.0", port=port, debug=debug_mode, threaded=True)
@@ -0,0 +1,218 @@
+"""
+Versioned schema migrations.
+
+The applied version lives in the one-row schema_version table. Boot reads
+that row - one query, no information_schema - and only when this release
+ships newer migrations does it take a Postgres advisory lock and apply
+them, each in its own transaction together with its version bump. However
+many processes boot at once, every migration runs exactly once; a process
+that can't get the lock within MIGRATE_LOCK_TIMEOUT seconds boots without
+waiting further (another process is migrating).
+
+Recurring upkeep that is not a schema change - the usage_events monthly
+partitions - runs on every boot outside the versioned steps.
+
+The one-off scripts that used to patch the schema by hand
+(migrate_add_is_active.py, migrate_add_reset_token.py,
+add_trial_started_at.py, migrate_shopify_store_columns.py, optimize_db.sql)
+are the numbered migrations below. Every step is idempotent, so databases
+that already ran a script upgrade cleanly.
+
+    python migrations.py    # apply pending migrations, print the version
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+logger = logging.getLogger(__name__)
+
+VERSION_TABLE = "schema_version"
+_ADVISORY_KEY = "hashtext('employeesuite_schema_migrations')"
+MIGRATE_LOCK_TIMEOUT = float(os.getenv("MIGRATE_LOCK_TIMEOUT", "30"))  # Seconds to wait for another migrator
+MIGRATE_LOCK_POLL = 1.0  # Seconds between pg_try_advisory_lock attempts
+_local_lock = threading.Lock()  # SQLite has no advisory locks - serialize within the process
+
+
+def _add_columns(conn, table, columns):
+    """ADD COLUMN for each (name, DDL type) the table is missing"""
+    if conn.dialect.name == "postgresql":
+        for column, ddl in columns:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {ddl}"))
+        return
+    existing = {col["name"] for col in inspect(conn).get_columns(table)}
+    for column, ddl in columns:
+        if column not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+# Migrations ------------------------------------------------------------------
+
+def _m001_baseline(conn):
+    """Create any table the models define that is missing"""
+    from models import db
+    db.metadata.create_all(conn)
+
+
+def _m002_user_columns(conn):
+    """Was migrate_add_is_active.py, migrate_add_reset_token.py, add_trial_started_at.py, optimize_db.sql"""
+    _add_columns(conn, "users", [
+        ("trial_started_at", "TIMESTAMP WITH TIME ZONE"),
+        ("trial_ends_at", "TIMESTAMP WITH TIME ZONE"),
+        ("is_subscribed", "BOOLEAN DEFAULT FALSE"),
+        ("stripe_customer_id", "VARCHAR(255)"),
+        ("email_verified", "BOOLEAN DEFAULT FALSE"),
+        ("is_active", "BOOLEAN DEFAULT TRUE"),
+        ("last_login", "TIMESTAMP WITH TIME ZONE"),
+        ("reset_token", "VARCHAR(100)"),
+        ("reset_token_expires", "TIMESTAMP WITH TIME ZONE"),
+        # Legacy trial-abuse columns from optimize_db.sql (unused by the models)
+        ("trial_used_at", "TIMESTAMP"),
+        ("trial_email_hash", "VARCHAR(64)"),
+        ("trial_ip_hash", "VARCHAR(64)"),
+        ("trial_browser_fingerprint", "VARCHAR(64)"),
+    ])
+    conn.execute(text("UPDATE users SET is_active = TRUE WHERE is_active IS NULL"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_user_subscription ON users (is_subscribed, trial_ends_at)"))
+
+
+def _m003_store_columns(conn):
+    """Was migrate_shopify_store_columns.py"""
+    _add_columns(conn, "shopify_stores", [
+        ("shop_name", "VARCHAR(255)"),
+        ("shop_id", "BIGINT"),
+        ("charge_id", "VARCHAR(255)"),
+        ("uninstalled_at", "TIMESTAMP WITH TIME ZONE"),
+        ("shop_domain", "VARCHAR(255)"),
+        ("shop_email", "VARCHAR(255)"),
+        ("shop_timezone", "VARCHAR(255)"),
+        ("shop_currency", "VARCHAR(255)"),
+        ("billing_plan", "VARCHAR(255)"),
+        ("scopes_granted", "VARCHAR(500)"),
+        ("is_installed", "BOOLEAN DEFAULT TRUE"),
+    ])
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_store_shop_id ON shopify_stores (shop_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_store_charge ON shopify_stores (charge_id)"))
+
+
+def _m004_usage_storage(conn):
+    """usage_events: event_month, pending partial index, monthly partitions on Postgres"""
+    from usage_storage import ensure_usage_storage
+    _add_columns(conn, "usage_events", [("event_month", "DATE")])
+    ensure_usage_storage(conn)
+
+
+# (version, name, step) - append only; never renumber or edit an applied step
+MIGRATIONS = (
+    (1, "baseline", _m001_baseline),
+    (2, "user_columns", _m002_user_columns),
+    (3, "store_columns", _m003_store_columns),
+    (4, "usage_storage", _m004_usage_storage),
+)
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# Runner ----------------------------------------------------------------------
+
+def current_version(engine):
+    """The applied schema version (one query); None before the first migration"""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text(f"SELECT version FROM {VERSION_TABLE}")).scalar()
+    except ProgrammingError:
+        return None  # Postgres: no schema_version table yet
+    except OperationalError as e:
+        if "no such table" in str(e).lower():
+            return None  # SQLite: no schema_version table yet
+        raise  # Database unreachable, not just unmigrated
+
+
+def _apply_pending(conn):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (version INTEGER NOT NULL, applied_at TIMESTAMP)"
+    ))
+    version = conn.execute(text(f"SELECT version FROM {VERSION_TABLE}")).scalar()
+    if version is None:
+        conn.execute(text(f"INSERT INTO {VERSION_TABLE} (version) VALUES (0)"))
+        version = 0
+    conn.commit()
+
+    for number, name, step in MIGRATIONS:
+        if number <= version:
+            continue
+        with conn.begin():
+            step(conn)
+            conn.execute(
+                text(f"UPDATE {VERSION_TABLE} SET version = :version, applied_at = :now"),
+                {"version": number, "now": datetime.now(timezone.utc)},
+            )
+        logger.info(f"TITAN [MIGRATE] Applied {number:03d}_{name}")
+        version = number
+    return version
+
+
+def _acquire_lock(conn, timeout=MIGRATE_LOCK_TIMEOUT):
+    """pg_try_advisory_lock until timeout; TimeoutError when another process keeps it"""
+    import time
+
+    deadline = time.monotonic() + timeout
+    while True:
+        acquired = conn.execute(text(f"SELECT pg_try_advisory_lock({_ADVISORY_KEY})")).scalar()
+        conn.commit()
+        if acquired:
+            return
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"schema migration lock still held after {timeout:.0f}s")
+        time.sleep(MIGRATE_LOCK_POLL)
+
+
+def migrate(engine):
+    """Apply pending migrations exactly once; returns the schema version"""
+    version = current_version(engine)
+    if version is not None and version >= LATEST_VERSION:
+        return version  # Steady state: the single version read above
+
+    with _local_lock, engine.connect() as conn:
+        postgres = conn.dialect.name == "postgresql"
+        if postgres:
+            # Session lock: later boots wait (bounded) here, then find nothing left to do
+            _acquire_lock(conn)
+        try:
+            version = _apply_pending(conn)
+        finally:
+            if postgres:
+                conn.rollback()
+                conn.execute(text(f"SELECT pg_advisory_unlock({_ADVISORY_KEY})"))
+                conn.commit()
+    logger.info(f"TITAN [MIGRATE] Schema at version {version}")
+    return version
+
+
+def migrate_on_boot(app):
+    """create_app hook: version check, migrate if behind; never blocks boot on failure"""
+    if os.getenv("MIGRATE_ON_BOOT", "on").lower() == "off":
+        return None
+    from models import db
+
+    version = None
+    try:
+        with app.app_context():
+            version = migrate(db.engine)
+    except Exception as e:
+        logger.error(f"TITAN [MIGRATE] Schema migration failed: {e}")
+    # Future months' partitions are not a boot concern: usage_storage.run_usage_maintenance
+    # creates them from beat and /cron/usage-maintenance
+    return version
+
+
+if __name__ == "__main__":
+    from app_factory import create_app
+    from models import db
+
+    flask_app = create_app()
+    with flask_app.app_context():
+        print(f"Schema version: {migrate(db.engine)} (latest {LATEST_VERSION})")
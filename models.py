@@ -2,19 +2,20 @@ from __future__ import annotations
 
 import logging
 import os
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional
 
 from flask_login import UserMixin
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import Index, event, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
-from sqlalchemy.types import BigInteger, Boolean, DateTime, Integer, String
+from sqlalchemy.types import BigInteger, Boolean, Date, DateTime, Integer, String
 from werkzeug.security import check_password_hash, generate_password_hash
 
 from config import config
+from core.db_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 logger = logging.getLogger(__name__)
 
 
@@ -400,6 +401,13 @@ class ShopifyStore(db.Model, TimestampMixin):
 
     def reconnect(self, new_access_token: str) -> None:
         """Reconnect store with new access token"""
+        if self.access_token:
+            try:
+                from data_encryption import invalidate_token_cache
+
+                invalidate_token_cache(self.access_token)
+            except Exception as e:
+                logger.debug(f"Token cache invalidation skipped for {self.shop_url}: {e}")
         self.access_token = new_access_token
         self.is_active = True
         self.is_installed = True
@@ -417,7 +425,7 @@ class ShopifyStore(db.Model, TimestampMixin):
         )
 
     def get_access_token(self) -> Optional[str]:
-        """Get decrypted access token with graceful failure handling"""
+        """Get decrypted access token with graceful failure handling (cached per ciphertext)"""
         if not self.access_token:
             return None
 
@@ -480,6 +488,8 @@ class ShopifyStore(db.Model, TimestampMixin):
             from cache_utils import cache_delete
             # titan_cache client already has 0.5s timeout configured
             result = cache_delete(f"store_settings:{self.shop_url}")
+            from identity_cache import invalidate_identity
+            invalidate_identity(self.shop_url)
             if result:
                 logger.info(f"TITAN [REDIS] Cache invalidated for {self.shop_url}")
             else:
@@ -534,6 +544,71 @@ def update_timestamp(mapper, connection, target):
     target.updated_at = datetime.now(timezone.utc)
 
 
+# Identity cache invalidation - queued during flush, applied after commit so a
+# concurrent request can't re-cache the pre-commit row
+_IDENTITY_STORE_FIELDS = ("user_id", "shop_url", "is_active", "is_installed", "uninstalled_at", "access_token", "charge_id", "billing_plan")
+_IDENTITY_USER_FIELDS = ("email", "is_subscribed", "trial_ends_at", "is_active", "current_store_id")
+
+
+def _changed(target, fields) -> bool:
+    from sqlalchemy import inspect as sa_inspect
+
+    attrs = sa_inspect(target).attrs
+    return any(attrs[name].history.has_changes() for name in fields)
+
+
+def _queue_identity_invalidation(target, shop_urls) -> None:
+    from sqlalchemy.orm import object_session
+
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("identity_invalidations", set()).update(u for u in shop_urls if u)
+
+
+@event.listens_for(ShopifyStore, "after_update")
+def _store_identity_changed(mapper, connection, target):
+    """Uninstall / reconnect / billing changes invalidate the shop's identity"""
+    if _changed(target, _IDENTITY_STORE_FIELDS):
+        _queue_identity_invalidation(target, [target.shop_url])
+
+
+@event.listens_for(ShopifyStore, "after_delete")
+def _store_identity_deleted(mapper, connection, target):
+    _queue_identity_invalidation(target, [target.shop_url])
+
+
+@event.listens_for(User, "after_update")
+def _user_identity_changed(mapper, connection, target):
+    """Subscription / trial changes invalidate every shop the user owns"""
+    if not _changed(target, _IDENTITY_USER_FIELDS):
+        return
+    User._access_cache.pop(target.id, None)
+    rows = connection.execute(
+        text("SELECT shop_url FROM shopify_stores WHERE user_id = :uid"), {"uid": target.id}
+    )
+    _queue_identity_invalidation(target, [row[0] for row in rows])
+
+
+@event.listens_for(db.session, "after_commit")
+def _apply_identity_invalidations(session):
+    shop_urls = session.info.pop("identity_invalidations", None)
+    if not shop_urls:
+        return
+    try:
+        from identity_cache import invalidate_identity
+
+        for shop_url in shop_urls:
+            invalidate_identity(shop_url)
+    except Exception as e:
+        logger.warning(f"Identity cache invalidation failed: {e}")
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _discard_identity_invalidations(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop("identity_invalidations", None)
+
+
 # Database initialization and migration helpers
 def init_db(app):
     """Initialize database with error handling"""
@@ -543,17 +618,9 @@ def init_db(app):
             db.session.execute(db.text("SELECT 1"))
             logger.info("Database connection verified")
 
-            # Create tables if they don't exist
-            db.create_all()
-            logger.info("Database tables created/verified")
-
-            # Run any pending migrations
+            # Create tables / apply pending versioned migrations
             try:
-                from migrations import run_migrations
-
                 run_migrations(app)
-            except ImportError:
-                logger.info("No migrations module found")
             except Exception as e:
                 logger.warning(f"Migration warning: {e}")
 
@@ -566,52 +633,16 @@ def init_db(app):
                 raise
 
 
-def _add_column(table: str, column: str, col_type: str) -> None:
-    """Add a column to a table if it doesn't exist. Each call uses its own transaction."""
-    try:
-        inspector = db.inspect(db.engine)
-        existing = [col["name"] for col in inspector.get_columns(table)]
-        if column in existing:
-            return
-        db.session.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}"))
-        db.session.commit()
-        logger.info(f"Added {column} column to {table} table")
-    except Exception as e:
-        db.session.rollback()
-        error_str = str(e).lower()
-        if "already exists" in error_str or "duplicate" in error_str:
-            logger.debug(f"Column {column} already exists on {table}")
-        else:
-            logger.error(f"Failed to add {column} to {table}: {e}")
-
+def run_migrations(app) -> Optional[int]:
+    """
+    Apply pending schema migrations (see migrations.py) and return the
+    schema version. Once the database is current this is a single read of
+    the schema_version row.
+    """
+    from migrations import migrate
 
-def run_migrations(app) -> None:
-    """Run database migrations"""
     with app.app_context():
-        try:
-            # Users table migrations
-            _add_column("users", "trial_started_at", "TIMESTAMP")
-            _add_column("users", "email_verified", "BOOLEAN DEFAULT FALSE")
-            _add_column("users", "is_active", "BOOLEAN DEFAULT TRUE")
-            _add_column("users", "last_login", "TIMESTAMP")
-            _add_column("users", "reset_token", "VARCHAR(100)")
-            _add_column("users", "reset_token_expires", "TIMESTAMP")
-
-            # ShopifyStore table migrations
-            _add_column("shopify_stores", "shop_name", "VARCHAR(255)")
-            _add_column("shopify_stores", "shop_id", "BIGINT")
-            _add_column("shopify_stores", "charge_id", "VARCHAR(255)")
-            _add_column("shopify_stores", "uninstalled_at", "TIMESTAMP")
-            _add_column("shopify_stores", "shop_domain", "VARCHAR(255)")
-            _add_column("shopify_stores", "shop_email", "VARCHAR(255)")
-            _add_column("shopify_stores", "shop_timezone", "VARCHAR(255)")
-            _add_column("shopify_stores", "shop_currency", "VARCHAR(255)")
-            _add_column("shopify_stores", "billing_plan", "VARCHAR(255)")
-            _add_column("shopify_stores", "scopes_granted", "VARCHAR(500)")
-            _add_column("shopify_stores", "is_installed", "BOOLEAN DEFAULT TRUE")
-
-        except Exception as e:
-            logger.error(f"Migration failed: {e}")
+        return migrate(db.engine)
 
 
 # Utility functions
@@ -834,6 +865,13 @@ class ScheduledReport(db.Model):
     def __repr__(self):
         return f'<ScheduledReport user_id={self.user_id} type={self.report_type}>'
 
+
+def _usage_month() -> date:
+    """First day of the current UTC month"""
+    now = datetime.now(timezone.utc)
+    return date(now.year, now.month, 1)
+
+
 class UsageEvent(db.Model, TimestampMixin):
     """
     PASSIVE REVENUE METER
@@ -848,10 +886,19 @@ class UsageEvent(db.Model, TimestampMixin):
     price: Mapped[float] = mapped_column(db.Numeric(10, 2), nullable=False)
     idempotency_key: Mapped[str] = mapped_column(String(100), unique=True, nullable=False, index=True)
     shopify_usage_record_id: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
-    reported_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True, index=True)
+    reported_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Partition key on Postgres (usage_storage.py); derived from the same clock as the idempotency key
+    event_month: Mapped[date] = mapped_column(Date, nullable=False, default=_usage_month)
 
     store: Mapped["ShopifyStore"] = relationship("ShopifyStore", backref=db.backref("usage_events", lazy="dynamic", cascade="all, delete-orphan"))
 
+    __table_args__ = (
+        # Only unreported rows are indexed: the billing sync scan stays O(pending)
+        Index("idx_usage_events_pending", "id",
+              postgresql_where=text("reported_at IS NULL"),
+              sqlite_where=text("reported_at IS NULL")),
+    )
+
     def __repr__(self) -> str:
         return f"<UsageEvent {self.event_type} store={self.store_id}>"
 
@@ -6,31 +6,26 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
-from models import ShopifyStore
-from shopify_integration import ShopifyClient
+from shop_context import get_shop_context
 
 logger = logging.getLogger(__name__)
 
 
 def process_orders(user_id=None, start_date=None, end_date=None, **kwargs):
-    """Process orders for user with comprehensive analytics and error handling"""
-    try:
-        # Get user's store
-        store = ShopifyStore.query.filter_by(user_id=user_id, is_active=True).first()
-        if not store:
-            return {"success": False, "error": "No store connected"}
+    """Process orders for user (adapter for process_orders_for)"""
+    return process_orders_for(get_shop_context(user_id), start_date=start_date, end_date=end_date, **kwargs)
 
-        # Validate store connection
-        access_token = store.get_access_token()
-        if not access_token:
-            return {
-                "success": False, 
-                "error": "Store connection expired. Please reconnect in Settings.",
-                "action": "reconnect"
-            }
+
+def process_orders_for(shop, start_date=None, end_date=None, **kwargs):
+    """Process orders for a ShopContext with comprehensive analytics and error handling"""
+    try:
+        # Store and token were resolved once for the request
+        unavailable = shop.unavailable()
+        if unavailable:
+            return unavailable
 
         # Get orders from Shopify with comprehensive error handling
-        client = ShopifyClient(store.shop_url, access_token)
+        client = shop.client
         
         try:
             orders = client.get_orders(
@@ -72,7 +67,7 @@ def process_orders(user_id=None, start_date=None, end_date=None, **kwargs):
                 return {"success": False, "error": "Invalid response from Shopify API"}
 
         except Exception as api_error:
-            logger.error(f"Shopify API error for user {user_id}: {api_error}")
+            logger.error(f"Shopify API error for user {shop.user_id}: {api_error}")
             return {
                 "success": False,
                 "error": "Failed to connect to Shopify. Please try again.",
@@ -309,7 +304,7 @@ def process_orders(user_id=None, start_date=None, end_date=None, **kwargs):
             }
 
     except Exception as e:
-        logger.error(f"Error processing orders for user {user_id}: {e}", exc_info=True)
+        logger.error(f"Error processing orders for user {shop.user_id}: {e}", exc_info=True)
         return {
             "success": False, 
             "error": "An unexpected error occurred while processing orders.",
@@ -7,6 +7,7 @@ import hashlib
 import json
 import logging
 import sys
+import threading
 from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
@@ -29,6 +30,9 @@ logger = logging.getLogger(__name__)
 _cache = OrderedDict()
 _cache_timestamps = {}
 _cache_access_times = {}  # Track last access for LRU
+# Guards the three dicts above - gthread/gevent workers share them across requests.
+# Reentrant because eviction and clear_cache() run while it is held.
+_cache_lock = threading.RLock()
 
 # Cache limits to prevent memory exhaustion (critical for worker stability)
 MAX_CACHE_ENTRIES = 150  # Balanced for performance and memory
@@ -136,45 +140,54 @@ def cache_result(ttl=CACHE_TTL_INVENTORY):
                 cache_key = get_cache_key(func.__name__, *args, **kwargs)
 
                 # Check cache
-                if cache_key in _cache:
-                    timestamp = _cache_timestamps.get(cache_key)
-                    if (
-                        timestamp
-                        and (datetime.utcnow() - timestamp).total_seconds() < ttl
-                    ):
-                        # Cache hit - move to end (most recently used)
-                        _cache.move_to_end(cache_key)
-                        _cache_access_times[cache_key] = datetime.utcnow()
-                        logger.debug(f"Cache HIT: {func.__name__}")
-                        return _cache[cache_key]
-                    else:
-                        # Expired, remove it
-                        _cache.pop(cache_key, None)
-                        _cache_timestamps.pop(cache_key, None)
-                        _cache_access_times.pop(cache_key, None)
-
-                # Cache miss - execute function
+                with _cache_lock:
+                    if cache_key in _cache:
+                        timestamp = _cache_timestamps.get(cache_key)
+                        if (
+                            timestamp
+                            and (datetime.utcnow() - timestamp).total_seconds() < ttl
+                        ):
+                            # Cache hit - move to end (most recently used)
+                            _cache.move_to_end(cache_key)
+                            _cache_access_times[cache_key] = datetime.utcnow()
+                            logger.debug(f"Cache HIT: {func.__name__}")
+                            return _cache[cache_key]
+                        else:
+                            # Expired, remove it
+                            _cache.pop(cache_key, None)
+                            _cache_timestamps.pop(cache_key, None)
+                            _cache_access_times.pop(cache_key, None)
+
+                # Cache miss - execute function (outside the lock so slow
+                # Shopify calls never serialize other threads)
                 logger.debug(f"Cache MISS: {func.__name__}")
                 result = func(*args, **kwargs)
 
-                # Evict if needed before storing
-                _evict_lru()
+                # Error dicts are not cached - keys are shared per shop, so a
+                # transient failure would be served shop-wide for the whole TTL
+                if isinstance(result, dict) and "error" in result:
+                    return result
 
-                # Store in cache (at end = most recently used)
-                _cache[cache_key] = result
-                _cache_timestamps[cache_key] = datetime.utcnow()
-                _cache_access_times[cache_key] = datetime.utcnow()
+                with _cache_lock:
+                    # Evict if needed before storing
+                    _evict_lru()
 
-                # Move to end to mark as recently used
-                _cache.move_to_end(cache_key)
+                    # Store in cache (at end = most recently used)
+                    _cache[cache_key] = result
+                    _cache_timestamps[cache_key] = datetime.utcnow()
+                    _cache_access_times[cache_key] = datetime.utcnow()
+
+                    # Move to end to mark as recently used
+                    _cache.move_to_end(cache_key)
 
                 return result
             except MemoryError:
                 # Memory error - clear cache and retry without caching
                 logger.error("Memory error in cache - clearing cache")
-                _cache.clear()
-                _cache_timestamps.clear()
-                _cache_access_times.clear()
+                with _cache_lock:
+                    _cache.clear()
+                    _cache_timestamps.clear()
+                    _cache_access_times.clear()
                 return func(*args, **kwargs)
             except Exception as e:
                 # Any other error - don't cache, just execute
@@ -193,10 +206,14 @@ _last_cache_clear_time = None
 
 def clear_cache(pattern=None):
     """Clear cache entries matching pattern"""
+    with _cache_lock:
+        _clear_cache_locked(pattern)
+
+
+def _clear_cache_locked(pattern):
+    """clear_cache() body - caller holds _cache_lock"""
     global _last_cache_clear_time
     try:
-        from datetime import datetime
-
         current_time = datetime.utcnow()
 
         # If clearing entire cache, check interval to prevent spam
@@ -234,19 +251,20 @@ def clear_cache(pattern=None):
         _cache.clear()
         _cache_timestamps.clear()
         _cache_access_times.clear()
-        _last_cache_clear_time = datetime.utcnow() if "datetime" in dir() else None
+        _last_cache_clear_time = datetime.utcnow()
 
 
 def get_cache_stats():
     """Get cache statistics"""
     try:
-        return {
-            "entries": len(_cache),
-            "max_entries": MAX_CACHE_ENTRIES,
-            "size_mb": round(_get_cache_size_mb(), 2),
-            "max_size_mb": MAX_CACHE_SIZE_MB,
-            "keys": list(_cache.keys())[:10],  # First 10 keys
-        }
+        with _cache_lock:
+            return {
+                "entries": len(_cache),
+                "max_entries": MAX_CACHE_ENTRIES,
+                "size_mb": round(_get_cache_size_mb(), 2),
+                "max_size_mb": MAX_CACHE_SIZE_MB,
+                "keys": list(_cache.keys())[:10],  # First 10 keys
+            }
     except Exception as e:
         logger.error(f"Error getting cache stats: {e}")
         return {
@@ -260,43 +278,120 @@ def get_cache_stats():
 
 # Response compression
 import gzip
+import zlib
+
+try:
+    import brotli  # Optional - preferred when installed and accepted by the client
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = 1024  # Below this the headers cost more than they save
+COMPRESS_LEVEL = 6  # Level 6 = good balance
+COMPRESSIBLE_TYPES = ("text", "json", "html", "javascript", "css", "xml", "csv")
+
+
+def _choose_encoding(accept_encoding):
+    """Best encoding the client accepts: br (if available), gzip, or None"""
+    if brotli is not None and "br" in accept_encoding:
+        return "br"
+    if "gzip" in accept_encoding:
+        return "gzip"
+    return None
+
+
+def _compress_stream(iterable, encoding):
+    """Incrementally compress a body iterator - constant memory for streamed responses"""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=4)
+        compress, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        compress, finish = compressor.compress, compressor.flush
+    try:
+        for chunk in iterable:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            out = compress(chunk)
+            if out:
+                yield out
+        yield finish()
+    finally:
+        close = getattr(iterable, "close", None)
+        if close is not None:
+            close()
+
+
+def _mark_encoded(response, encoding):
+    """Headers for an encoded body: the ETag is weakened so it no longer
+    claims byte-identity with the identity encoding, and ranges are no
+    longer offered on the original bytes"""
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    response.headers.pop("Accept-Ranges", None)
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
 
 
 def compress_response(response):
-    """Compress response if client supports it"""
+    """
+    Compress response if client supports it.
+
+    Buffered bodies are sized from Content-Length (no get_data() for the
+    skip checks); streamed bodies are wrapped with an incremental
+    compressor instead of being materialized.
+    """
     try:
         # Get request from response context
         from flask import request
 
-        # Only compress if response is large enough and client accepts gzip
-        accept_encoding = (
-            request.headers.get("Accept-Encoding", "")
-            if hasattr(request, "headers")
-            else ""
-        )
+        if request.method == "HEAD" or response.status_code < 200 or response.status_code in (204, 304):
+            return response
+
+        # Partial content - Content-Range offsets refer to the identity bytes
+        if response.status_code == 206 or "Content-Range" in response.headers:
+            return response
+
+        # Already encoded (or deliberately identity) - nothing to do
+        if "Content-Encoding" in response.headers:
+            return response
 
-        if "gzip" not in accept_encoding:
+        encoding = _choose_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None:
             return response
 
-        # Only compress text-based responses
+        # Only compress text-based responses (images, zips, pdfs are already compressed)
         content_type = response.content_type or ""
-        if not any(
-            x in content_type
-            for x in ["text", "json", "html", "javascript", "css", "xml"]
-        ):
+        if not any(x in content_type for x in COMPRESSIBLE_TYPES):
+            return response
+
+        if response.is_streamed or response.direct_passthrough:
+            response.response = _compress_stream(response.response, encoding)
+            response.direct_passthrough = False
+            response.headers.pop("Content-Length", None)
+            _mark_encoded(response, encoding)
+            logger.debug(f"Streaming {encoding} compression for {request.path}")
             return response
 
         # Only compress if response is > 1KB
+        length = response.content_length
+        if length is None:
+            length = response.calculate_content_length()
+        if length is not None and length < COMPRESS_MIN_BYTES:
+            return response
+
         data = response.get_data()
-        if len(data) < 1024:
+        if len(data) < COMPRESS_MIN_BYTES:
             return response
 
         # Compress
-        compressed = gzip.compress(data, compresslevel=6)  # Level 6 = good balance
+        if encoding == "br":
+            compressed = brotli.compress(data, quality=5)
+        else:
+            compressed = gzip.compress(data, compresslevel=COMPRESS_LEVEL)
         response.set_data(compressed)
-        response.headers["Content-Encoding"] = "gzip"
         response.headers["Content-Length"] = len(compressed)
-        response.headers["Vary"] = "Accept-Encoding"
+        _mark_encoded(response, encoding)
         logger.debug(
             f"Compressed response: {len(data)} -> {len(compressed)} bytes ({100 * (1 - len(compressed) / len(data)):.1f}% reduction)"
         )
@@ -1,24 +1,171 @@
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-from flask import has_request_context
+"""
+Shared, shop-keyed rate limiting backed by Redis.
+
+Sliding-window counter: each client has a counter per fixed window, and the
+previous window's count is weighted by how much of it still overlaps the
+sliding window. One Lua script reads both counters and charges the request
+in a single round trip, so every gunicorn worker shares the same budget.
+
+Clients are keyed by verified shop domain (session token or session cookie)
+with an IP fallback, since many merchants share Shopify's proxy IPs. Heavy
+endpoints cost more of the budget than ordinary pages.
+"""
+
+import logging
+import math
+import threading
+import time
+
+from flask import current_app, g, jsonify, request, session
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_BUDGET = 1000  # Cost units per window (1 unit = one ordinary request)
+RATE_LIMIT_WINDOW = 3600  # Seconds
+RATE_LIMIT_KEY_PREFIX = "ratelimit:"
+
+# Path prefix -> cost; first match wins, everything else costs 1
+ROUTE_COSTS = (
+    ("/api/generate_report", 20),
+    ("/api/dashboard/comprehensive", 20),
+    ("/api/export/", 10),
+    ("/api/analytics/", 10),
+    ("/api/process_orders", 5),
+    ("/api/update_inventory", 5),
+)
+
+# KEYS: current window, previous window. ARGV: budget, cost, previous-window weight, ttl
+# Returns {allowed, current count, previous count}
+_SLIDING_WINDOW_LUA = """
+local cur = tonumber(redis.call('GET', KEYS[1]) or '0')
+local prev = tonumber(redis.call('GET', KEYS[2]) or '0')
+local budget = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+if prev * tonumber(ARGV[3]) + cur + cost > budget then
+    return {0, cur, prev}
+end
+cur = redis.call('INCRBY', KEYS[1], cost)
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[4]))
+return {1, cur, prev}
+"""
+
+
+def route_cost(path):
+    """Budget units charged for one request to path"""
+    for prefix, cost in ROUTE_COSTS:
+        if path.startswith(prefix):
+            return cost
+    return 1
+
+
+def rate_limit_key(ctx=None):
+    """'shop:<domain>' for a verified shop, else 'ip:<address>'"""
+    shop = getattr(ctx, "shop", None) or getattr(request, "shop_domain", None)
+    if shop and (getattr(request, "session_token_verified", False) or session.get("shop_domain") == shop):
+        return f"shop:{shop}"
+    # ProxyFix has already resolved X-Forwarded-For into remote_addr
+    return f"ip:{request.remote_addr or '127.0.0.1'}"
+
+
+class SlidingWindowLimiter:
+    """Sliding-window counter in Redis, with a per-worker fallback while Redis is down"""
+
+    def __init__(self, budget=RATE_LIMIT_BUDGET, window=RATE_LIMIT_WINDOW, prefix=RATE_LIMIT_KEY_PREFIX):
+        self.budget = budget
+        self.window = window
+        self.prefix = prefix
+        self._script = None
+        self._script_client = None
+        self._local = {}  # key -> {window index: count}
+        self._local_lock = threading.Lock()
+
+    def _redis_script(self):
+        from cache_utils import redis_client
+
+        if redis_client is None:
+            return None
+        if self._script_client is not redis_client:
+            self._script = redis_client.register_script(_SLIDING_WINDOW_LUA)
+            self._script_client = redis_client
+        return self._script
+
+    def hit(self, key, cost=1, now=None):
+        """Charge cost to key: (allowed, remaining, retry_after seconds)"""
+        now = time.time() if now is None else now
+        index = int(now // self.window)
+        elapsed = (now % self.window) / self.window
+        weight = 1.0 - elapsed
+
+        counts = None
+        script = self._redis_script()
+        if script is not None:
+            try:
+                counts = script(
+                    keys=[f"{self.prefix}{key}:{index}", f"{self.prefix}{key}:{index - 1}"],
+                    args=[self.budget, cost, weight, self.window * 2],
+                )
+            except Exception as e:
+                logger.error(f"TITAN [RATE_LIMIT] Redis check failed, using worker-local counters: {e}")
+        if counts is None:
+            counts = self._local_hit(key, index, cost, weight)
+
+        allowed, current, previous = (int(c) for c in counts)
+        used = previous * weight + current
+        remaining = max(int(self.budget - used), 0)
+        retry_after = 0 if allowed else self._retry_after(current, previous, cost, elapsed)
+        return bool(allowed), remaining, retry_after
+
+    def _local_hit(self, key, index, cost, weight):
+        with self._local_lock:
+            windows = self._local.setdefault(key, {})
+            for stale in [i for i in windows if i < index - 1]:
+                del windows[stale]
+            current = windows.get(index, 0)
+            previous = windows.get(index - 1, 0)
+            if previous * weight + current + cost > self.budget:
+                return 0, current, previous
+            windows[index] = current + cost
+            return 1, current + cost, previous
+
+    def _retry_after(self, current, previous, cost, elapsed):
+        """Seconds until the previous window decays enough to admit cost"""
+        excess = previous * (1.0 - elapsed) + current + cost - self.budget
+        if previous > 0 and current + cost <= self.budget:
+            return max(1, math.ceil(excess / previous * self.window))
+        return max(1, math.ceil((1.0 - elapsed) * self.window))
 
-def get_remote_address_safe():
-    """Get remote address safely - handles missing request context"""
-    if has_request_context():
-        return get_remote_address()
-    # Fallback for when called outside request context (during initialization)
-    return "127.0.0.1"
 
 def init_limiter(app):
-    """Initialize rate limiter with global limit"""
-    # Increased from 200/hour to 1000/hour to avoid blocking legitimate users
-    # 200/hour (~3 req/min) was too restrictive for users doing legitimate work
-    # 1000/hour (~16 req/min) allows normal usage while still preventing abuse
-    limiter = Limiter(
-        app=app,
-        key_func=get_remote_address_safe,
-        default_limits=["1000 per hour"],
-        storage_uri="memory://",
-        headers_enabled=True
+    """Create the app's shared limiter (budget/window from RATE_LIMIT_* config)"""
+    limiter = SlidingWindowLimiter(
+        budget=int(app.config.get("RATE_LIMIT_BUDGET", RATE_LIMIT_BUDGET)),
+        window=int(app.config.get("RATE_LIMIT_WINDOW", RATE_LIMIT_WINDOW)),
     )
+    app.extensions["rate_limiter"] = limiter
     return limiter
+
+
+def enforce_rate_limit(ctx):
+    """Before stage: charge the route's cost, 429 with Retry-After when over budget"""
+    limiter = current_app.extensions.get("rate_limiter")
+    if limiter is None:
+        return None
+    key = rate_limit_key(ctx)
+    allowed, remaining, retry_after = limiter.hit(key, route_cost(request.path))
+    g.rate_limit = (limiter.budget, remaining)
+    if allowed:
+        return None
+    logger.warning(f"TITAN [RATE_LIMIT] {key} over budget on {request.path}")
+    response = jsonify({"error": "Rate limit exceeded", "retry_after": retry_after})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def rate_limit_headers(ctx, response):
+    """After stage: X-RateLimit-* headers for the charged budget"""
+    budget_left = g.get("rate_limit")
+    if budget_left:
+        response.headers["X-RateLimit-Limit"] = str(budget_left[0])
+        response.headers["X-RateLimit-Remaining"] = str(budget_left[1])
+    return response
@@ -0,0 +1,186 @@
+"""
+Redis-backed server-side sessions with write-avoidance.
+
+The cookie carries only a signed, opaque session id. Session data lives in
+Redis under SESSION_KEY_PREFIX and is written back only when its contents
+actually change (or when the TTL needs sliding forward), so ordinary page
+loads and XHRs cost one GET and emit no Set-Cookie at all. Cookie attributes
+come from the SESSION_COOKIE_* config, applied once by Flask.
+
+The session id is rotated whenever the logged-in user changes (login,
+logout, account switch), so an id planted before authentication is
+worthless after it. Falls back to Flask's signed-cookie sessions while
+Redis is unreachable - per request, not just at import.
+"""
+
+import hashlib
+import logging
+import secrets
+import time
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSessionInterface, SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+logger = logging.getLogger(__name__)
+
+SESSION_ID_BYTES = 32
+SESSION_REFRESH_FRACTION = 0.5  # Slide the TTL once this much of the lifetime has passed
+
+
+class RedisSession(CallbackDict, SessionMixin):
+    """Session dict that remembers what it looked like when loaded"""
+
+    def __init__(self, initial=None, sid=None, new=False, digest=None, written_at=0.0):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.accessed = False
+        self.digest = digest  # Digest of the stored payload; None when nothing is stored
+        self.written_at = written_at
+        self.loaded_user = (initial or {}).get("_user_id")  # Rotate the sid when this changes
+
+
+class RedisSessionInterface(SessionInterface):
+    """Server-side session store keyed by an opaque cookie id"""
+
+    serializer = TaggedJSONSerializer()
+    session_class = RedisSession
+
+    def __init__(self, key_prefix="session:", use_signer=True):
+        self.key_prefix = key_prefix
+        self.use_signer = use_signer
+        self.fallback = SecureCookieSessionInterface()
+
+    @staticmethod
+    def _redis():
+        from cache_utils import redis_client
+        return redis_client
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt="flask-session-id", key_derivation="hmac")
+
+    def _digest(self, payload):
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _sid_from_cookie(self, app, cookie):
+        if not cookie:
+            return None
+        if not self.use_signer:
+            return cookie
+        try:
+            return self._signer(app).unsign(cookie).decode("utf-8")
+        except BadSignature:
+            return None
+
+    def open_session(self, app, request):
+        redis = self._redis()
+        if redis is None:
+            return self.fallback.open_session(app, request)
+
+        sid = self._sid_from_cookie(app, request.cookies.get(self.get_cookie_name(app)))
+        if sid:
+            try:
+                raw = redis.get(self.key_prefix + sid)
+            except Exception as e:
+                logger.error(f"TITAN [SESSION] Redis read failed, using signed-cookie session: {e}")
+                return self.fallback.open_session(app, request)
+            if raw:
+                try:
+                    stored = self.serializer.loads(raw)
+                    return self.session_class(
+                        stored.get("d"), sid=sid,
+                        digest=self._digest(self.serializer.dumps(stored.get("d") or {})),
+                        written_at=stored.get("t", 0.0),
+                    )
+                except Exception as e:
+                    logger.warning(f"TITAN [SESSION] Discarding unreadable session {sid[:8]}: {e}")
+
+        return self.session_class(sid=secrets.token_urlsafe(SESSION_ID_BYTES), new=True)
+
+    def _rotate(self, session):
+        """Move the session to a fresh id and drop the old key"""
+        old_key = self.key_prefix + session.sid
+        session.sid = secrets.token_urlsafe(SESSION_ID_BYTES)
+        session.loaded_user = session.get("_user_id")
+        try:
+            self._redis().delete(old_key)
+        except Exception as e:
+            logger.error(f"TITAN [SESSION] Redis delete of rotated session failed: {e}")
+
+    def save_session(self, app, session, response):
+        if not isinstance(session, RedisSession):
+            return self.fallback.save_session(app, session, response)
+
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        key = self.key_prefix + session.sid
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        # Emptied session: drop the stored copy and the cookie
+        if not session:
+            if session.digest is not None:
+                try:
+                    self._redis().delete(key)
+                except Exception as e:
+                    logger.error(f"TITAN [SESSION] Redis delete failed: {e}")
+                response.delete_cookie(
+                    name, domain=domain, path=path,
+                    secure=self.get_cookie_secure(app),
+                    samesite=self.get_cookie_samesite(app),
+                    httponly=self.get_cookie_httponly(app),
+                )
+                response.vary.add("Cookie")
+            return
+
+        data = self.serializer.dumps(dict(session))
+        digest = self._digest(data)
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        now = time.time()
+        stale = now - session.written_at > lifetime * SESSION_REFRESH_FRACTION
+        if digest == session.digest and not stale:
+            return  # Unchanged and fresh: no Redis write, no Set-Cookie
+
+        # Session fixation: a new identity never keeps the id it arrived with
+        rotated = not session.new and session.get("_user_id") != session.loaded_user
+        if rotated:
+            self._rotate(session)
+            key = self.key_prefix + session.sid
+
+        try:
+            self._redis().setex(key, int(lifetime), self.serializer.dumps({"d": dict(session), "t": now}))
+        except Exception as e:
+            logger.error(f"TITAN [SESSION] Redis write failed, session not persisted: {e}")
+            return
+
+        if session.new or stale or rotated:
+            cookie = session.sid
+            if self.use_signer:
+                cookie = self._signer(app).sign(cookie).decode("utf-8")
+            response.set_cookie(
+                name, cookie,
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+            response.vary.add("Cookie")
+
+
+def init_redis_sessions(app):
+    """Install the Redis session interface (SESSION_TYPE=redis)"""
+    app.session_interface = RedisSessionInterface(
+        key_prefix=app.config.get("SESSION_KEY_PREFIX", "session:"),
+        use_signer=app.config.get("SESSION_USE_SIGNER", True),
+    )
+    logger.info("TITAN [SESSION] Server-side Redis sessions enabled")
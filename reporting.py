@@ -7,28 +7,24 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 
 import uuid
-from models import ShopifyStore, UsageEvent, db
-from shopify_integration import ShopifyClient
+from models import db
+from shop_context import get_shop_context
 
 logger = logging.getLogger(__name__)
 
 
 def generate_report(user_id=None, shop_url=None, start_date=None, end_date=None):
-    """Generate comprehensive revenue report with advanced analytics"""
+    """Generate revenue report for user (adapter for generate_report_for)"""
+    return generate_report_for(get_shop_context(user_id), start_date=start_date, end_date=end_date)
+
+
+def generate_report_for(shop, start_date=None, end_date=None):
+    """Generate comprehensive revenue report for a ShopContext with advanced analytics"""
     try:
-        # Get user's store
-        store = ShopifyStore.query.filter_by(user_id=user_id, is_active=True).first()
-        if not store:
-            return {"success": False, "error": "No store connected"}
-
-        # Validate store connection
-        access_token = store.get_access_token()
-        if not access_token:
-            return {
-                "success": False, 
-                "error": "Store connection expired. Please reconnect in Settings.",
-                "action": "reconnect"
-            }
+        # Store and token were resolved once for the request
+        unavailable = shop.unavailable()
+        if unavailable:
+            return unavailable
 
         # Set default date range if not provided (last 30 days)
         if not start_date:
@@ -37,7 +33,7 @@ def generate_report(user_id=None, shop_url=None, start_date=None, end_date=None)
             end_date = datetime.utcnow().isoformat()
 
         # Get orders from Shopify for revenue calculation
-        client = ShopifyClient(store.shop_url, access_token)
+        client = shop.client
         
         try:
             orders = client.get_orders(
@@ -79,7 +75,7 @@ def generate_report(user_id=None, shop_url=None, start_date=None, end_date=None)
                 return {"success": False, "error": "Invalid response from Shopify API"}
 
         except Exception as api_error:
-            logger.error(f"Shopify API error for user {user_id}: {api_error}")
+            logger.error(f"Shopify API error for user {shop.user_id}: {api_error}")
             return {
                 "success": False,
                 "error": "Failed to connect to Shopify. Please try again.",
@@ -324,7 +320,7 @@ def generate_report(user_id=None, shop_url=None, start_date=None, end_date=None)
             
             # RECORD USAGE (Passive Revenue Meter)
             record_usage_event(
-                store_id=store.id,
+                store_id=shop.store.id,
                 event_type='report_generated',
                 description=f"Generated {total_orders} order report",
                 price=0.01  # Metered price per report
@@ -391,7 +387,7 @@ def generate_report(user_id=None, shop_url=None, start_date=None, end_date=None)
             }
 
     except Exception as e:
-        logger.error(f"Error generating report for user {user_id}: {e}", exc_info=True)
+        logger.error(f"Error generating report for user {shop.user_id}: {e}", exc_info=True)
         return {
             "success": False, 
             "error": "An unexpected error occurred while generating the revenue report.",
@@ -401,18 +397,18 @@ def generate_report(user_id=None, shop_url=None, start_date=None, end_date=None)
 
 
 def generate_orders_report(user_id=None, start_date=None, end_date=None):
-    """Generate detailed orders report with fulfillment analysis"""
-    try:
-        store = ShopifyStore.query.filter_by(user_id=user_id, is_active=True).first()
-        if not store:
-            return {"success": False, "error": "No store connected"}
+    """Generate orders report for user (adapter for generate_orders_report_for)"""
+    return generate_orders_report_for(get_shop_context(user_id), start_date=start_date, end_date=end_date)
+
 
-        access_token = store.get_access_token()
-        if not access_token:
-            return {"success": False, "error": "Store connection expired", "action": "reconnect"}
+def generate_orders_report_for(shop, start_date=None, end_date=None):
+    """Generate detailed orders report for a ShopContext with fulfillment analysis"""
+    try:
+        unavailable = shop.unavailable()
+        if unavailable:
+            return unavailable
 
-        client = ShopifyClient(store.shop_url, access_token)
-        orders = client.get_orders(start_date=start_date, end_date=end_date, limit=250)
+        orders = shop.client.get_orders(start_date=start_date, end_date=end_date, limit=250)
 
         if isinstance(orders, dict) and "error" in orders:
             return {"success": False, "error": orders["error"]}
@@ -483,18 +479,18 @@ def generate_orders_report(user_id=None, start_date=None, end_date=None):
 
 
 def generate_inventory_report(user_id=None):
-    """Generate detailed inventory report with stock analysis"""
-    try:
-        store = ShopifyStore.query.filter_by(user_id=user_id, is_active=True).first()
-        if not store:
-            return {"success": False, "error": "No store connected"}
+    """Generate inventory report for user (adapter for generate_inventory_report_for)"""
+    return generate_inventory_report_for(get_shop_context(user_id))
 
-        access_token = store.get_access_token()
-        if not access_token:
-            return {"success": False, "error": "Store connection expired", "action": "reconnect"}
 
-        client = ShopifyClient(store.shop_url, access_token)
-        products = client.get_products()
+def generate_inventory_report_for(shop):
+    """Generate detailed inventory report for a ShopContext with stock analysis"""
+    try:
+        unavailable = shop.unavailable()
+        if unavailable:
+            return unavailable
+
+        products = shop.client.get_products()
 
         if isinstance(products, dict) and "error" in products:
             return {"success": False, "error": products["error"]}
@@ -559,29 +555,29 @@ def record_usage_event(store_id: int, event_type: str, description: Optional[str
     """
     Record a billable event in the database for later sync with Shopify.
     Uses minute-level idempotency to prevent accidental double-billing.
+    Returns True when recorded, False for a repeat within the minute,
+    None on failure.
     """
     try:
+        from usage_storage import ingest_usage_events
+
         # Minute-level idempotency key
         timestamp_key = datetime.utcnow().strftime('%Y%m%d%H%M')
         idempotency_key = f"{event_type}:{store_id}:{timestamp_key}"
-        
-        # Check if already recorded in this minute
-        existing = UsageEvent.query.filter_by(idempotency_key=idempotency_key).first()
-        if existing:
-            return existing
-
-        usage = UsageEvent(
-            store_id=store_id,
-            event_type=event_type,
-            description=description,
-            price=price,
-            idempotency_key=idempotency_key
-        )
-        db.session.add(usage)
-        db.session.commit()
-        
+
+        # One INSERT ... ON CONFLICT DO NOTHING; a repeat in this minute is skipped
+        inserted = ingest_usage_events([{
+            "store_id": store_id,
+            "event_type": event_type,
+            "description": description,
+            "price": price,
+            "idempotency_key": idempotency_key,
+        }])
+        if not inserted:
+            return False
+
         logger.info(f"📈 [METER] Recorded {event_type} for store {store_id}")
-        return usage
+        return True
     except Exception as e:
         db.session.rollback()
         logger.error(f"❌ [METER] Failed to record usage: {e}")
@@ -3,11 +3,14 @@ Response Audit - After-Request Hook
 Catches performance and response-level discrepancies
 Works in tandem with security_audit.py (request-level checks)
 """
+import logging
 import os
 import time
 from flask import request, g
 from collections import defaultdict
 
+logger = logging.getLogger(__name__)
+
 # Performance thresholds
 LATENCY_THRESHOLD_MS = 500  # Flag responses slower than 500ms
 LATENCY_THRESHOLD_CRITICAL_MS = 2000  # Critical if slower than 2s
@@ -68,8 +71,9 @@ def audit_response_discrepancies(response):
     
     # === Check 2: High Latency ===
     # Check if request took too long
-    if hasattr(g, 'request_start_time'):
-        duration_ms = (time.time() - g.request_start_time) * 1000
+    request_start_time = g.get('request_start_time') or g.get('titan_start_time')
+    if request_start_time:
+        duration_ms = (time.time() - request_start_time) * 1000
         
         if duration_ms > LATENCY_THRESHOLD_CRITICAL_MS:
             issues.append(f"CRITICAL_LATENCY_{int(duration_ms)}ms")
@@ -86,7 +90,11 @@ def audit_response_discrepancies(response):
     
     # === Check 3: Zero-Byte Responses (Silent Failures) ===
     # "Void detected" - 200 OK but 0 bytes indicates structural collapse
-    content_length = response.content_length or len(response.get_data()) if hasattr(response, 'get_data') else 0
+    # Size comes from the header or the buffered chunks - never get_data(),
+    # which would buffer a streamed export. Streams report None (unknown).
+    content_length = response.content_length
+    if content_length is None:
+        content_length = response.calculate_content_length()
     
     if response.status_code == 200 and content_length == 0:
         # Exception: Redirects and 204 No Content are OK
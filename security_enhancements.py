@@ -235,9 +235,8 @@ def check_request_size():
     return True
 
 
-# Rate limiting per IP - MOVED to rate_limiter.py (using Flask-Limiter)
-# This custom implementation is deprecated in favor of the standard library
-# which provides better memory management and key handling.
+# Rate limiting - MOVED to rate_limiter.py (Redis sliding window, keyed by
+# verified shop with an IP fallback, registered as a middleware stage).
 
 
 # Enhanced input sanitization
@@ -1,23 +1,80 @@
 import os
-import jwt
 import time
+import hashlib
+import threading
+from collections import OrderedDict
 from functools import wraps
-from flask import request, jsonify, g, current_app
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+from flask import request, jsonify, g, current_app, has_request_context
 
-def verify_shopify_token(token):
-    """
-    Verifies a Shopify Session Token (JWT).
-    Returns the decoded payload if valid, raises Exception if not.
-    """
-    secret = os.environ.get('SHOPIFY_API_SECRET')
-    if not secret:
-        raise Exception("Server config error: Missing Secret")
-        
-    payload = jwt.decode(
+# Recently verified tokens: sha256(token) -> (payload, exp). App Bridge reuses
+# a token for ~1 minute, so repeated XHRs skip the HMAC + claim checks.
+VERIFIED_TOKEN_CACHE_SIZE = 512
+_verified_tokens: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+_verified_tokens_lock = threading.Lock()
+
+# (secret, audience) read from the environment once per process
+_credentials: Optional[Tuple[str, Optional[str]]] = None
+
+
+def _get_credentials() -> Tuple[str, Optional[str]]:
+    """Shopify API secret and key, cached after the first successful read"""
+    global _credentials
+    if _credentials is None:
+        secret = os.environ.get('SHOPIFY_API_SECRET')
+        if not secret:
+            raise Exception("Server config error: Missing Secret")
+        _credentials = (secret, os.environ.get('SHOPIFY_API_KEY'))
+    return _credentials
+
+
+def reset_token_cache() -> None:
+    """Drop cached credentials and verified tokens (secret rotation, tests)"""
+    global _credentials
+    _credentials = None
+    with _verified_tokens_lock:
+        _verified_tokens.clear()
+
+
+def get_bearer_token() -> Optional[str]:
+    """Token from the Authorization: Bearer header, or None"""
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return None
+    token = auth_header[7:].strip()
+    return token or None
+
+
+def _request_memo() -> Optional[Dict[str, Union[Dict[str, Any], Exception]]]:
+    """Per-request verification results, so one request never decodes twice"""
+    if not has_request_context():
+        return None
+    memo: Optional[Dict[str, Union[Dict[str, Any], Exception]]] = g.get('_session_token_memo')
+    if memo is None:
+        memo = {}
+        g._session_token_memo = memo
+    return memo
+
+
+def _decode_token(token: str, token_hash: str) -> Dict[str, Any]:
+    """Decode through the process-wide LRU of recently verified tokens"""
+    now = time.time()
+    with _verified_tokens_lock:
+        entry = _verified_tokens.get(token_hash)
+        if entry is not None:
+            if entry[1] > now:
+                _verified_tokens.move_to_end(token_hash)
+                return dict(entry[0])  # Callers may mutate their payload
+            del _verified_tokens[token_hash]
+
+    import jwt  # Lazy: PyJWT pulls in cryptography, kept off the boot path
+
+    secret, audience = _get_credentials()
+    payload: Dict[str, Any] = jwt.decode(
         token, 
         secret, 
         algorithms=['HS256'],
-        audience=os.environ.get('SHOPIFY_API_KEY')
+        audience=audience
     )
     
     # Payload Validation
@@ -25,10 +82,48 @@ def verify_shopify_token(token):
     dest = payload.get('dest') # e.g. https://my-shop.myshopify.com
     if not dest:
         raise Exception("Invalid Payload: Missing dest")
-        
+
+    exp = payload.get('exp')
+    if isinstance(exp, (int, float)):
+        with _verified_tokens_lock:
+            _verified_tokens[token_hash] = (payload, float(exp))
+            _verified_tokens.move_to_end(token_hash)
+            while len(_verified_tokens) > VERIFIED_TOKEN_CACHE_SIZE:
+                _verified_tokens.popitem(last=False)
+        return dict(payload)
+
+    return payload
+
+
+def verify_shopify_token(token: str) -> Dict[str, Any]:
+    """
+    Verifies a Shopify Session Token (JWT).
+    Returns the decoded payload if valid, raises Exception if not.
+
+    Memoized per request (payload lands on g.jwt_payload) and across
+    requests until the token's exp.
+    """
+    token_hash = hashlib.sha256(token.encode('utf-8')).hexdigest()
+    memo = _request_memo()
+    if memo is not None and token_hash in memo:
+        cached = memo[token_hash]
+        if isinstance(cached, Exception):
+            raise cached
+        return cached
+
+    try:
+        payload = _decode_token(token, token_hash)
+    except Exception as e:
+        if memo is not None:
+            memo[token_hash] = e
+        raise
+
+    if memo is not None:
+        memo[token_hash] = payload
+        g.jwt_payload = payload
     return payload
 
-def stateless_auth(f):
+def stateless_auth(f: Callable[..., Any]) -> Callable[..., Any]:
     """
     ZERO-FLAW AUTH DECORATOR (Stateless)
     
@@ -36,21 +131,21 @@ def stateless_auth(f):
     Replaces all cookie-based session logic for API routes.
     """
     @wraps(f)
-    def decorated_function(*args, **kwargs):
+    def decorated_function(*args: Any, **kwargs: Any) -> Any:
         # 1. Extract Token
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or 'Bearer ' not in auth_header:
+        token = get_bearer_token()
+        if not token:
             current_app.logger.warning("🚫 Auth Fail: Missing Bearer Token")
             return jsonify({'error': 'Unauthorized: Missing Token'}), 401
         
-        token = auth_header.split(' ')[1]
-        
+        import jwt
+
         try:
-            # 2. Decode & Verify
+            # 2. Decode & Verify (memoized - middleware usually verified it already)
             payload = verify_shopify_token(token)
             
             # 3. Context Injection
-            dest = payload.get('dest')
+            dest = payload['dest']
             shop = dest.replace('https://', '')
             
             # We trust this token 100%. No DB check needed for simple auth.
@@ -0,0 +1,121 @@
+"""
+Request-scoped shop context shared by the report functions.
+
+One ShopContext per request carries the merchant's active store row, the
+decrypted access token, plan features and a single ShopifyClient, so the
+comprehensive dashboard resolves them once instead of once per report.
+It is seeded from what the identity middleware already loaded
+(g.current_store / g.current_identity) and every part is lazy.
+"""
+
+import logging
+
+from flask import g, has_request_context
+
+logger = logging.getLogger(__name__)
+
+_UNSET = object()
+
+
+class ShopContext:
+    """Store, token, plan features and Shopify client for one merchant"""
+
+    __slots__ = ("user_id", "_store", "_user", "_token", "_client", "_features")
+
+    def __init__(self, user_id, store=_UNSET, user=None):
+        self.user_id = user_id
+        self._store = store
+        self._user = user
+        self._token = _UNSET
+        self._client = None
+        self._features = None
+
+    @property
+    def store(self):
+        """The user's active ShopifyStore, or None"""
+        if self._store is _UNSET:
+            from models import ShopifyStore
+            self._store = ShopifyStore.query.filter_by(user_id=self.user_id, is_active=True).first()
+        return self._store
+
+    @property
+    def shop_url(self):
+        return self.store.shop_url if self.store else None
+
+    @property
+    def access_token(self):
+        """Decrypted access token (decrypted once per context)"""
+        if self._token is _UNSET:
+            self._token = self.store.get_access_token() if self.store else None
+        return self._token
+
+    @property
+    def client(self):
+        """One ShopifyClient for every report in the request"""
+        if self._client is None and self.access_token:
+            from shopify_integration import ShopifyClient
+            self._client = ShopifyClient(self.store.shop_url, self.access_token)
+        return self._client
+
+    @property
+    def user(self):
+        if self._user is None and self.user_id is not None:
+            from models import User, db
+            self._user = db.session.get(User, self.user_id)
+        return self._user
+
+    @property
+    def features(self):
+        """Plan features dict for the merchant (empty when the user is gone)"""
+        if self._features is None:
+            from models import get_plan_features
+            self._features = get_plan_features(self.user) if self.user else {}
+        return self._features
+
+    def unavailable(self):
+        """The report error response when there is no usable store, else None"""
+        if not self.store:
+            return {"success": False, "error": "No store connected"}
+        if not self.access_token:
+            return {
+                "success": False,
+                "error": "Store connection expired. Please reconnect in Settings.",
+                "action": "reconnect",
+            }
+        return None
+
+    def __repr__(self):
+        return f"<ShopContext user={self.user_id} shop={self.shop_url}>"
+
+
+def _seeded(user_id):
+    """A context pre-filled with whatever the identity middleware loaded"""
+    store = g.get("current_store")
+    if store is not None and store.user_id == user_id and store.is_active:
+        return ShopContext(user_id, store=store, user=store.user)
+
+    identity = g.get("current_identity")
+    if identity is not None and identity.id == user_id and identity.store_active:
+        store = identity.load_store()
+        if store is not None and store.is_active:
+            return ShopContext(user_id, store=store)
+    return ShopContext(user_id)
+
+
+def get_shop_context(user_id):
+    """This request's ShopContext for user_id (a fresh one outside a request)"""
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        pass  # None or a non-numeric id - used as given
+    if not has_request_context():
+        return ShopContext(user_id)
+    ctx = g.get("shop_context")
+    if ctx is None or ctx.user_id != user_id:
+        try:
+            ctx = _seeded(user_id)
+        except Exception as e:
+            logger.debug(f"Shop context seed failed for user {user_id}: {e}")
+            ctx = ShopContext(user_id)
+        g.shop_context = ctx
+    return ctx
@@ -2,11 +2,10 @@ import logging
 import os
 import time
 
-import requests
-
 from config import SHOPIFY_API_VERSION
 from performance import CACHE_TTL_INVENTORY, CACHE_TTL_ORDERS, cache_result
 from error_logging import error_logger, log_errors
+from core.single_flight import single_flight
 
 logger = logging.getLogger(__name__)
 
@@ -15,27 +14,22 @@ class ShopifyClient:
     def __init__(self, shop_url, access_token):
         self.shop_url = shop_url.replace("https://", "").replace("http://", "")
         
-        # Handle encrypted tokens with proper error handling
-        if access_token and not (
-            access_token.startswith("shpat_") or access_token.startswith("shpca_")
-        ):
+        # Callers normally pass the token already decrypted by
+        # ShopifyStore.get_access_token(); only ciphertext is decrypted here
+        # (through the shared decrypted-token cache)
+        self.access_token = access_token
+        if access_token and not access_token.startswith(("shpat_", "shpca_")):
             try:
-                from data_encryption import decrypt_access_token
-                decrypted = decrypt_access_token(access_token)
-                if decrypted:
-                    self.access_token = decrypted
-                    logger.info(f"Successfully decrypted token for {shop_url}")
-                else:
-                    logger.warning(f"Token decryption failed for {shop_url}")
-                    self.access_token = None
+                from data_encryption import decrypt_access_token, get_encryption_manager
+                if get_encryption_manager().is_encrypted(access_token):
+                    self.access_token = decrypt_access_token(access_token)
+                    if not self.access_token:
+                        logger.warning(f"Token decryption failed for {shop_url}")
             except ImportError:
                 logger.warning("data_encryption module not available, using token as-is")
-                self.access_token = access_token
             except Exception as e:
                 logger.error(f"Token handling failed for {shop_url}: {e}")
                 self.access_token = None
-        else:
-            self.access_token = access_token
         
         self.api_version = SHOPIFY_API_VERSION
         
@@ -45,6 +39,10 @@ class ShopifyClient:
         elif not (self.access_token.startswith("shpat_") or self.access_token.startswith("shpca_")):
             logger.warning(f"Access token format may be invalid for {shop_url}")
 
+    def __repr__(self):
+        # Stable per-shop identity so cache_result keys survive across client instances
+        return f"ShopifyClient({self.shop_url})"
+
     def _get_headers(self):
         # Debug logging: Verify token format before API call
         if self.access_token:
@@ -68,6 +66,7 @@ class ShopifyClient:
     @log_errors("SHOPIFY_API_ERROR")
     def _make_request(self, endpoint, retries=3):
         """Make API request with comprehensive error logging"""
+        import requests  # Lazy: keeps requests off the boot path
         url = f"https://{self.shop_url}/admin/api/{self.api_version}/{endpoint}"
         headers = self._get_headers()
         headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
@@ -332,6 +331,7 @@ class ShopifyClient:
         Make GraphQL request with automatic retry logic (professional standard)
         Retries on network errors with exponential backoff
         """
+        import requests  # Lazy: keeps requests off the boot path
         url = f"https://{self.shop_url}/admin/api/{self.api_version}/graphql.json"
         headers = self._get_headers()
         headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
@@ -622,6 +622,7 @@ class ShopifyClient:
         return {"error": "Request failed after multiple attempts"}
 
     @cache_result(ttl=CACHE_TTL_INVENTORY)
+    @single_flight("get_products")
     def get_products(self):
         """
         Get products using GraphQL with proper inventory data
@@ -773,6 +774,7 @@ class ShopifyClient:
         return products
 
     @cache_result(ttl=CACHE_TTL_ORDERS)
+    @single_flight("get_orders")
     def get_orders(self, status="any", limit=50, start_date=None, end_date=None):
         """
         Get orders using GraphQL with proper data structure
@@ -11,6 +11,36 @@ from logging_config import logger
 
 metafields_bp = Blueprint('metafields', __name__)
 
+# metafieldsSet accepts at most 25 metafields per call
+METAFIELDS_SET_BATCH_SIZE = 25
+
+# Per-shop read cache (settings + product notes) - 5 minutes
+METAFIELDS_CACHE_TTL = 300
+
+METAFIELDS_SET_MUTATION = """
+mutation metafieldsSet($metafields: [MetafieldsSetInput!]!) {
+  metafieldsSet(metafields: $metafields) {
+    metafields {
+      id
+      namespace
+      key
+      value
+      type
+      owner {
+        ... on Node {
+          id
+        }
+      }
+    }
+    userErrors {
+      field
+      message
+      code
+    }
+  }
+}
+"""
+
 class ShopifyMetafields:
     """
     Shopify Metafields Management Class
@@ -29,6 +59,121 @@ class ShopifyMetafields:
             'X-Shopify-Access-Token': self.access_token,
             'Content-Type': 'application/json'
         }
+
+    def _graphql(self, query, variables=None):
+        """
+        Execute a GraphQL query against the Admin API
+
+        Returns:
+            The response 'data' dict, or {'error': message} on failure
+        """
+        try:
+            payload = {'query': query}
+            if variables:
+                payload['variables'] = variables
+
+            response = requests.post(
+                f"{self.base_url}/graphql.json",
+                json=payload,
+                headers=self.get_headers(),
+                timeout=15
+            )
+
+            if response.status_code != 200:
+                logger.error(f"Metafields GraphQL HTTP {response.status_code}: {response.text[:200]}")
+                return {'error': f"HTTP {response.status_code}"}
+
+            body = response.json()
+            if body.get('errors'):
+                logger.error(f"Metafields GraphQL errors: {body['errors']}")
+                return {'error': str(body['errors'])}
+
+            return body.get('data') or {}
+
+        except Exception as e:
+            logger.error(f"Error executing metafields GraphQL: {e}")
+            return {'error': str(e)}
+
+    @staticmethod
+    def _owner_gid(owner_type, owner_id):
+        """Convert a REST owner type/id pair to a GraphQL GID"""
+        owner_id = str(owner_id)
+        if owner_id.startswith('gid://'):
+            return owner_id
+        resource = ''.join(part.capitalize() for part in owner_type.split('_'))
+        if resource == 'Variant':
+            resource = 'ProductVariant'
+        return f"gid://shopify/{resource}/{owner_id}"
+
+    def set_metafields(self, metafields):
+        """
+        Create or update metafields in batches via the metafieldsSet mutation
+
+        Args:
+            metafields: List of dicts with owner_id (GID, or numeric id plus
+                owner_type), namespace, key, value and type
+
+        Returns:
+            Dict with 'metafields' (saved metafields in input order, None for
+            failed items) and 'errors' (input index -> list of messages)
+        """
+        saved = [None] * len(metafields)
+        errors = {}
+
+        for start in range(0, len(metafields), METAFIELDS_SET_BATCH_SIZE):
+            chunk = metafields[start:start + METAFIELDS_SET_BATCH_SIZE]
+            inputs = []
+            for item in chunk:
+                value = item.get('value')
+                inputs.append({
+                    'ownerId': self._owner_gid(item.get('owner_type', 'product'), item['owner_id']),
+                    'namespace': item['namespace'],
+                    'key': item['key'],
+                    'type': item.get('type', 'single_line_text_field'),
+                    'value': value if isinstance(value, str) else json.dumps(value),
+                })
+
+            data = self._graphql(METAFIELDS_SET_MUTATION, {'metafields': inputs})
+            if 'error' in data:
+                for offset in range(len(chunk)):
+                    errors[start + offset] = [data['error']]
+                continue
+
+            result = data.get('metafieldsSet') or {}
+
+            # userErrors.field looks like ["metafields", "<index>", "value"]
+            failed = set()
+            for user_error in result.get('userErrors') or []:
+                field = user_error.get('field') or []
+                index = None
+                if len(field) > 1 and field[0] == 'metafields' and str(field[1]).isdigit():
+                    index = int(field[1])
+                if index is None:
+                    # Unattributed error fails the whole chunk
+                    for offset in range(len(chunk)):
+                        errors.setdefault(start + offset, []).append(user_error.get('message'))
+                        failed.add(offset)
+                else:
+                    errors.setdefault(start + index, []).append(user_error.get('message'))
+                    failed.add(index)
+
+            # Returned metafields come back for the successful inputs only
+            returned = {
+                ((mf.get('owner') or {}).get('id'), mf.get('namespace'), mf.get('key')): mf
+                for mf in result.get('metafields') or []
+            }
+            for offset, item_input in enumerate(inputs):
+                if offset in failed:
+                    continue
+                saved[start + offset] = returned.get(
+                    (item_input['ownerId'], item_input['namespace'], item_input['key'])
+                )
+
+        logger.info(
+            f"metafieldsSet saved {sum(1 for mf in saved if mf)}/{len(metafields)} metafields "
+            f"for {self.shop_domain}"
+        )
+        return {'metafields': saved, 'errors': errors}
     
     def get_metafields(self, owner_type, owner_id, namespace=None, key=None):
         """
@@ -195,13 +340,30 @@ class ShopifyMetafields:
         """
         Bulk update multiple metafields
         
+        Items carrying owner_id/namespace/key are written through metafieldsSet
+        in batches of 25. Legacy items that only have a metafield id fall back
+        to the per-item REST update.
+        
         Args:
-            metafields: List of metafield objects with id and value
+            metafields: List of metafield objects (owner_id, namespace, key,
+                value, type) or legacy objects with id and value
         """
         try:
             updated_count = 0
+            batched = [mf for mf in metafields if mf.get('owner_id') and mf.get('namespace') and mf.get('key')]
+            legacy = [mf for mf in metafields if not (mf.get('owner_id') and mf.get('namespace') and mf.get('key'))]
             
-            for metafield in metafields:
+            if batched:
+                result = self.set_metafields(batched)
+                updated_count += sum(1 for mf in result['metafields'] if mf)
+                for index, messages in result['errors'].items():
+                    item = batched[index]
+                    logger.warning(
+                        f"metafieldsSet failed for {item.get('namespace')}.{item.get('key')} "
+                        f"on {item.get('owner_id')}: {'; '.join(str(m) for m in messages)}"
+                    )
+            
+            for metafield in legacy:
                 metafield_id = metafield.get('id')
                 value = metafield.get('value')
                 value_type = metafield.get('type')
@@ -209,6 +371,9 @@ class ShopifyMetafields:
                 if self.update_metafield(metafield_id, value, value_type):
                     updated_count += 1
             
+            if batched:
+                _invalidate_cached_metafields(self.shop_domain)
+            
             logger.info(f"Bulk updated {updated_count}/{len(metafields)} metafields")
             return updated_count
             
@@ -216,6 +381,37 @@ class ShopifyMetafields:
             logger.error(f"Error in bulk update: {e}")
             return 0
 
+# Per-shop metafield read cache (Redis cache-aside, same pattern as store settings)
+def _metafields_cache_key(shop_domain):
+    return f"metafields:{shop_domain}"
+
+
+def _get_cached_metafields(shop_domain):
+    try:
+        from cache_utils import cache_get
+        cached = cache_get(_metafields_cache_key(shop_domain))
+        return cached if isinstance(cached, dict) else None
+    except Exception as e:
+        logger.debug(f"Metafields cache read skipped: {e}")
+        return None
+
+
+def _set_cached_metafields(shop_domain, data):
+    try:
+        from cache_utils import cache_set
+        cache_set(_metafields_cache_key(shop_domain), data, expire=METAFIELDS_CACHE_TTL)
+    except Exception as e:
+        logger.debug(f"Metafields cache write skipped: {e}")
+
+
+def _invalidate_cached_metafields(shop_domain):
+    try:
+        from cache_utils import cache_delete
+        cache_delete(_metafields_cache_key(shop_domain))
+    except Exception as e:
+        logger.debug(f"Metafields cache invalidation skipped: {e}")
+
+
 # Employee Suite specific metafield operations
 class EmployeeSuiteMetafields(ShopifyMetafields):
     """
@@ -227,6 +423,90 @@ class EmployeeSuiteMetafields(ShopifyMetafields):
     def __init__(self, shop_domain, access_token):
         super().__init__(shop_domain, access_token)
     
+    def load_metafields(self, product_ids=None):
+        """
+        Load shop settings and product notes in one aliased GraphQL query
+        
+        Results are cached per shop; only product ids missing from the
+        cache are fetched.
+        
+        Args:
+            product_ids: Optional product ids whose notes should be loaded
+        
+        Returns:
+            Dict with shop_id, inventory_settings, analytics_preferences and
+            product_notes (product id -> notes)
+        """
+        product_ids = [str(pid) for pid in (product_ids or [])]
+        cached = _get_cached_metafields(self.shop_domain)
+        if cached and all(pid in cached.get('product_notes', {}) for pid in product_ids):
+            return cached
+        
+        data = cached or {'product_notes': {}}
+        missing = [pid for pid in product_ids if pid not in data['product_notes']]
+        
+        variable_defs = ['$namespace: String!']
+        variables = {'namespace': self.NAMESPACE}
+        product_fields = []
+        for index, pid in enumerate(missing):
+            variable_defs.append(f'$p{index}: ID!')
+            variables[f'p{index}'] = self._owner_gid('product', pid)
+            product_fields.append(
+                f'p{index}: product(id: $p{index}) {{ notes: metafield(namespace: $namespace, key: "notes") {{ value }} }}'
+            )
+        
+        query = f"""
+        query employeeSuiteMetafields({', '.join(variable_defs)}) {{
+            shop {{
+                id
+                inventorySettings: metafield(namespace: $namespace, key: "inventory_settings") {{ value }}
+                analyticsPreferences: metafield(namespace: $namespace, key: "analytics_preferences") {{ value }}
+            }}
+            {' '.join(product_fields)}
+        }}
+        """
+        
+        result = self._graphql(query, variables)
+        if 'error' in result:
+            return data
+        
+        shop = result.get('shop') or {}
+        data['shop_id'] = shop.get('id')
+        data['inventory_settings'] = self._parse_json_value(shop.get('inventorySettings'))
+        data['analytics_preferences'] = self._parse_json_value(shop.get('analyticsPreferences'))
+        for index, pid in enumerate(missing):
+            product = result.get(f'p{index}') or {}
+            data['product_notes'][pid] = (product.get('notes') or {}).get('value', '')
+        
+        _set_cached_metafields(self.shop_domain, data)
+        return data
+    
+    @staticmethod
+    def _parse_json_value(metafield):
+        if not metafield or not metafield.get('value'):
+            return {}
+        try:
+            return json.loads(metafield['value'])
+        except (TypeError, ValueError):
+            return {}
+    
+    def _set_shop_metafield(self, key, value):
+        """Upsert a JSON shop metafield through metafieldsSet"""
+        shop_id = self.load_metafields().get('shop_id')
+        if not shop_id:
+            logger.error(f"Cannot store {key}: shop id unavailable for {self.shop_domain}")
+            return None
+        
+        result = self.set_metafields([{
+            'owner_id': shop_id,
+            'namespace': self.NAMESPACE,
+            'key': key,
+            'value': json.dumps(value),
+            'type': 'json',
+        }])
+        _invalidate_cached_metafields(self.shop_domain)
+        return result['metafields'][0]
+    
     def store_inventory_settings(self, settings):
         """
         Store inventory management settings
@@ -234,26 +514,13 @@ class EmployeeSuiteMetafields(ShopifyMetafields):
         Args:
             settings: Dictionary of inventory settings
         """
-        return self.create_metafield(
-            "shop", 
-            self.shop_domain,
-            self.NAMESPACE,
-            "inventory_settings",
-            json.dumps(settings),
-            "json_string",
-            "Employee Suite inventory management settings"
-        )
+        return self._set_shop_metafield("inventory_settings", settings)
     
     def get_inventory_settings(self):
         """
         Get inventory management settings
         """
-        metafields = self.get_shop_metafields(self.NAMESPACE)
-        if metafields:
-            for metafield in metafields:
-                if metafield.get('key') == 'inventory_settings':
-                    return json.loads(metafield.get('value', '{}'))
-        return {}
+        return self.load_metafields().get('inventory_settings') or {}
     
     def store_analytics_preferences(self, preferences):
         """
@@ -262,26 +529,13 @@ class EmployeeSuiteMetafields(ShopifyMetafields):
         Args:
             preferences: Dictionary of analytics preferences
         """
-        return self.create_metafield(
-            "shop",
-            self.shop_domain,
-            self.NAMESPACE,
-            "analytics_preferences",
-            json.dumps(preferences),
-            "json_string",
-            "Employee Suite analytics preferences"
-        )
+        return self._set_shop_metafield("analytics_preferences", preferences)
     
     def get_analytics_preferences(self):
         """
         Get analytics preferences
         """
-        metafields = self.get_shop_metafields(self.NAMESPACE)
-        if metafields:
-            for metafield in metafields:
-                if metafield.get('key') == 'analytics_preferences':
-                    return json.loads(metafield.get('value', '{}'))
-        return {}
+        return self.load_metafields().get('analytics_preferences') or {}
     
     def store_product_notes(self, product_id, notes):
         """
@@ -291,24 +545,45 @@ class EmployeeSuiteMetafields(ShopifyMetafields):
             product_id: Shopify product ID
             notes: Product notes string
         """
-        return self.create_metafield(
-            "product",
-            product_id,
-            self.NAMESPACE,
-            "notes",
-            notes,
-            "multi_line_text_field",
-            "Employee Suite product notes"
-        )
+        return self.store_product_notes_bulk({product_id: notes}).get(str(product_id))
+    
+    def store_product_notes_bulk(self, notes_by_product):
+        """
+        Store notes for many products in batched metafieldsSet calls
+        
+        Args:
+            notes_by_product: Dict of product id -> notes string
+        
+        Returns:
+            Dict of product id -> saved metafield (None when that item failed)
+        """
+        product_ids = [str(pid) for pid in notes_by_product]
+        result = self.set_metafields([
+            {
+                'owner_type': 'product',
+                'owner_id': pid,
+                'namespace': self.NAMESPACE,
+                'key': 'notes',
+                'value': notes or '',
+                'type': 'multi_line_text_field',
+            }
+            for pid, notes in zip(product_ids, notes_by_product.values())
+        ])
+        _invalidate_cached_metafields(self.shop_domain)
+        return dict(zip(product_ids, result['metafields']))
     
     def get_product_notes(self, product_id):
         """
         Get notes for a specific product
         """
-        metafields = self.get_metafields("product", product_id, self.NAMESPACE, "notes")
-        if metafields and len(metafields) > 0:
-            return metafields[0].get('value', '')
-        return ""
+        return self.load_metafields([product_id])['product_notes'].get(str(product_id), '')
+    
+    def get_product_notes_bulk(self, product_ids):
+        """
+        Get notes for many products with a single query
+        """
+        notes = self.load_metafields(product_ids)['product_notes']
+        return {str(pid): notes.get(str(pid), '') for pid in product_ids}
     
     def store_custom_field(self, owner_type, owner_id, field_name, value, field_type="string"):
         """
@@ -418,16 +693,8 @@ def update_product_notes(product_id):
         
         metafields_manager = EmployeeSuiteMetafields(shop, store.access_token)
         
-        # Check if notes metafield already exists
-        existing_metafields = metafields_manager.get_metafields("product", product_id, metafields_manager.NAMESPACE, "notes")
-        
-        if existing_metafields and len(existing_metafields) > 0:
-            # Update existing metafield
-            metafield_id = existing_metafields[0].get('id')
-            result = metafields_manager.update_metafield(metafield_id, notes, "multi_line_text_field")
-        else:
-            # Create new metafield
-            result = metafields_manager.store_product_notes(product_id, notes)
+        # metafieldsSet upserts - no need to look up an existing metafield first
+        result = metafields_manager.store_product_notes(product_id, notes)
         
         if result:
             return jsonify({
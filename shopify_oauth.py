@@ -5,7 +5,6 @@ import time
 import base64
 from urllib.parse import quote, unquote
 
-import requests
 from flask import Blueprint, current_app, redirect, render_template, request, session
 from flask_login import current_user, login_user
 
@@ -885,6 +884,7 @@ def verify_hmac(params):
 
 def exchange_code_for_token(shop, code):
     """Exchange authorization code for access token"""
+    import requests  # Lazy: keeps requests off the boot path
     url = f"https://{shop}/admin/oauth/access_token"
 
     payload = {
@@ -4,44 +4,84 @@ Track key business metrics for growth
 """
 
 import logging
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Any, Dict
 
 logger = logging.getLogger(__name__)
 
+METRICS_CACHE_SECONDS = 60  # Admin dashboard and /metrics callers share one computation per minute
+METRICS_CACHE_KEY = "metrics:conversion"
+
+_local = {"value": None, "expires": 0.0}  # Fallback while Redis is down
+_local_lock = threading.Lock()
+
+
+def _conversion_counts() -> Dict[str, int]:
+    """Every count the metrics need, in one statement"""
+    from sqlalchemy import func, select
+
+    from models import ShopifyStore, User, db
+
+    now = datetime.utcnow()
+    active_stores = (
+        select(func.count(ShopifyStore.id))
+        .where(ShopifyStore.is_active == True)
+        .scalar_subquery()
+    )
+    row = db.session.execute(
+        select(
+            func.count(User.id).label("total_users"),
+            func.count(User.id)
+            .filter(User.trial_ends_at > now, User.is_subscribed == False)
+            .label("trial_users"),
+            func.count(User.id).filter(User.is_subscribed == True).label("paid_users"),
+            active_stores.label("active_stores"),
+        )
+    ).one()
+    return dict(row._mapping)
+
 
 def track_conversion_metrics() -> Dict[str, Any]:
-    """Track key conversion metrics"""
+    """Track key conversion metrics (cached for METRICS_CACHE_SECONDS)"""
+    with _local_lock:
+        if _local["value"] is not None and _local["expires"] > time.monotonic():
+            return dict(_local["value"])
+
     try:
-        from models import User, db
-
-        # Calculate key metrics
-        total_users = User.query.count()
-
-        # Trial to paid conversion
-        trial_users = User.query.filter(
-            User.trial_ends_at > datetime.utcnow(), User.is_subscribed == False
-        ).count()
-
-        paid_users = User.query.filter(User.is_subscribed == True).count()
-
-        # Monthly recurring revenue (MRR)
-        mrr = paid_users * 39  # $39/month per user
-
-        # Annual recurring revenue (ARR)
-        arr = mrr * 12
-
-        return {
-            "total_users": total_users,
-            "trial_users": trial_users,
-            "paid_users": paid_users,
-            "conversion_rate": (paid_users / total_users * 100)
-            if total_users > 0
-            else 0,
-            "mrr": mrr,
-            "arr": arr,
-            "last_updated": datetime.utcnow().isoformat(),
-        }
+        from cache_utils import cache_get, cache_set
+
+        metrics = cache_get(METRICS_CACHE_KEY)
+        if not isinstance(metrics, dict):
+            counts = _conversion_counts()
+            total_users = counts["total_users"]
+            paid_users = counts["paid_users"]
+
+            # Monthly recurring revenue (MRR)
+            mrr = paid_users * 39  # $39/month per user
+
+            # Annual recurring revenue (ARR)
+            arr = mrr * 12
+
+            metrics = {
+                "total_users": total_users,
+                "trial_users": counts["trial_users"],
+                "paid_users": paid_users,
+                "active_stores": counts["active_stores"],
+                "conversion_rate": (paid_users / total_users * 100)
+                if total_users > 0
+                else 0,
+                "mrr": mrr,
+                "arr": arr,
+                "last_updated": datetime.utcnow().isoformat(),
+            }
+            cache_set(METRICS_CACHE_KEY, metrics, expire=METRICS_CACHE_SECONDS)
+
+        with _local_lock:
+            _local["value"] = metrics
+            _local["expires"] = time.monotonic() + METRICS_CACHE_SECONDS
+        return dict(metrics)
 
     except Exception as e:
         logger.error(f"Metrics tracking failed: {e}")
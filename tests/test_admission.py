@@ -0,0 +1,95 @@
+"""
+Admission control: shedding at capacity, priority slots, per-shop heavy queueing.
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+from core import admission
+
+
+def _wsgi_app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return iter([b"ok"])
+
+
+def _call(app, path):
+    """(status, body iterator) - the body stays open until closed, like a slow response"""
+    status = []
+    body = app({"PATH_INFO": path, "REQUEST_METHOD": "GET"}, lambda s, headers: status.append(s))
+    return status[0], body
+
+
+def test_capacity_defaults_to_off_outside_gunicorn(monkeypatch):
+    monkeypatch.delenv("ADMISSION_CAPACITY", raising=False)
+    assert not admission.AdmissionController().enabled
+    monkeypatch.setenv("ADMISSION_CAPACITY", "8")
+    assert admission.AdmissionController().enabled
+
+
+def test_sheds_at_capacity_and_releases_on_close():
+    controller = admission.AdmissionController(capacity=4, reserved=2)
+    app = controller.wrap(_wsgi_app)
+
+    held = [_call(app, "/dashboard"), _call(app, "/api/orders")]
+    assert [status for status, _ in held] == ["200 OK", "200 OK"]
+    status, _ = _call(app, "/dashboard")
+    assert status == "429 Too Many Requests"
+
+    held[0][1].close()
+    status, body = _call(app, "/dashboard")
+    assert status == "200 OK"
+    body.close()
+    held[1][1].close()
+    assert controller.snapshot()["in_flight"] == {"page": 0, "api": 0}
+
+
+def test_webhooks_and_health_are_never_shed():
+    controller = admission.AdmissionController(capacity=3, reserved=2)
+    app = controller.wrap(_wsgi_app)
+
+    held = [_call(app, "/dashboard")]
+    assert _call(app, "/dashboard")[0] == "429 Too Many Requests"
+    held += [_call(app, "/webhooks/orders/create") for _ in range(5)]
+    held += [_call(app, "/health") for _ in range(5)]
+    assert all(status == "200 OK" for status, _ in held)
+
+
+@pytest.fixture
+def heavy_app(monkeypatch):
+    monkeypatch.setenv("ADMISSION_CAPACITY", "8")
+    app = Flask(__name__)
+    controller = admission.init_admission(app)
+    controller.queue_seconds = 0.2
+
+    @app.route("/api/generate_report")
+    def report():
+        return admission.admit_heavy(SimpleNamespace(shop=None)) or "report"
+
+    return app, controller
+
+
+def test_heavy_request_queues_for_the_shop_slot_then_gets_retry_after(heavy_app):
+    app, controller = heavy_app
+    client = app.test_client()
+    key = "ip:127.0.0.1"
+
+    # Slot freed while queued: admitted
+    assert controller.acquire_shop(key)
+    threading.Timer(0.05, controller.release_shop, (key,)).start()
+    response = client.get("/api/generate_report")
+    assert response.get_data(as_text=True) == "report"
+    assert controller.shop_heavy[key] == 1
+    response.close()
+    assert key not in controller.shop_heavy  # Released when the body closed
+
+    # Slot held past the queue window: turned away
+    assert controller.acquire_shop(key)
+    started = time.monotonic()
+    response = client.get("/api/generate_report")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(admission.HEAVY_RETRY_AFTER)
+    assert time.monotonic() - started >= controller.queue_seconds
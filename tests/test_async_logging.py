@@ -0,0 +1,89 @@
+"""
+Async log pipeline: the caller only enqueues, overload sheds records, flush drains.
+"""
+import logging
+import threading
+import time
+
+from logging_config import AsyncLogPipeline
+
+
+class SlowHandler(logging.Handler):
+    """A handler stuck on a stalled disk until released"""
+
+    def __init__(self):
+        super().__init__()
+        self.unblock = threading.Event()
+        self.messages = []
+
+    def emit(self, record):
+        self.unblock.wait(5)
+        self.messages.append(record.getMessage())
+
+
+def _logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    return logger
+
+
+def test_stalled_handler_does_not_block_caller():
+    slow = SlowHandler()
+    pipeline = AsyncLogPipeline(maxsize=100)
+    pipeline.start()
+    logger = _logger("tests.async_logging.stall", pipeline.handler("stall", [slow]))
+
+    started = time.perf_counter()
+    for i in range(50):
+        logger.info("event %s", i)
+    assert time.perf_counter() - started < 0.5
+
+    slow.unblock.set()
+    pipeline.stop()
+    assert slow.messages == [f"event {i}" for i in range(50)]
+
+
+def test_overload_sheds_info_but_keeps_warnings():
+    slow = SlowHandler()
+    pipeline = AsyncLogPipeline(maxsize=20)
+    pipeline.start()
+    logger = _logger("tests.async_logging.overload", pipeline.handler("overload", [slow]))
+
+    for i in range(200):
+        logger.info("noise %s", i)
+    logger.warning("important")
+
+    assert pipeline.sampled_out > 0
+    slow.unblock.set()
+    pipeline.stop()
+    assert len(slow.messages) < 200
+    assert "important" in slow.messages
+
+
+def test_records_after_stop_are_written_inline():
+    slow = SlowHandler()
+    slow.unblock.set()
+    pipeline = AsyncLogPipeline()
+    logger = _logger("tests.async_logging.inline", pipeline.handler("inline", [slow]))
+
+    logger.error("last breath")
+    assert slow.messages == ["last breath"]
+
+
+def test_sensitive_args_are_redacted_on_the_listener():
+    from logging_config import SecurityFilter
+
+    sink = SlowHandler()
+    sink.unblock.set()
+    sink.addFilter(SecurityFilter())
+    pipeline = AsyncLogPipeline()
+    pipeline.start()
+    logger = _logger("tests.async_logging.redact", pipeline.handler("redact", [sink]))
+
+    logger.info("header %s for %s", "Authorization: Bearer abc", "shop")
+    logger.info("creds %s", {"access_token": "shpat_0123456789abcdef"})
+    pipeline.stop()
+
+    assert sink.messages == ["header [REDACTED] for shop", "creds [REDACTED]"]
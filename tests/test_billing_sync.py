@@ -0,0 +1,129 @@
+"""
+Metered billing sync: aliased usage-record batches and the bulk reported_at update.
+"""
+import pytest
+from flask import Flask
+
+import billing_metered
+from models import ShopifyStore, UsageEvent, User, db
+
+
+def _record_id(key):
+    """Stub Shopify: the usage record GID is derived from the idempotency key"""
+    return f"gid://shopify/AppUsageRecord/{key.rsplit('-', 1)[-1]}"
+
+
+class FakeGraphQL:
+    """Answers aliased appUsageRecordCreate batches; keys in `rejected` get userErrors"""
+
+    def __init__(self, rejected=()):
+        self.rejected = set(rejected)
+        self.batches = []
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        variables = json["variables"]
+        keys = {name[1:]: value for name, value in variables.items() if name.startswith("k")}
+        self.batches.append(sorted(keys.values()))
+        data = {}
+        # Answer in reverse order: results must be matched by alias, not position
+        for index in sorted(keys, key=int, reverse=True):
+            key = keys[index]
+            if key in self.rejected:
+                data[f"u{index}"] = {"appUsageRecord": None,
+                                     "userErrors": [{"field": ["idempotencyKey"], "message": "rejected"}]}
+            else:
+                data[f"u{index}"] = {"appUsageRecord": {"id": _record_id(key)}, "userErrors": []}
+        return FakeResponse({"data": data})
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class _Closing:
+    """requests.Session() stand-in usable as a context manager"""
+
+    def __init__(self, graphql):
+        self.post = graphql.post
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+def _events(*numbers):
+    return [{"id": n, "event_type": "report_generated", "description": None, "price": "0.50",
+             "idempotency_key": f"evt-{n}"} for n in numbers]
+
+
+def test_batch_maps_aliases_back_to_events():
+    shopify = FakeGraphQL(rejected={"evt-2"})
+    synced = billing_metered.sync_usage_events_batch(
+        "demo.myshopify.com", "shpat_x", "gid://line/1", _events(1, 2, 3), session=shopify)
+
+    assert synced == {1: _record_id("evt-1"), 3: _record_id("evt-3")}
+    assert shopify.batches == [["evt-1", "evt-2", "evt-3"]]
+
+
+def test_batch_connection_failure_syncs_nothing():
+    class Down:
+        def post(self, *args, **kwargs):
+            raise ConnectionError("shopify down")
+
+    assert billing_metered.sync_usage_events_batch(
+        "demo.myshopify.com", "shpat_x", "gid://line/1", _events(1), session=Down()) == {}
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'billing.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        user = User(email="owner@example.com", password_hash="x")
+        db.session.add(user)
+        db.session.flush()
+        store = ShopifyStore(user_id=user.id, shop_url="demo.myshopify.com", access_token="shpat_x")
+        db.session.add(store)
+        db.session.flush()
+        for n in range(1, 13):
+            db.session.add(UsageEvent(id=n, store_id=store.id, event_type="report_generated",
+                                      price=0.5, idempotency_key=f"evt-{n}"))
+        db.session.commit()
+
+        import app_factory
+        monkeypatch.setattr(app_factory, "create_app", lambda: app)
+        yield app
+
+
+def test_worker_marks_only_accepted_events_reported(app, monkeypatch):
+    import requests
+    import worker
+
+    shopify = FakeGraphQL(rejected={"evt-4", "evt-11"})
+    invalidated = []
+    monkeypatch.setattr(requests, "Session", lambda: _Closing(shopify))
+    monkeypatch.setattr(worker, "USAGE_SYNC_SHOP_INTERVAL", 0)
+    monkeypatch.setattr(ShopifyStore, "get_access_token", lambda self: "shpat_x")
+    monkeypatch.setattr(billing_metered, "get_subscription_line_item_id_cached", lambda shop, token: "gid://line/1")
+    monkeypatch.setattr(billing_metered, "invalidate_subscription_line_item", invalidated.append)
+
+    assert worker.sync_usage_to_shopify() == {"status": "success", "synced": 10}
+
+    # Two aliased requests of USAGE_RECORDS_PER_REQUEST records each
+    assert [len(batch) for batch in shopify.batches] == [10, 2]
+    db.session.expire_all()
+    reported = {e.id: e.shopify_usage_record_id for e in UsageEvent.query if e.reported_at is not None}
+    assert set(reported) == set(range(1, 13)) - {4, 11}
+    assert all(record_id == event_id for event_id, record_id in reported.items())
+    assert invalidated == ["demo.myshopify.com"]
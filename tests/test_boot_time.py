@@ -0,0 +1,59 @@
+"""
+Cold-start guard - importing main (which builds the app) must stay fast and lazy.
+
+Render cold starts surface as blank embedded iframes, so boot time has a
+budget. Override it with BOOT_BUDGET_SECONDS on slow CI machines.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BOOT_BUDGET_SECONDS = float(os.getenv("BOOT_BUDGET_SECONDS", "3.0"))
+
+# Only needed once a request actually uses them
+LAZY_MODULES = ("requests", "sendgrid", "jwt", "celery", "stripe", "worker")
+
+BOOT_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+@pytest.fixture(scope="module")
+def boot(tmp_path_factory):
+    """Boot main in a fresh interpreter (best of two runs, to ride out noise)"""
+    workdir = tmp_path_factory.mktemp("boot")
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{workdir / 'boot.db'}",
+        STARTUP_PROFILE="",
+    )
+    script = BOOT_SCRIPT.format(root=REPO_ROOT, lazy=LAZY_MODULES)
+    runs = []
+    for _ in range(2):
+        result = subprocess.run(
+            [sys.executable, "-c", script], cwd=workdir, env=env,
+            capture_output=True, text=True, timeout=120,
+        )
+        assert result.returncode == 0, result.stderr[-2000:]
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return min(runs, key=lambda run: run["seconds"])
+
+
+def test_boot_within_budget(boot):
+    assert boot["seconds"] < BOOT_BUDGET_SECONDS, (
+        f"Boot took {boot['seconds']:.2f}s (budget {BOOT_BUDGET_SECONDS}s) - "
+        "run with STARTUP_PROFILE=1 to see which imports regressed"
+    )
+
+
+def test_heavy_modules_stay_lazy(boot):
+    assert boot["loaded"] == []
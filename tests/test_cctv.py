@@ -0,0 +1,133 @@
+"""
+CCTV watchdog: ownership from the identity cache, deduped re-home off the request thread.
+"""
+import threading
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask, session
+
+import identity_cache
+from core import cctv
+from models import ShopifyStore, User, db
+
+SHOP = "demo.myshopify.com"
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    store = {}
+    monkeypatch.setattr(identity_cache, "cache_get", store.get)
+    monkeypatch.setattr(identity_cache, "cache_set", lambda key, value, expire=None: store.__setitem__(key, value))
+    monkeypatch.setattr(identity_cache, "cache_delete", lambda key: store.pop(key, None))
+    identity_cache.clear_local_identities()
+    monkeypatch.setattr(cctv, "_pending", {})
+
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'cctv.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        owner = User(email="owner@example.com", password_hash="x")
+        intruder = User(email="other@example.com", password_hash="x")
+        db.session.add_all([owner, intruder])
+        db.session.flush()
+        db.session.add(ShopifyStore(user_id=owner.id, shop_url=SHOP, access_token="shpat_a"))
+        db.session.commit()
+        app.owner_id, app.other_id = owner.id, intruder.id
+        yield app
+    identity_cache.clear_local_identities()
+
+
+class Published(list):
+    """rehome_store.apply_async calls; set `gate` to hold the publish"""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = None
+        self.done = threading.Event()
+
+
+@pytest.fixture
+def published(monkeypatch):
+    import worker
+
+    calls = Published()
+
+    def apply_async(args, **kwargs):
+        if calls.gate is not None:
+            calls.gate.wait(2)
+        calls.append(args)
+        calls.done.set()
+
+    monkeypatch.setattr(worker.rehome_store, "apply_async", apply_async)
+    return calls
+
+
+def _watch(app, user_id, ctx=None, shop=SHOP):
+    with app.test_request_context(f"/dashboard?shop={shop}"):
+        session["_user_id"] = user_id
+        cctv.cctv_watchdog(ctx or SimpleNamespace(shop=None, identity=None))
+
+
+def _identity(user_id):
+    return identity_cache.ShopIdentity({"user_id": user_id, "shop_url": SHOP})
+
+
+def test_owner_match_from_the_identity_cache_runs_no_sql(app, published, monkeypatch):
+    identity_cache.set_identity(SHOP, {"user_id": app.owner_id, "shop_url": SHOP})
+    monkeypatch.setattr(ShopifyStore, "query", None)  # Any store lookup would raise
+    _watch(app, app.owner_id)
+    _watch(app, app.owner_id, ctx=SimpleNamespace(shop=SHOP, identity=_identity(app.owner_id)))
+    assert published == [] and cctv._pending == {}
+
+
+def test_mismatch_is_published_without_blocking_the_request(app, published):
+    published.gate = threading.Event()
+    _watch(app, app.other_id, ctx=SimpleNamespace(shop=SHOP, identity=_identity(app.owner_id)))
+    assert published == []  # Request finished while the broker was still "connecting"
+
+    published.gate.set()
+    assert published.done.wait(2)
+    assert published == [(SHOP, app.other_id)]
+
+
+def test_one_rehome_per_window(app, published, monkeypatch):
+    identity_cache.set_identity(SHOP, {"user_id": app.owner_id, "shop_url": SHOP})
+    _watch(app, app.other_id)
+    assert published.done.wait(2)
+    _watch(app, app.other_id)
+    assert published == [(SHOP, app.other_id)]
+
+    monkeypatch.setattr(cctv, "CCTV_REQUEUE_SECONDS", 0)
+    cctv._pending.clear()
+    _watch(app, app.other_id)
+    _watch(app, app.other_id + 1)
+    assert len(cctv._pending) == 1  # Expired entries pruned on insert
+
+
+def test_broker_error_releases_the_claim(app, monkeypatch):
+    import worker
+
+    def broker_down(args, **kwargs):
+        raise ConnectionError("broker down")
+
+    monkeypatch.setattr(worker.rehome_store, "apply_async", broker_down)
+    cctv._claim((SHOP, app.other_id), 0)
+    cctv._publish_rehome(SHOP, app.other_id)
+    assert cctv._pending == {}
+
+
+def test_rehome_task_moves_the_store_and_drops_its_identity(app, monkeypatch):
+    import app_factory
+    import worker
+
+    monkeypatch.setattr(app_factory, "create_app", lambda: app)
+    identity_cache.set_identity(SHOP, {"user_id": app.owner_id, "shop_url": SHOP})
+
+    worker.rehome_store(SHOP, app.other_id)
+    assert ShopifyStore.query.filter_by(shop_url=SHOP).one().user_id == app.other_id
+    assert identity_cache.get_identity(SHOP) is None
+
+    worker.rehome_store("missing.myshopify.com", app.other_id)  # Unknown shop: no-op
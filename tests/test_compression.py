@@ -0,0 +1,60 @@
+"""
+Response compression: buffered and streamed bodies, ranges and ETags.
+"""
+import gzip
+
+import pytest
+from flask import Flask, Response
+
+from performance import compress_response
+
+BODY = "x" * 4096
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.after_request(compress_response)
+
+    @app.route("/page")
+    def page():
+        response = Response(BODY, mimetype="text/html")
+        response.set_etag("v1")
+        return response
+
+    @app.route("/stream")
+    def stream():
+        return Response((BODY[i:i + 512] for i in range(0, len(BODY), 512)), mimetype="text/csv")
+
+    @app.route("/partial")
+    def partial():
+        response = Response(BODY[:2048], status=206, mimetype="text/plain")
+        response.headers["Content-Range"] = f"bytes 0-2047/{len(BODY)}"
+        return response
+
+    return app.test_client()
+
+
+def test_buffered_body_is_gzipped_with_weak_etag(client):
+    response = client.get("/page", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data).decode() == BODY
+    assert response.headers["ETag"] == 'W/"v1"'
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+    identity = client.get("/page")
+    assert identity.headers["ETag"] == '"v1"'
+
+
+def test_streamed_body_is_compressed_incrementally(client):
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    assert gzip.decompress(response.data).decode() == BODY
+
+
+def test_partial_content_is_left_alone(client):
+    response = client.get("/partial", headers={"Accept-Encoding": "gzip", "Range": "bytes=0-2047"})
+    assert response.status_code == 206
+    assert "Content-Encoding" not in response.headers
+    assert response.data.decode() == BODY[:2048]
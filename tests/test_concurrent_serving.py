@@ -0,0 +1,262 @@
+"""
+Concurrent serving load test - the real main:app under gunicorn.conf.py.
+
+Also checks the preload-and-fork hooks: workers fork from a master that
+imported the app, and start with fresh DB pools and a frozen heap.
+
+A thin wrapper module imports main:app (full middleware pipeline, session,
+rate limiter, identity cache) and adds probe routes that exercise the
+process-wide state the gthread change made lock-protected: the
+performance cache, the CSRF token store and the circuit breaker. Upstream
+calls go to a local server that sleeps like a slow Shopify API.
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHOPIFY_LATENCY = 0.25
+REQUESTS = 32
+SHOPS = 4
+
+pytestmark = pytest.mark.integration
+
+PROBE_APP = textwrap.dedent(
+    """
+    import os
+
+    import requests
+    from flask import jsonify, request
+
+    from main import app
+    from core import circuit_breaker
+    from csrf_protection import csrf_manager, init_csrf_protection
+    import performance
+
+    init_csrf_protection(app)
+    upstream = requests.Session()
+
+    # Preloaded in the master: open a pooled connection and tag the pool, so
+    # workers can show they were handed a fresh one after the fork
+    from sqlalchemy import text
+    from models import db
+    with app.app_context():
+        db.session.execute(text("SELECT 1"))
+        db.session.remove()
+        db.engine.pool.probe_preloaded = True
+    PRELOAD_PID = os.getpid()
+    STANDIN = os.environ["SHOPIFY_STANDIN_URL"]
+
+    @performance.cache_result(ttl=60)
+    def shop_products(shop):
+        return upstream.get(f"{STANDIN}/products?shop={shop}", timeout=10).json()
+
+    @circuit_breaker.with_circuit_breaker("standin", fallback_data={"error": "open"})
+    def failing_call():
+        upstream.get(f"{STANDIN}/fail", timeout=10).raise_for_status()
+
+    @app.route("/concurrency/products")
+    def concurrency_products():
+        token = csrf_manager.generate_token("probe")
+        products = shop_products(request.args["shop"])
+        return jsonify(products=products, csrf_ok=csrf_manager.validate_token(token, "probe"))
+
+    @app.route("/concurrency/fail")
+    def concurrency_fail():
+        try:
+            return jsonify(result=failing_call())
+        except Exception:
+            return jsonify(result="raised")
+
+    @app.route("/concurrency/worker")
+    def concurrency_worker():
+        import gc
+        return jsonify(
+            pid=os.getpid(),
+            preload_pid=PRELOAD_PID,
+            inherited_pool=getattr(db.engine.pool, "probe_preloaded", False),
+            gc_enabled=gc.isenabled(),
+            gc_frozen=gc.get_freeze_count(),
+        )
+
+    @app.route("/concurrency/state")
+    def concurrency_state():
+        with performance._cache_lock:
+            cached = [key for key in performance._cache if key.startswith("shop_products:")]
+        with circuit_breaker._circuit_lock:
+            circuit = dict(circuit_breaker._circuit_states["standin"])
+        with csrf_manager._tokens_lock:
+            probe_tokens = sum(1 for t in csrf_manager._tokens.values() if t["session_id"] == "probe")
+        return jsonify(cached=len(cached), circuit=circuit, probe_tokens=probe_tokens)
+    """
+)
+
+
+class _SlowShopify(BaseHTTPRequestHandler):
+    hits = Counter()
+    hits_lock = threading.Lock()
+
+    def do_GET(self):
+        time.sleep(SHOPIFY_LATENCY)
+        with self.hits_lock:
+            self.hits[self.path] += 1
+        if self.path.startswith("/fail"):
+            self.send_response(500)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = b'[{"id": 1, "title": "Widget"}]'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(url):
+    with urllib.request.urlopen(url, timeout=30) as resp:
+        assert resp.status == 200
+        return json.loads(resp.read())
+
+
+@pytest.fixture(scope="module")
+def shopify_standin():
+    pytest.importorskip("gunicorn")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SlowShopify)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture(scope="module")
+def app_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp("probe_app")
+    (path / "probe_app.py").write_text(PROBE_APP)
+    return path
+
+
+class _Gunicorn:
+    """main:app (via probe_app) under gunicorn.conf.py; cwd is a temp dir so logs/ stay out of the repo"""
+
+    def __init__(self, worker_class, app_dir, standin_url, workers=2):
+        self.port = _free_port()
+        env = dict(
+            os.environ,
+            PORT=str(self.port),
+            GUNICORN_WORKER_CLASS=worker_class,
+            WEB_CONCURRENCY=str(workers),
+            GUNICORN_THREADS="8",
+            # Every thread may serve page traffic - load shedding is not what's measured here
+            ADMISSION_CAPACITY="10",
+            WARMUP="off",
+            DATABASE_URL=f"sqlite:///{app_dir / 'probe.db'}",
+            SHOPIFY_STANDIN_URL=standin_url,
+            PYTHONPATH=os.pathsep.join([REPO_ROOT, str(app_dir)]),
+        )
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", os.path.join(REPO_ROOT, "gunicorn.conf.py"),
+             "--bind", f"127.0.0.1:{self.port}", "probe_app:app"],
+            cwd=app_dir, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    def __enter__(self):
+        deadline = time.time() + 60
+        while True:
+            try:
+                _get(self.url("/concurrency/state"))
+                return self
+            except (OSError, urllib.error.URLError):
+                if self.proc.poll() is not None or time.time() > deadline:
+                    self.__exit__()
+                    pytest.fail("gunicorn did not start main:app")
+                time.sleep(0.2)
+
+    def __exit__(self, *exc):
+        self.proc.terminate()
+        self.proc.wait(timeout=30)
+
+
+def _throughput(worker_class, app_dir, standin_url):
+    """Requests per second for REQUESTS concurrent uncached hits on one worker class"""
+    with _Gunicorn(worker_class, app_dir, standin_url) as server:
+        urls = [server.url(f"/concurrency/products?shop={worker_class}-{i}") for i in range(REQUESTS)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=REQUESTS) as pool:
+            list(pool.map(_get, urls))
+        return REQUESTS / (time.perf_counter() - started)
+
+
+def test_gthread_overlaps_slow_shopify_calls(shopify_standin, app_dir):
+    sync_rps = _throughput("sync", app_dir, shopify_standin)
+    gthread_rps = _throughput("gthread", app_dir, shopify_standin)
+
+    # 2 sync workers cap out near 2 / latency; 2x8 threads should be far past that
+    assert sync_rps < 2.5 / SHOPIFY_LATENCY
+    assert gthread_rps >= 3 * sync_rps
+
+
+def test_shared_state_is_consistent_under_threads(shopify_standin, app_dir):
+    # One worker so every thread shares the same module-level state
+    with _Gunicorn("gthread", app_dir, shopify_standin, workers=1) as server:
+        product_urls = [server.url(f"/concurrency/products?shop=shared-{i % SHOPS}") for i in range(REQUESTS)]
+        fail_urls = [server.url("/concurrency/fail")] * REQUESTS
+        with ThreadPoolExecutor(max_workers=REQUESTS) as pool:
+            products = list(pool.map(_get, product_urls))
+            failures = list(pool.map(_get, fail_urls))
+        state = _get(server.url("/concurrency/state"))
+
+    # Performance cache: every shop cached once, every response correct
+    assert state["cached"] == SHOPS
+    assert all(body["products"] == [{"id": 1, "title": "Widget"}] for body in products)
+
+    # CSRF store: no token lost to a concurrent insert/cleanup
+    assert all(body["csrf_ok"] for body in products)
+    assert state["probe_tokens"] == REQUESTS
+
+    # Circuit breaker: every upstream failure counted once, then the circuit opened
+    upstream_failures = _SlowShopify.hits["/fail"]
+    assert state["circuit"]["state"] == "open"
+    assert state["circuit"]["failures"] == upstream_failures
+    assert all(body["result"] in ("raised", {"error": "open"}) for body in failures)
+
+
+def test_preloaded_workers_start_fresh(shopify_standin, app_dir):
+    with _Gunicorn("gthread", app_dir, shopify_standin) as server:
+        seen = {}
+        deadline = time.time() + 20
+        while len(seen) < 2 and time.time() < deadline:
+            body = _get(server.url("/concurrency/worker"))
+            seen[body["pid"]] = body
+
+    assert len(seen) == 2, "both workers should serve requests"
+    for pid, body in seen.items():
+        assert body["preload_pid"] != pid  # App imported once, in the master
+        assert body["inherited_pool"] is False  # Pool replaced after the fork
+        assert body["gc_enabled"] and body["gc_frozen"] > 0
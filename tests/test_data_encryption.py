@@ -0,0 +1,78 @@
+"""
+Access-token decryption: PBKDF2 once per key, decrypted tokens cached per ciphertext.
+"""
+import pytest
+
+import data_encryption
+from data_encryption import EncryptionManager, decrypt_access_token, encrypt_access_token, invalidate_token_cache
+from models import ShopifyStore
+
+KEY = "k" * 32
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(data_encryption, "_derived_keys", {})
+    monkeypatch.setattr(data_encryption, "_token_cache", data_encryption.OrderedDict())
+    manager = EncryptionManager(KEY)
+    monkeypatch.setattr(data_encryption, "_encryption_manager", manager)
+
+    manager.decrypts = 0
+    decrypt = manager.decrypt
+
+    def counting_decrypt(encrypted_data):
+        manager.decrypts += 1
+        return decrypt(encrypted_data)
+
+    monkeypatch.setattr(manager, "decrypt", counting_decrypt)
+    return manager
+
+
+def test_key_derivation_runs_once_per_key(monkeypatch):
+    monkeypatch.setattr(data_encryption, "_derived_keys", {})
+    runs = []
+    run_kdf = EncryptionManager._run_kdf
+    monkeypatch.setattr(EncryptionManager, "_run_kdf", staticmethod(lambda password: runs.append(1) or run_kdf(password)))
+
+    assert EncryptionManager(KEY).is_encryption_available()
+    assert EncryptionManager(KEY).is_encryption_available()
+    assert len(runs) == 1
+    assert EncryptionManager("x" * 32).is_encryption_available()
+    assert len(runs) == 2
+
+
+def test_repeat_decrypt_hits_the_cache(manager):
+    ciphertext = encrypt_access_token("shpat_secret")
+    assert ciphertext and not ciphertext.startswith("shpat_")
+
+    assert decrypt_access_token(ciphertext) == "shpat_secret"
+    assert decrypt_access_token(ciphertext) == "shpat_secret"
+    assert manager.decrypts == 1
+
+    assert decrypt_access_token("shpat_plain") == "shpat_plain"  # Plaintext never reaches the cipher
+    assert manager.decrypts == 1
+
+
+def test_expired_entry_is_decrypted_again(manager, monkeypatch):
+    ciphertext = encrypt_access_token("shpat_secret")
+    monkeypatch.setattr(data_encryption, "TOKEN_CACHE_TTL", 0)
+    decrypt_access_token(ciphertext)
+    decrypt_access_token(ciphertext)
+    assert manager.decrypts == 2
+
+
+def test_reconnect_drops_the_stale_token(manager):
+    old, other = encrypt_access_token("shpat_old"), encrypt_access_token("shpat_other")
+    decrypt_access_token(old)
+    decrypt_access_token(other)
+
+    store = ShopifyStore(user_id=1, shop_url="demo.myshopify.com", access_token=old)
+    store.reconnect(encrypt_access_token("shpat_new"))
+    assert len(data_encryption._token_cache) == 1  # Only the reconnected store's entry went
+
+    assert decrypt_access_token(old) == "shpat_old"
+    assert decrypt_access_token(other) == "shpat_other"
+    assert manager.decrypts == 3
+
+    invalidate_token_cache()
+    assert len(data_encryption._token_cache) == 0
@@ -0,0 +1,79 @@
+"""
+Read-replica routing against two SQLite files standing in for primary and replica.
+
+The files hold different rows on purpose, so each read shows which one served it.
+"""
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import select
+from sqlalchemy.orm import Mapped, mapped_column
+
+from core.db_routing import RoutingSession, replica_binds, use_primary
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+
+class Store(db.Model):
+    id: Mapped[int] = mapped_column(primary_key=True)
+    shop_url: Mapped[str] = mapped_column()
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'primary.db'}"
+    app.config["SQLALCHEMY_BINDS"] = replica_binds(f"sqlite:///{tmp_path / 'replica.db'}")
+    db.init_app(app)
+    with app.app_context():
+        for key, shop in ((None, "primary.myshopify.com"), ("replica_0", "replica.myshopify.com")):
+            engine = db.engines[key]
+            db.metadata.create_all(engine)
+            with engine.begin() as conn:
+                conn.execute(Store.__table__.insert().values(id=1, shop_url=shop))
+    return app
+
+
+def _shop():
+    return db.session.scalar(select(Store.shop_url).where(Store.id == 1))
+
+
+def test_reads_go_to_replica(app):
+    with app.app_context():
+        assert _shop() == "replica.myshopify.com"
+
+
+def test_reads_after_commit_stick_to_primary(app):
+    with app.app_context():
+        db.session.add(Store(id=2, shop_url="new.myshopify.com"))
+        db.session.commit()
+        assert _shop() == "primary.myshopify.com"
+        assert db.session.get(Store, 2).shop_url == "new.myshopify.com"
+
+    with app.app_context():  # Next request starts on the replica again
+        assert _shop() == "replica.myshopify.com"
+
+
+def test_use_primary(app):
+    with app.app_context():
+        with use_primary(db.session()):
+            assert _shop() == "primary.myshopify.com"
+        assert _shop() == "replica.myshopify.com"
+
+
+def test_locking_reads_use_primary(app):
+    with app.app_context():
+        stmt = select(Store.shop_url).where(Store.id == 1).with_for_update()
+        assert db.session.scalar(stmt) == "primary.myshopify.com"
+
+
+def test_no_replicas_means_primary(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'only.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        db.session.add(Store(id=1, shop_url="only.myshopify.com"))
+        db.session.commit()
+    with app.app_context():
+        assert _shop() == "only.myshopify.com"
@@ -0,0 +1,115 @@
+"""
+Identity cache: local + Redis tiers, access computed on read, invalidation on commit.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask import Flask
+
+import identity_cache
+from models import ShopifyStore, User, db
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    store = {}
+    monkeypatch.setattr(identity_cache, "cache_get", store.get)
+    monkeypatch.setattr(identity_cache, "cache_set", lambda key, value, expire=None: store.__setitem__(key, value))
+    monkeypatch.setattr(identity_cache, "cache_delete", lambda key: store.pop(key, None))
+    identity_cache.clear_local_identities()
+    yield store
+    identity_cache.clear_local_identities()
+
+
+@pytest.fixture
+def app(tmp_path, redis):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'identity.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        now = datetime.now(timezone.utc)
+        user = User(email="owner@example.com", password_hash="x",
+                    trial_started_at=now - timedelta(days=13), trial_ends_at=now + timedelta(hours=1))
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all([
+            ShopifyStore(user_id=user.id, shop_url="alpha.myshopify.com", access_token="shpat_a"),
+            ShopifyStore(user_id=user.id, shop_url="beta.myshopify.com", access_token="shpat_b"),
+        ])
+        db.session.commit()
+        yield app
+
+
+@pytest.fixture
+def invalidated(monkeypatch):
+    shops = []
+    monkeypatch.setattr(identity_cache, "invalidate_identity", shops.append)
+    return shops
+
+
+def _store(shop_url):
+    return ShopifyStore.query.filter_by(shop_url=shop_url).one()
+
+
+def test_local_tier_in_front_of_redis(redis, monkeypatch):
+    identity_cache.set_identity("alpha.myshopify.com", {"user_id": 7, "shop_url": "alpha.myshopify.com"})
+    assert identity_cache.IDENTITY_KEY_PREFIX + "alpha.myshopify.com" in redis
+
+    redis.clear()
+    assert identity_cache.get_identity("alpha.myshopify.com").id == 7  # Local tier
+
+    identity_cache.clear_local_identities()
+    assert identity_cache.get_identity("alpha.myshopify.com") is None  # Neither tier
+
+    monkeypatch.setattr(identity_cache, "IDENTITY_LOCAL_TTL", 0)
+    identity_cache.set_identity("alpha.myshopify.com", {"user_id": 8, "shop_url": "alpha.myshopify.com"})
+    assert identity_cache.get_identity("alpha.myshopify.com").id == 8  # Local entry expired: Redis tier
+
+    identity_cache.invalidate_identity("alpha.myshopify.com")
+    assert identity_cache.get_identity("alpha.myshopify.com") is None
+
+
+def test_expired_trial_loses_access_without_invalidation(app, monkeypatch):
+    store = _store("alpha.myshopify.com")
+    identity_cache.set_identity(store.shop_url, identity_cache.identity_from_store(store, store.user))
+    assert identity_cache.get_identity(store.shop_url).has_access()
+
+    later = time.time() + 2 * 3600
+    monkeypatch.setattr(identity_cache.time, "time", lambda: later)
+    assert not identity_cache.get_identity(store.shop_url).has_access()
+
+
+def test_subscription_survives_the_trial_end(app, monkeypatch):
+    store = _store("alpha.myshopify.com")
+    store.user.is_subscribed = True
+    identity = identity_cache.ShopIdentity(identity_cache.identity_from_store(store, store.user))
+    monkeypatch.setattr(identity_cache.time, "time", lambda: time.time() + 10 ** 10)
+    assert identity.has_access()
+
+
+def test_uninstall_invalidates_the_shop_on_commit(app, invalidated):
+    store = _store("alpha.myshopify.com")
+    store.is_installed = False
+    db.session.flush()
+    assert invalidated == []  # Not before the commit
+    db.session.commit()
+    assert invalidated == ["alpha.myshopify.com"]
+
+
+def test_plan_change_invalidates_every_shop_of_the_user(app, invalidated):
+    _store("alpha.myshopify.com").user.is_subscribed = True
+    db.session.commit()
+    assert sorted(invalidated) == ["alpha.myshopify.com", "beta.myshopify.com"]
+
+
+def test_unrelated_change_and_rollback_invalidate_nothing(app, invalidated):
+    _store("alpha.myshopify.com").shop_name = "Demo"
+    db.session.commit()
+
+    _store("alpha.myshopify.com").is_active = False
+    db.session.flush()
+    db.session.rollback()
+    db.session.commit()
+    assert invalidated == []
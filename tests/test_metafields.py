@@ -0,0 +1,55 @@
+"""
+metafieldsSet batching: chunks of 25 and userErrors mapped back to input indexes.
+"""
+import pytest
+
+from shopify_metafields import METAFIELDS_SET_BATCH_SIZE, ShopifyMetafields
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = ShopifyMetafields("demo.myshopify.com", "shpat_x")
+    client.chunks = []
+
+    def graphql(query, variables=None):
+        inputs = variables["metafields"]
+        client.chunks.append(inputs)
+        if len(client.chunks) == 3:
+            return {"error": "HTTP 502"}
+        # Second chunk: Shopify rejects its 4th input (field index is chunk-relative)
+        rejected = {3} if len(client.chunks) == 2 else set()
+        saved = [
+            {"id": f"gid://shopify/Metafield/{item['key']}", "namespace": item["namespace"], "key": item["key"],
+             "value": item["value"], "type": item["type"], "owner": {"id": item["ownerId"]}}
+            for offset, item in enumerate(inputs) if offset not in rejected
+        ]
+        return {"metafieldsSet": {
+            "metafields": saved[::-1],  # Matched by owner/namespace/key, not position
+            "userErrors": [{"field": ["metafields", str(i), "value"], "message": "invalid value", "code": "INVALID"}
+                           for i in rejected],
+        }}
+
+    monkeypatch.setattr(client, "_graphql", graphql)
+    return client
+
+
+def _metafields(count):
+    return [{"owner_id": 100 + i, "namespace": "missioncontrol", "key": f"k{i}", "value": {"n": i}, "type": "json"}
+            for i in range(count)]
+
+
+def test_chunks_and_maps_user_errors_to_inputs(client):
+    result = client.set_metafields(_metafields(60))
+
+    assert [len(chunk) for chunk in client.chunks] == [METAFIELDS_SET_BATCH_SIZE, METAFIELDS_SET_BATCH_SIZE, 10]
+    assert client.chunks[0][0]["ownerId"] == "gid://shopify/Product/100"
+    assert client.chunks[1][0]["value"] == '{"n": 25}'
+
+    # 4th input of the second chunk -> input 28; the failed third chunk -> inputs 50..59
+    assert result["errors"][28] == ["invalid value"]
+    assert sorted(result["errors"]) == [28] + list(range(50, 60))
+    assert all(result["errors"][i] == ["HTTP 502"] for i in range(50, 60))
+
+    saved = result["metafields"]
+    assert saved[28] is None and all(mf is None for mf in saved[50:])
+    assert all(saved[i]["key"] == f"k{i}" for i in range(50) if i != 28)
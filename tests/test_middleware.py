@@ -0,0 +1,124 @@
+"""
+Middleware pipeline: stage order, route-class filtering, short-circuits, Server-Timing.
+"""
+import pytest
+from flask import Flask, Response
+
+from core.middleware import (
+    APP_ROUTES,
+    ROUTE_API,
+    ROUTE_HEALTH,
+    ROUTE_PAGE,
+    ROUTE_STATIC,
+    ROUTE_WEBHOOK,
+    MiddlewarePipeline,
+    classify_route,
+)
+
+
+@pytest.fixture
+def pipeline():
+    app = Flask(__name__)
+    pipeline = MiddlewarePipeline(app)
+    pipeline.calls = []
+    pipeline.client = app.test_client()
+
+    for path in ("/dashboard", "/api/orders", "/webhooks/orders/create", "/health", "/static/app.css"):
+        app.add_url_rule(path, path, lambda: "view")
+    return pipeline
+
+
+def _before(pipeline, name, result=None):
+    def stage(ctx):
+        pipeline.calls.append(f"before:{name}")
+        return result
+    return stage
+
+
+def _after(pipeline, name):
+    def stage(ctx, response):
+        pipeline.calls.append(f"after:{name}")
+        return response
+    return stage
+
+
+def test_classify_route():
+    assert classify_route("/health") == ROUTE_HEALTH
+    assert classify_route("/", method="HEAD") == ROUTE_HEALTH
+    assert classify_route("/static/app.css") == ROUTE_STATIC
+    assert classify_route("/favicon.ico") == ROUTE_STATIC
+    assert classify_route("/webhooks/orders/create") == ROUTE_WEBHOOK
+    assert classify_route("/api/orders") == ROUTE_API
+    assert classify_route("/dashboard") == ROUTE_PAGE
+
+
+def test_stages_run_in_registration_order(pipeline):
+    for name in ("one", "two", "three"):
+        pipeline.add_before(name, _before(pipeline, name))
+    for name in ("one", "two", "three"):
+        pipeline.add_after(name, _after(pipeline, name))
+
+    assert pipeline.client.get("/dashboard").get_data(as_text=True) == "view"
+    assert pipeline.calls == [
+        "before:one", "before:two", "before:three",
+        "after:one", "after:two", "after:three",  # Not Flask's reversed after_request order
+    ]
+
+
+def test_stages_only_run_for_their_route_classes(pipeline):
+    pipeline.add_before("auth", _before(pipeline, "auth"), routes=APP_ROUTES)
+    pipeline.add_before("everything", _before(pipeline, "everything"))
+    pipeline.add_after("static_only", _after(pipeline, "static_only"), routes={ROUTE_STATIC})
+
+    pipeline.client.get("/webhooks/orders/create")
+    assert pipeline.calls == ["before:everything"]
+
+    pipeline.calls.clear()
+    pipeline.client.get("/health")
+    pipeline.client.get("/static/app.css")
+    assert pipeline.calls == ["after:static_only"]
+
+    pipeline.calls.clear()
+    pipeline.client.get("/api/orders")
+    assert pipeline.calls == ["before:auth", "before:everything"]
+
+
+def test_short_circuit_skips_later_stages_and_the_view_but_runs_after_stages(pipeline):
+    pipeline.add_before("gate", _before(pipeline, "gate", Response("denied", status=403)))
+    pipeline.add_before("later", _before(pipeline, "later"))
+    pipeline.add_after("headers", _after(pipeline, "headers"))
+
+    response = pipeline.client.get("/dashboard")
+    assert response.status_code == 403 and response.get_data(as_text=True) == "denied"
+    assert pipeline.calls == ["before:gate", "after:headers"]
+    assert response.headers["Server-Timing"].startswith("gate;dur=")
+
+
+def test_broken_after_stage_keeps_the_response(pipeline):
+    def broken(ctx, response):
+        raise RuntimeError("boom")
+
+    pipeline.add_after("broken", broken)
+    pipeline.add_after("headers", _after(pipeline, "headers"))
+    response = pipeline.client.get("/dashboard")
+    assert response.status_code == 200 and pipeline.calls == ["after:headers"]
+
+
+def test_server_timing_lists_stages_view_metrics_and_total(pipeline):
+    pipeline.add_before("rate.limit", _before(pipeline, "rate.limit"))
+
+    def metrics(ctx, response):
+        ctx.add_metric("db", 1.5, "3 queries")
+        return response
+
+    pipeline.add_after("metrics", metrics)
+    timing = pipeline.client.get("/dashboard").headers["Server-Timing"]
+    names = [part.split(";")[0] for part in timing.split(", ")]
+
+    assert names == ["rate_limit", "metrics", "app", "db", "total"]
+    assert 'db;dur=1.50;desc="3 queries"' in timing
+
+
+def test_server_timing_can_be_turned_off(pipeline):
+    pipeline.client.application.config["SERVER_TIMING"] = False
+    assert "Server-Timing" not in pipeline.client.get("/dashboard").headers
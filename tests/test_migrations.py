@@ -0,0 +1,85 @@
+"""
+Versioned migrations: legacy upgrade, idempotence and the one-query steady state.
+"""
+import pytest
+from sqlalchemy import create_engine, event, inspect, text
+
+import migrations
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    """A database from before the absorbed one-off scripts ran"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR(120), password_hash VARCHAR(255))"))
+        conn.execute(text("CREATE TABLE shopify_stores (id INTEGER PRIMARY KEY, user_id INTEGER, shop_url VARCHAR(255))"))
+        conn.execute(text("INSERT INTO users (id, email, password_hash) VALUES (1, 'a@example.com', 'x')"))
+    yield engine
+    engine.dispose()
+
+
+def test_upgrades_legacy_schema(legacy_engine):
+    assert migrations.current_version(legacy_engine) is None
+    assert migrations.migrate(legacy_engine) == migrations.LATEST_VERSION
+
+    columns = {col["name"] for col in inspect(legacy_engine).get_columns("users")}
+    assert {"is_active", "reset_token", "trial_started_at", "trial_used_at"} <= columns
+    store_columns = {col["name"] for col in inspect(legacy_engine).get_columns("shopify_stores")}
+    assert {"shop_id", "charge_id", "is_installed"} <= store_columns
+    assert "event_month" in {col["name"] for col in inspect(legacy_engine).get_columns("usage_events")}
+
+    with legacy_engine.connect() as conn:
+        assert conn.execute(text("SELECT is_active FROM users WHERE id = 1")).scalar() == 1
+        assert conn.execute(text("SELECT count(*) FROM schema_version")).scalar() == 1
+
+
+def test_steady_state_is_one_query(legacy_engine):
+    migrations.migrate(legacy_engine)
+
+    statements = []
+    event.listen(legacy_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    assert migrations.migrate(legacy_engine) == migrations.LATEST_VERSION
+    assert statements == ["SELECT version FROM schema_version"]
+
+
+def test_resumes_from_recorded_version(legacy_engine):
+    migrations.migrate(legacy_engine)
+    with legacy_engine.begin() as conn:
+        conn.execute(text("UPDATE schema_version SET version = 2"))
+    assert migrations.migrate(legacy_engine) == migrations.LATEST_VERSION
+
+
+def test_lock_wait_is_bounded(monkeypatch):
+    class Busy:
+        """A connection whose advisory lock is always held elsewhere"""
+
+        def execute(self, statement):
+            return self
+
+        def scalar(self):
+            return False
+
+        def commit(self):
+            pass
+
+    monkeypatch.setattr(migrations, "MIGRATE_LOCK_POLL", 0.01)
+    with pytest.raises(TimeoutError):
+        migrations._acquire_lock(Busy(), timeout=0.05)
+
+
+def test_boot_hook_is_one_query_when_current(tmp_path):
+    from flask import Flask
+    from models import db
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'boot.db'}"
+    db.init_app(app)
+    with app.app_context():
+        migrations.migrate(db.engine)
+        statements = []
+        event.listen(db.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+    assert migrations.migrate_on_boot(app) == migrations.LATEST_VERSION
+    assert statements == ["SELECT version FROM schema_version"]
@@ -0,0 +1,109 @@
+"""
+Sliding-window rate limiting: window boundary, cost weighting, keying, headers, Redis failure.
+"""
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask, request, session
+
+import cache_utils
+import rate_limiter
+from rate_limiter import SlidingWindowLimiter, enforce_rate_limit, init_limiter, rate_limit_headers, rate_limit_key
+
+
+class FakeRedis:
+    """Runs the sliding-window script's logic over a dict (no Lua interpreter here)"""
+
+    def __init__(self):
+        self.store = {}
+        self.down = False
+
+    def register_script(self, source):
+        assert "INCRBY" in source
+
+        def script(keys, args):
+            if self.down:
+                raise ConnectionError("redis down")
+            cur, prev = (int(self.store.get(key, 0)) for key in keys)
+            budget, cost, weight = int(args[0]), int(args[1]), float(args[2])
+            if prev * weight + cur + cost > budget:
+                return [0, cur, prev]
+            self.store[keys[0]] = cur + cost
+            return [1, cur + cost, prev]
+
+        return script
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(cache_utils, "redis_client", fake)
+    return fake
+
+
+def test_previous_window_is_weighted_across_the_boundary(redis):
+    limiter = SlidingWindowLimiter(budget=10, window=100)
+    assert all(limiter.hit("ip:1", now=1000)[0] for _ in range(10))
+    allowed, remaining, retry_after = limiter.hit("ip:1", now=1000)
+    assert not allowed and remaining == 0 and retry_after > 0
+
+    # Halfway into the next window the old 10 still count as 5
+    assert [limiter.hit("ip:1", now=1150)[0] for _ in range(6)] == [True] * 5 + [False]
+    # Two windows on, the old window no longer counts
+    assert limiter.hit("ip:1", now=1300)[1] == 9
+    assert set(redis.store) == {"ratelimit:ip:1:10", "ratelimit:ip:1:11", "ratelimit:ip:1:13"}
+
+
+def test_heavy_routes_cost_more(redis):
+    assert rate_limiter.route_cost("/api/generate_report") == 20
+    assert rate_limiter.route_cost("/api/export/orders.csv") == 10
+    assert rate_limiter.route_cost("/dashboard") == 1
+
+    limiter = SlidingWindowLimiter(budget=25, window=100)
+    assert limiter.hit("shop:a", cost=20, now=1000) == (True, 5, 0)
+    assert not limiter.hit("shop:a", cost=20, now=1000)[0]
+    assert limiter.hit("shop:a", cost=1, now=1000)[0]
+
+
+def test_redis_error_falls_back_to_local_counters(redis):
+    redis.down = True
+    limiter = SlidingWindowLimiter(budget=2, window=100)
+    assert limiter.hit("ip:1", now=1000)[0]
+    assert limiter.hit("ip:1", now=1000)[0]
+    assert not limiter.hit("ip:1", now=1000)[0]  # Still bounded, per worker
+    assert redis.store == {}
+
+
+def test_keys_on_verified_shop_else_ip():
+    app = Flask(__name__)
+    app.secret_key = "test"
+    shop = SimpleNamespace(shop="a.myshopify.com")
+    with app.test_request_context("/", environ_base={"REMOTE_ADDR": "10.0.0.7"}):
+        assert rate_limit_key(shop) == "ip:10.0.0.7"  # Claimed, not verified
+        request.session_token_verified = True
+        assert rate_limit_key(shop) == "shop:a.myshopify.com"
+    with app.test_request_context("/", environ_base={"REMOTE_ADDR": "10.0.0.7"}):
+        session["shop_domain"] = "a.myshopify.com"
+        assert rate_limit_key(shop) == "shop:a.myshopify.com"
+        assert rate_limit_key(SimpleNamespace(shop="b.myshopify.com")) == "ip:10.0.0.7"
+
+
+def test_headers_and_429(redis):
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.config["RATE_LIMIT_BUDGET"] = 2
+    init_limiter(app)
+    app.before_request(lambda: enforce_rate_limit(None))
+    app.after_request(lambda response: rate_limit_headers(None, response))
+    app.add_url_rule("/dashboard", "dashboard", lambda: "ok")
+    client = app.test_client()
+
+    first = client.get("/dashboard")
+    assert first.headers["X-RateLimit-Limit"] == "2"
+    assert first.headers["X-RateLimit-Remaining"] == "1"
+    client.get("/dashboard")
+
+    limited = client.get("/dashboard")
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) >= 1
+    assert limited.headers["X-RateLimit-Remaining"] == "0"
@@ -0,0 +1,86 @@
+"""
+Redis sessions: sid rotation on login, per-request fallback when Redis fails.
+"""
+import pytest
+from flask import Flask, session
+
+from redis_session import RedisSession, RedisSessionInterface
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.down = False
+
+    def get(self, key):
+        if self.down:
+            raise ConnectionError("redis down")
+        return self.store.get(key)
+
+    def setex(self, key, ttl, value):
+        self.store[key] = value
+
+    def delete(self, key):
+        self.store.pop(key, None)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(RedisSessionInterface, "_redis", staticmethod(lambda: fake))
+    return fake
+
+
+@pytest.fixture
+def client(redis):
+    app = Flask(__name__)
+    app.secret_key = "test-secret"
+    app.session_interface = RedisSessionInterface(key_prefix="s:")
+
+    @app.route("/visit")
+    def visit():
+        session["cart"] = "x"
+        return "ok"
+
+    @app.route("/login")
+    def login():
+        session["_user_id"] = "7"
+        return "ok"
+
+    @app.route("/cart")
+    def cart():
+        return session.get("cart", "")
+
+    @app.route("/kind")
+    def kind():
+        return type(session._get_current_object()).__name__
+
+    return app.test_client()
+
+
+def test_login_rotates_session_id(client, redis):
+    client.get("/visit")
+    planted = set(redis.store)
+    assert len(planted) == 1
+
+    response = client.get("/login")
+    assert "Set-Cookie" in response.headers
+    assert set(redis.store).isdisjoint(planted)
+    assert len(redis.store) == 1
+
+
+def test_redis_error_falls_back_to_cookie_session(client, redis):
+    client.get("/visit")
+    redis.down = True
+    assert client.get("/kind").get_data(as_text=True) != RedisSession.__name__
+
+
+def test_unchanged_session_is_not_written(client, redis, monkeypatch):
+    client.get("/visit")
+    writes = []
+    monkeypatch.setattr(redis, "setex", lambda *args: writes.append(args))
+
+    response = client.get("/cart")
+    assert response.get_data(as_text=True) == "x"  # Existing session read from Redis
+    assert writes == []
+    assert "Set-Cookie" not in response.headers
@@ -0,0 +1,57 @@
+"""
+Sampled request events: deterministic per request_id, errors and slow always kept.
+"""
+import json
+import logging
+
+import pytest
+
+from core import request_log
+from logging_config import StructuredFormatter
+
+
+@pytest.fixture
+def rates(monkeypatch):
+    rates = request_log.parse_sample_rates("page=0.5,api=0,webhook=1")
+    monkeypatch.setattr(request_log, "SAMPLE_RATES", rates)
+    return rates
+
+
+def test_parse_sample_rates_merges_and_clamps():
+    rates = request_log.parse_sample_rates("page=0.2, api=7,bogus,webhook=x")
+    assert rates["page"] == 0.2
+    assert rates["api"] == 1.0
+    assert rates["webhook"] == request_log.DEFAULT_SAMPLE_RATES["webhook"]
+    assert rates["5xx"] == 1.0
+
+
+def test_sampling_is_deterministic_and_proportional(rates):
+    ids = [f"{i:08x}" for i in range(4000)]
+    kept = [i for i in ids if request_log.keep(i, 0.5)]
+    assert kept == [i for i in ids if request_log.keep(i, 0.5)]
+    assert 1700 < len(kept) < 2300
+
+
+def test_errors_and_slow_requests_always_kept(rates):
+    assert request_log.out_reason("api", "abc123", 200, 5) is None
+    assert request_log.out_reason("api", "abc123", 503, 5) == "5xx"
+    assert request_log.out_reason("api", "abc123", 404, 5) == "4xx"
+    assert request_log.out_reason("api", "abc123", 200, request_log.REQUEST_LOG_SLOW_MS) == "slow"
+    assert request_log.out_reason("webhook", "abc123", 200, 5) == "sampled"
+
+
+def test_hit_and_out_stay_paired(rates, caplog):
+    with caplog.at_level(logging.INFO, logger="missioncontrol.request"):
+        for i in range(200):
+            request_id = f"{i:08x}"
+            request_log.log_hit("page", request_id, "GET", "/dashboard", referer="https://x/?id_token=secret")
+            request_log.log_out("page", request_id, "GET", "/dashboard", 200, 12, shop="demo.myshopify.com")
+
+    hits = {r.request_id for r in caplog.records if r.event == "request.hit"}
+    outs = {r.request_id for r in caplog.records if r.event == "request.out"}
+    assert hits and hits == outs
+    assert all(r.referer == "https://x/" for r in caplog.records if r.event == "request.hit")
+
+    event = json.loads(StructuredFormatter().format(caplog.records[-1]))
+    assert event["message"] == "request.out"
+    assert event["extra"]["status"] == 200 and event["extra"]["shop"] == "demo.myshopify.com"
@@ -0,0 +1,37 @@
+"""
+SecurityFilter redaction: secrets, email pseudonyms and the no-op fast path.
+"""
+import logging
+
+import pytest
+
+from logging_config import SecurityFilter, _email_pseudonym
+
+
+def _filtered(message, *args):
+    record = logging.LogRecord("test", logging.INFO, __file__, 0, message, args or None, None)
+    SecurityFilter().filter(record)
+    return record
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("access_token=shpat_0123456789abcdef ok", "access_token=[REDACTED] ok"),
+    ('{"api_key": "sk_live_51Habcdefgh", "shop": "x"}', '{"api_key": "[REDACTED]", "shop": "x"}'),
+    ("login failed: Password=hunter22 for admin", "login failed: Password=[REDACTED] for admin"),
+    ("token=short ok", "token=short ok"),
+    ("Inventory sync finished: 348 products", "Inventory sync finished: 348 products"),
+])
+def test_redacts_secret_values(message, expected):
+    assert _filtered(message).msg == expected
+
+
+def test_pseudonymizes_emails_consistently():
+    msg = _filtered("Report sent to ops@example.com and ops@example.com").msg
+    pseudonym = _email_pseudonym("ops@example.com")
+    assert msg == f"Report sent to {pseudonym} and {pseudonym}"
+    assert pseudonym.startswith("user_") and "@" not in pseudonym
+
+
+def test_redacts_sensitive_args():
+    record = _filtered("header %s for %s", "Authorization: Bearer abc", "shop")
+    assert record.args == ("[REDACTED]", "shop")
@@ -0,0 +1,87 @@
+"""
+Session-token verification: per-request memo, exp-bounded LRU across requests.
+"""
+import time
+
+import jwt
+import pytest
+from flask import Flask, g
+
+import session_token_verification as stv
+
+SECRET = "shpss_test_secret"
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setenv("SHOPIFY_API_SECRET", SECRET)
+    monkeypatch.setenv("SHOPIFY_API_KEY", "api-key")
+    stv.reset_token_cache()
+
+    decodes = []
+    decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        decodes.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(jwt, "decode", counting_decode)
+    app = Flask(__name__)
+    app.decodes = decodes
+    yield app
+    stv.reset_token_cache()
+
+
+def _token(shop="demo.myshopify.com", exp_in=60, **claims):
+    now = int(time.time())
+    payload = {"dest": f"https://{shop}", "aud": "api-key", "exp": now + exp_in, "nbf": now - 5, **claims}
+    return jwt.encode(payload, SECRET, algorithm="HS256")
+
+
+def test_one_decode_per_request(app):
+    token = _token()
+    with app.test_request_context("/"):
+        first = stv.verify_shopify_token(token)
+        assert stv.verify_shopify_token(token) is first
+        assert g.jwt_payload is first
+
+    bad = _token(exp_in=-60)
+    with app.test_request_context("/"):
+        for _ in range(2):
+            with pytest.raises(jwt.ExpiredSignatureError):
+                stv.verify_shopify_token(bad)
+    assert app.decodes == [token, bad]
+
+
+def test_later_requests_reuse_the_verified_token_but_get_their_own_payload(app):
+    token = _token()
+    with app.test_request_context("/"):
+        stv.verify_shopify_token(token)["dest"] = "https://evil.myshopify.com"
+    with app.test_request_context("/"):
+        payload = stv.verify_shopify_token(token)
+
+    assert payload["dest"] == "https://demo.myshopify.com"
+    assert app.decodes == [token]
+
+
+def test_lru_is_bounded(app, monkeypatch):
+    monkeypatch.setattr(stv, "VERIFIED_TOKEN_CACHE_SIZE", 2)
+    tokens = [_token(shop=f"shop{i}.myshopify.com") for i in range(3)]
+    for token in tokens:
+        stv.verify_shopify_token(token)
+    stv.verify_shopify_token(tokens[2])
+    stv.verify_shopify_token(tokens[0])  # Evicted: decoded again
+
+    assert len(stv._verified_tokens) == 2
+    assert app.decodes == tokens + [tokens[0]]
+
+
+def test_expired_cached_token_is_rejected(app):
+    token = _token(exp_in=-1)
+    token_hash = stv.hashlib.sha256(token.encode("utf-8")).hexdigest()
+    # Cached while it was still valid
+    stv._verified_tokens[token_hash] = ({"dest": "https://demo.myshopify.com"}, time.time() - 1)
+
+    with pytest.raises(jwt.ExpiredSignatureError):
+        stv.verify_shopify_token(token)
+    assert token_hash not in stv._verified_tokens
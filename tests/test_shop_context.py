@@ -0,0 +1,117 @@
+"""
+Request-scoped shop context: seeded from the identity middleware, one per user per request.
+"""
+import pytest
+from flask import Flask, g
+from sqlalchemy import event
+
+import identity_cache
+from inventory import update_inventory_for
+from models import ShopifyStore, User, db
+from order_processing import process_orders_for
+from reporting import generate_inventory_report_for, generate_orders_report_for, generate_report_for
+from shop_context import get_shop_context
+
+NO_STORE = {"success": False, "error": "No store connected"}
+RECONNECT = {"success": False, "error": "Store connection expired. Please reconnect in Settings.", "action": "reconnect"}
+REPORTS = (process_orders_for, update_inventory_for, generate_report_for, generate_orders_report_for,
+           generate_inventory_report_for)
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'context.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        merchant = User(email="merchant@example.com", password_hash="x")
+        other = User(email="other@example.com", password_hash="x")
+        empty = User(email="empty@example.com", password_hash="x")
+        db.session.add_all([merchant, other, empty])
+        db.session.flush()
+        db.session.add_all([
+            ShopifyStore(user_id=merchant.id, shop_url="demo.myshopify.com", access_token="shpat_a"),
+            ShopifyStore(user_id=other.id, shop_url="other.myshopify.com", access_token="shpat_b"),
+        ])
+        db.session.commit()
+        app.users = {"merchant": merchant.id, "other": other.id, "empty": empty.id}
+
+        app.decrypts = []
+        monkeypatch.setattr(ShopifyStore, "get_access_token", lambda self: app.decrypts.append(self.shop_url) or "shpat_x")
+
+        app.store_queries = []
+
+        def record(conn, cursor, statement, *args):
+            if "FROM shopify_stores" in statement:
+                app.store_queries.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        yield app
+        event.remove(db.engine, "before_cursor_execute", record)
+
+
+def _store(user_id):
+    return ShopifyStore.query.filter_by(user_id=user_id).one()
+
+
+def test_seeded_from_current_store(app):
+    merchant = app.users["merchant"]
+    with app.test_request_context("/"):
+        g.current_store = _store(merchant)
+        app.store_queries.clear()
+
+        ctx = get_shop_context(merchant)
+        assert get_shop_context(str(merchant)) is ctx  # Same request, same context
+        assert ctx.store is g.current_store
+        assert ctx.access_token == ctx.access_token == "shpat_x"
+
+    assert app.store_queries == [] and app.decrypts == ["demo.myshopify.com"]
+
+
+def test_seeded_from_current_identity(app):
+    merchant = app.users["merchant"]
+    store = _store(merchant)
+    identity = identity_cache.ShopIdentity(identity_cache.identity_from_store(store, store.user))
+    identity.load_store()  # What the identity stage already loaded this request
+    app.store_queries.clear()
+
+    with app.test_request_context("/"):
+        g.current_identity = identity
+        ctx = get_shop_context(merchant)
+        assert ctx.store is store and ctx.shop_url == "demo.myshopify.com"
+        assert ctx.access_token == get_shop_context(merchant).access_token == "shpat_x"
+
+    assert app.store_queries == [] and app.decrypts == ["demo.myshopify.com"]
+
+
+def test_another_user_gets_a_fresh_context(app):
+    merchant, other = app.users["merchant"], app.users["other"]
+    with app.test_request_context("/"):
+        g.current_store = _store(merchant)
+        ctx = get_shop_context(merchant)
+        app.store_queries.clear()
+
+        other_ctx = get_shop_context(other)
+        assert other_ctx is not ctx and g.shop_context is other_ctx
+        assert other_ctx.shop_url == "other.myshopify.com"  # Looked up, not the seeded store
+        assert len(app.store_queries) == 1
+
+
+def test_no_context_is_shared_outside_a_request(app):
+    merchant = app.users["merchant"]
+    assert get_shop_context(merchant) is not get_shop_context(merchant)
+
+
+def test_reports_without_a_store(app):
+    with app.test_request_context("/"):
+        shop = get_shop_context(app.users["empty"])
+        assert [report(shop) for report in REPORTS] == [NO_STORE] * len(REPORTS)
+
+
+def test_reports_without_a_token(app, monkeypatch):
+    monkeypatch.setattr(ShopifyStore, "get_access_token", lambda self: app.decrypts.append(self.shop_url))
+    with app.test_request_context("/"):
+        shop = get_shop_context(app.users["merchant"])
+        assert [report(shop) for report in REPORTS] == [RECONNECT] * len(REPORTS)
+    assert app.decrypts == ["demo.myshopify.com"]  # Failed decrypt not retried per report
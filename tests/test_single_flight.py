@@ -0,0 +1,135 @@
+"""
+Single-flight coalescing tests - concurrent identical fetches share one call.
+"""
+import threading
+import time
+
+import pytest
+
+from core import single_flight as sf
+
+
+@pytest.fixture(autouse=True)
+def no_redis(monkeypatch):
+    monkeypatch.setattr(sf, "_get_redis", lambda: None)
+
+
+class TestSingleFlight:
+    def test_concurrent_callers_share_one_call(self):
+        flight = sf.SingleFlight()
+        calls = []
+        gate = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            gate.wait(1)
+            return ["product"]
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do("k", fetch)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        gate.set()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+        assert results == [["product"]] * 8
+
+    def test_leader_error_propagates_to_followers(self):
+        flight = sf.SingleFlight()
+        gate = threading.Event()
+
+        def fetch():
+            gate.wait(1)
+            raise RuntimeError("shopify down")
+
+        errors = []
+
+        def run():
+            try:
+                flight.do("k", fetch)
+            except RuntimeError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run) for _ in range(3)]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        gate.set()
+        for t in threads:
+            t.join()
+
+        assert len(errors) == 3
+
+    def test_sequential_calls_are_not_coalesced(self):
+        flight = sf.SingleFlight()
+        calls = []
+        flight.do("k", lambda: calls.append(1))
+        flight.do("k", lambda: calls.append(1))
+        assert len(calls) == 2
+
+    def test_decorator_keys_on_shop(self):
+        class Client:
+            def __init__(self, shop_url):
+                self.shop_url = shop_url
+
+            @sf.single_flight("get_products", group=sf.SingleFlight())
+            def get_products(self):
+                return self.shop_url
+
+        assert Client("a.myshopify.com").get_products() == "a.myshopify.com"
+        assert Client("b.myshopify.com").get_products() == "b.myshopify.com"
+
+    def test_decorator_coalesces_concurrent_calls_per_shop(self):
+        calls = []
+        gate = threading.Event()
+
+        class Client:
+            def __init__(self, shop_url):
+                self.shop_url = shop_url
+
+            @sf.single_flight("get_products", group=sf.SingleFlight())
+            def get_products(self):
+                calls.append(self.shop_url)
+                gate.wait(1)
+                return [self.shop_url]
+
+        results = []
+        shops = ["a.myshopify.com"] * 4 + ["b.myshopify.com"] * 4
+        threads = [
+            threading.Thread(target=lambda s=s: results.append(Client(s).get_products()))
+            for s in shops
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        gate.set()
+        for t in threads:
+            t.join()
+
+        assert sorted(calls) == ["a.myshopify.com", "b.myshopify.com"]
+        assert sorted(results) == [["a.myshopify.com"]] * 4 + [["b.myshopify.com"]] * 4
+
+
+class TestCacheResult:
+    def test_error_results_are_not_cached(self):
+        import performance
+
+        calls = []
+
+        @performance.cache_result(ttl=60)
+        def fetch(client, fail):
+            calls.append(fail)
+            return {"error": "shopify down"} if fail else ["product"]
+
+        performance.clear_cache()
+        assert fetch("ShopifyClient(a.myshopify.com)", True) == {"error": "shopify down"}
+        assert fetch("ShopifyClient(a.myshopify.com)", True) == {"error": "shopify down"}
+        assert fetch("ShopifyClient(a.myshopify.com)", False) == ["product"]
+        assert fetch("ShopifyClient(a.myshopify.com)", False) == ["product"]
+        assert calls == [True, True, False]
@@ -0,0 +1,55 @@
+"""
+SQL profiler: statement shapes, per-unit counts and N+1 flagging.
+"""
+import logging
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from core import sql_profile
+
+
+@pytest.fixture
+def engine():
+    sql_profile.install()
+    sql_profile.reset()
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE stores (id INTEGER PRIMARY KEY, user_id INTEGER)"))
+    yield engine
+    sql_profile.end()
+
+
+def test_shape_collapses_literals():
+    a, _ = sql_profile.statement_shape("SELECT * FROM stores WHERE id = 1 AND shop = 'a'")
+    b, _ = sql_profile.statement_shape("SELECT *  FROM stores\nWHERE id = 22 AND shop = 'b'")
+    c, _ = sql_profile.statement_shape("SELECT * FROM stores WHERE id IN (1, 2, 3)")
+    d, _ = sql_profile.statement_shape("SELECT * FROM stores WHERE id IN (4)")
+    assert a == b
+    assert c == d
+
+
+def test_counts_queries_and_flags_n_plus_one(engine, caplog):
+    sql_profile.begin("features.generate_report")
+    with engine.connect() as conn:
+        for user_id in range(sql_profile.N_PLUS_ONE_THRESHOLD):
+            conn.execute(text("SELECT id FROM stores WHERE user_id = :u"), {"u": user_id})
+        conn.execute(text("SELECT count(*) FROM stores"))
+
+    with caplog.at_level(logging.WARNING, logger="core.sql_profile"):
+        profile = sql_profile.end()
+
+    assert profile.count == sql_profile.N_PLUS_ONE_THRESHOLD + 1
+    assert len(profile.n_plus_one()) == 1
+    assert "N+1 suspect in features.generate_report" in caplog.text
+
+    row = sql_profile.snapshot()["labels"][0]
+    assert row["label"] == "features.generate_report"
+    assert row["n_plus_one_units"] == 1
+
+
+def test_no_unit_no_accounting(engine):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert sql_profile.current() is None
+    assert sql_profile.snapshot()["labels"] == []
@@ -0,0 +1,121 @@
+"""
+UsageEvent monthly partitions on Postgres: conversion of the plain table and
+rows stranded in DEFAULT. Runs against TEST_POSTGRES_URL in a throwaway
+schema; skipped when no Postgres is reachable.
+"""
+import os
+from datetime import datetime, timezone
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from models import ShopifyStore, User, db
+from usage_storage import (
+    DEFAULT_PARTITION,
+    USAGE_PARTITIONS_AHEAD,
+    add_months,
+    ensure_partitions,
+    ingest_usage_events,
+    is_partitioned,
+    month_start,
+    partition_name,
+    partition_usage_events,
+)
+
+pytestmark = pytest.mark.integration
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+@pytest.fixture
+def app():
+    if not POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL not set")
+    admin = create_engine(POSTGRES_URL)
+    schema = f"usage_partitions_{os.getpid()}"
+    try:
+        with admin.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+            conn.execute(text(f"CREATE SCHEMA {schema}"))
+    except Exception as e:
+        admin.dispose()
+        pytest.skip(f"Postgres unavailable: {e}")
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = POSTGRES_URL
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"connect_args": {"options": f"-csearch_path={schema}"}}
+    db.init_app(app)
+    try:
+        with app.app_context():
+            db.create_all(bind_key=None)
+            user = User(email="owner@example.com", password_hash="x")
+            db.session.add(user)
+            db.session.flush()
+            store = ShopifyStore(user_id=user.id, shop_url="demo.myshopify.com", access_token="shpat_a")
+            db.session.add(store)
+            db.session.commit()
+            app.store_id = store.id
+            yield app
+            db.session.remove()
+            db.engine.dispose()
+    finally:
+        with admin.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        admin.dispose()
+
+
+def _event(app, month, minute="011200", **extra):
+    key = f"report_generated:{app.store_id}:{month:%Y%m}{minute}"
+    return dict({"store_id": app.store_id, "event_type": "report_generated", "price": 0.5,
+                 "idempotency_key": key}, **extra)
+
+
+def _partitions_by_key():
+    # Own connection, closed at once: an open session transaction would block DETACH
+    with db.engine.connect() as conn:
+        return dict(conn.execute(text(
+            "SELECT idempotency_key, tableoid::regclass::text FROM usage_events"
+        )).all())
+
+
+def test_plain_table_is_converted_with_its_rows(app):
+    current = month_start()
+    last = add_months(current, -1)
+    old = _event(app, last, occurred_at=datetime(last.year, last.month, 1, 12, tzinfo=timezone.utc))
+    assert ingest_usage_events([old, _event(app, current)]) == 2
+
+    assert partition_usage_events(db.engine) is True
+    assert partition_usage_events(db.engine) is False  # Already partitioned
+    with db.engine.connect() as conn:
+        assert is_partitioned(conn)
+
+    assert _partitions_by_key() == {
+        old["idempotency_key"]: partition_name(last),
+        _event(app, current)["idempotency_key"]: partition_name(current),
+    }
+    # Keys stay unique and ids keep counting past the copied rows
+    assert ingest_usage_events([_event(app, current), _event(app, current, minute="011201")]) == 1
+    with db.engine.connect() as conn:
+        ids = conn.execute(text("SELECT id FROM usage_events ORDER BY id")).scalars().all()
+    assert len(ids) == 3 and len(set(ids)) == 3
+
+
+def test_rows_stranded_in_default_move_to_their_new_partition(app):
+    partition_usage_events(db.engine)
+    far = add_months(month_start(), USAGE_PARTITIONS_AHEAD + 3)
+    stranded = _event(app, far)["idempotency_key"]
+    assert ingest_usage_events([_event(app, far)]) == 1
+    assert _partitions_by_key()[stranded] == DEFAULT_PARTITION
+
+    assert partition_name(far) in ensure_partitions(db.engine)
+    assert _partitions_by_key()[stranded] == partition_name(far)
+    with db.engine.connect() as conn:
+        assert conn.execute(text(f"SELECT count(*) FROM {DEFAULT_PARTITION}")).scalar() == 0
+        # DEFAULT is attached again and still catches months with no partition
+        assert conn.execute(text(
+            "SELECT count(*) FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            f"WHERE c.relname = '{DEFAULT_PARTITION}' AND pg_table_is_visible(c.oid)"
+        )).scalar() == 1
+
+    assert ensure_partitions(db.engine).count(partition_name(far)) == 0  # Nothing stranded now
@@ -0,0 +1,92 @@
+"""
+UsageEvent storage on the SQLite fallback: bulk ingest, pending index, retention.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask import Flask
+from sqlalchemy import text
+
+from models import UsageEvent, db
+from usage_storage import add_months, drop_expired_usage, ensure_usage_storage, ingest_usage_events, month_start
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'usage.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        ensure_usage_storage(db.engine)
+        yield app
+
+
+def _event(key, **extra):
+    return dict({"store_id": 1, "event_type": "report_generated", "price": 0.5, "idempotency_key": key}, **extra)
+
+
+def test_bulk_ingest_skips_duplicate_keys(app):
+    assert ingest_usage_events([_event("a"), _event("b"), _event("a")]) == 2
+    assert ingest_usage_events([_event("b"), _event("c")]) == 1
+    assert db.session.query(UsageEvent).count() == 3
+    assert {e.event_month for e in UsageEvent.query} == {month_start()}
+
+
+def test_pending_scan_uses_partial_index(app):
+    plan = db.session.execute(text(
+        "EXPLAIN QUERY PLAN SELECT id FROM usage_events "
+        "WHERE reported_at IS NULL AND id > 0 ORDER BY id LIMIT 100"
+    )).all()
+    assert "idx_usage_events_pending" in " ".join(str(row) for row in plan)
+
+
+def test_retention_keeps_unreported_history(app):
+    old = datetime.now(timezone.utc).replace(day=1) - timedelta(days=40)
+    ingest_usage_events([
+        _event("old-reported", occurred_at=old),
+        _event("old-pending", occurred_at=old),
+        _event("recent"),
+    ])
+    db.session.execute(text("UPDATE usage_events SET reported_at = CURRENT_TIMESTAMP WHERE idempotency_key != 'old-pending'"))
+    db.session.commit()
+
+    assert drop_expired_usage(db.engine, retention_months=1) == 1
+    assert sorted(e.idempotency_key for e in UsageEvent.query) == ["old-pending", "recent"]
+
+
+def test_add_months_wraps_years():
+    assert add_months(month_start(datetime(2026, 11, 5)), 3) == month_start(datetime(2027, 2, 1))
+    assert add_months(month_start(datetime(2026, 1, 5)), -1) == month_start(datetime(2025, 12, 1))
+
+
+def test_event_month_follows_the_key_not_occurred_at(app):
+    key = "report_generated:1:202603311159"
+    assert ingest_usage_events([_event(key, occurred_at=datetime(2026, 3, 31, 11, 59))]) == 1
+    assert ingest_usage_events([_event(key, occurred_at=datetime(2026, 4, 1, 0, 1))]) == 0
+    assert ingest_usage_events([_event("no-stamp", occurred_at=datetime(2026, 3, 5))]) == 1
+    assert ingest_usage_events([_event("no-stamp", occurred_at=datetime(2026, 4, 5))]) == 0
+    assert [e.event_month for e in UsageEvent.query.filter_by(idempotency_key=key)] == [month_start(datetime(2026, 3, 1))]
+
+
+def test_record_usage_event_goes_through_bulk_ingest(app, monkeypatch):
+    import reporting
+    import usage_storage
+
+    batches = []
+    ingest = usage_storage.ingest_usage_events
+    monkeypatch.setattr(usage_storage, "ingest_usage_events", lambda events: batches.append(events) or ingest(events))
+    minute = datetime.utcnow().replace(second=0)
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return minute
+
+    monkeypatch.setattr(reporting, "datetime", FrozenDatetime)
+
+    assert reporting.record_usage_event(1, "report_generated", price=0.01) is True
+    assert reporting.record_usage_event(1, "report_generated", price=0.01) is False  # Same minute
+    assert len(batches) == 2 and db.session.query(UsageEvent).count() == 1
+    event = UsageEvent.query.one()
+    assert event.event_month == month_start() and event.idempotency_key.startswith("report_generated:1:")
@@ -0,0 +1,83 @@
+"""
+Readiness: /ready is 503 before and during warm-up, and while a required step has failed.
+"""
+import threading
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+from core import warmup
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("WARMUP", "on")
+    monkeypatch.setattr(warmup, "_state", {
+        "shared": None, "worker": None, "steps": {}, "pid": None,
+        "failed": {}, "retrying": False, "retried_at": 0.0,
+    })
+    for name in ("_prime_cipher", "_resolve_hosts", "_ping_redis", "warm_imports"):
+        monkeypatch.setattr(warmup, name, lambda: "ok")
+    monkeypatch.setattr(warmup, "_compile_templates", lambda app: 0)
+    monkeypatch.setattr(warmup, "_open_pool", lambda app: 2)
+
+    app = Flask(__name__)
+
+    @app.route("/ready")
+    def ready():
+        payload, status = warmup.readiness()
+        return jsonify(payload), status
+
+    return app.test_client()
+
+
+def _wait_for(predicate, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_ready_before_during_and_after_warmup(client, monkeypatch):
+    assert client.get("/ready").status_code == 503
+
+    gate = threading.Event()
+    monkeypatch.setattr(warmup, "_resolve_hosts", lambda: gate.wait(2))
+    thread = warmup.start_worker_warmup(client.application)
+    response = client.get("/ready")
+    assert response.status_code == 503 and response.get_json()["status"] == "warming"
+
+    gate.set()
+    thread.join(2)
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert set(response.get_json()["steps"]) == {"cipher", "templates", "imports", "dns", "db_pool", "redis"}
+
+
+def test_failed_required_step_keeps_503_until_a_retry_succeeds(client, monkeypatch):
+    monkeypatch.setattr(warmup, "WARMUP_RETRY_SECONDS", 0)
+    database = {"up": False}
+
+    def open_pool(app):
+        if not database["up"]:
+            raise ConnectionError("db down")
+        return 2
+
+    monkeypatch.setattr(warmup, "_open_pool", open_pool)
+    warmup.start_worker_warmup(client.application).join(2)
+    assert client.get("/ready").status_code == 503
+
+    database["up"] = True
+    assert _wait_for(lambda: client.get("/ready").status_code == 200)
+
+
+def test_optional_step_failure_does_not_block_readiness(client, monkeypatch):
+    def no_redis():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(warmup, "_ping_redis", no_redis)
+    warmup.start_worker_warmup(client.application).join(2)
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.get_json()["steps"]["redis"]["ok"] is False
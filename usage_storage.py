@@ -0,0 +1,342 @@
+"""
+UsageEvent storage - bulk ingest, monthly partitions and retention.
+
+Postgres: usage_events is declaratively partitioned by RANGE (event_month),
+one usage_events_YYYY_MM partition per month plus a DEFAULT catch-all.
+Idempotency keys stay unique because event_month is derived from the
+timestamp embedded in the key (see key_month), never from the caller's
+occurred_at, so a retried key always lands in the same event_month
+(UNIQUE (key, month)). Keys without a timestamp are checked against the
+stored keys before insert.
+SQLite (dev/tests): a plain table with the same columns.
+
+Pending rows are reached through a partial index on id WHERE reported_at
+IS NULL, so the billing worker's scan grows with the backlog, not history.
+Retention drops whole monthly partitions (or deletes reported rows on the
+plain table) and never touches a month that still has unreported events.
+"""
+
+import logging
+import os
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+USAGE_RETENTION_MONTHS = int(os.getenv("USAGE_RETENTION_MONTHS", "13"))  # Months of usage history kept
+USAGE_PARTITIONS_AHEAD = 2  # Future monthly partitions kept ready
+USAGE_INGEST_BATCH = 1000  # Rows per executemany batch
+PARTITION_PREFIX = "usage_events_"
+PENDING_INDEX_DDL = "CREATE INDEX IF NOT EXISTS idx_usage_events_pending ON usage_events (id) WHERE reported_at IS NULL"
+
+_PARTITION_LOCK = "SELECT pg_advisory_xact_lock(hashtext('usage_events_partitioning'))"
+
+
+def month_start(value=None):
+    """First day of value's month (now, UTC, by default)"""
+    value = value or datetime.now(timezone.utc)
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def key_month(idempotency_key):
+    """Month of the trailing YYYYMMDDHHMM stamp in an idempotency key, or None"""
+    stamp = str(idempotency_key).rsplit(":", 1)[-1]
+    if len(stamp) < 6 or not stamp[:6].isdigit():
+        return None
+    try:
+        return date(int(stamp[:4]), int(stamp[4:6]), 1)
+    except ValueError:
+        return None
+
+
+def partition_name(month):
+    return f"{PARTITION_PREFIX}{month:%Y_%m}"
+
+
+@contextmanager
+def _transaction(bind):
+    """A connection in a transaction: the caller's, or a new one on an engine"""
+    if isinstance(bind, Connection):
+        yield bind
+    else:
+        with bind.begin() as conn:
+            yield conn
+
+
+def _is_postgres(conn):
+    return conn.dialect.name == "postgresql"
+
+
+def is_partitioned(conn):
+    if not _is_postgres(conn):
+        return False
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = 'usage_events' AND pg_table_is_visible(c.oid)"
+    )).first() is not None
+
+
+# Bulk ingest -----------------------------------------------------------------
+
+def _ingest_row(event, now):
+    occurred_at = event.get("occurred_at") or now
+    return {
+        "store_id": event["store_id"],
+        "event_type": event["event_type"],
+        "description": event.get("description"),
+        "price": event.get("price", 0.0),
+        "idempotency_key": event["idempotency_key"],
+        "event_month": key_month(event["idempotency_key"]) or month_start(occurred_at),
+        "created_at": occurred_at,
+        "updated_at": now,
+    }
+
+
+def _without_stored_unstamped_keys(rows):
+    """
+    Keys with no embedded month can't rely on UNIQUE (key, month) - the same
+    key could arrive with occurred_at in another month - so look them up.
+    """
+    from models import UsageEvent, db
+
+    unstamped = {row["idempotency_key"] for row in rows if key_month(row["idempotency_key"]) is None}
+    if not unstamped:
+        return rows
+    stored = set(db.session.execute(
+        db.select(UsageEvent.idempotency_key).where(UsageEvent.idempotency_key.in_(unstamped))
+    ).scalars())
+    return [row for row in rows if row["idempotency_key"] not in stored]
+
+
+def ingest_usage_events(events, batch_size=USAGE_INGEST_BATCH):
+    """
+    Insert many usage events with batched executemany; events whose
+    idempotency_key is already stored are skipped. Each event is a dict with
+    store_id, event_type, idempotency_key and optional description, price,
+    occurred_at. Returns the number of rows inserted.
+    """
+    from models import UsageEvent, db
+
+    now = datetime.now(timezone.utc)
+    rows = [_ingest_row(event, now) for event in events]
+    if not rows:
+        return 0
+
+    table = UsageEvent.__table__
+    rows = _without_stored_unstamped_keys(rows)
+    if not rows:
+        return 0
+    dialect = db.session.get_bind(mapper=UsageEvent).dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+
+    inserted = 0
+    try:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            if insert is None:
+                db.session.execute(table.insert(), batch)
+                inserted += len(batch)
+                continue
+            stmt = insert(table).on_conflict_do_nothing().returning(table.c.id)
+            inserted += len(db.session.execute(stmt, batch).all())
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    logger.info(f"📈 [METER] Ingested {inserted}/{len(rows)} usage events")
+    return inserted
+
+
+# Partitions ------------------------------------------------------------------
+
+DEFAULT_PARTITION = f"{PARTITION_PREFIX}default"
+
+
+def _create_partition(conn, month):
+    """
+    Create month's partition. Rows that already landed in the DEFAULT
+    partition for that month (maintenance fell behind) block a plain CREATE,
+    so DEFAULT is detached, the rows moved into the new partition, and
+    DEFAULT re-attached - all in the caller's transaction.
+    """
+    name = partition_name(month)
+    if conn.execute(text(f"SELECT to_regclass('{name}')")).scalar() is not None:
+        return name
+    bounds = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    in_month = f"event_month >= '{month.isoformat()}' AND event_month < '{add_months(month, 1).isoformat()}'"
+    has_default = conn.execute(text(f"SELECT to_regclass('{DEFAULT_PARTITION}')")).scalar() is not None
+    stranded = has_default and conn.execute(
+        text(f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_month} LIMIT 1")
+    ).first() is not None
+
+    if not stranded:
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF usage_events FOR VALUES {bounds}"))
+        return name
+
+    conn.execute(text(f"ALTER TABLE usage_events DETACH PARTITION {DEFAULT_PARTITION}"))
+    conn.execute(text(f"CREATE TABLE {name} PARTITION OF usage_events FOR VALUES {bounds}"))
+    moved = conn.execute(text(f"INSERT INTO usage_events SELECT * FROM {DEFAULT_PARTITION} WHERE {in_month}")).rowcount
+    conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_month}"))
+    conn.execute(text(f"ALTER TABLE usage_events ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    logger.warning(f"TITAN [USAGE] Moved {moved} usage events from {DEFAULT_PARTITION} into {name}")
+    return name
+
+
+def ensure_partitions(bind, months_ahead=USAGE_PARTITIONS_AHEAD):
+    """
+    Create this month's and the next months' partitions, plus a partition for
+    any month stranded in DEFAULT; [] when not partitioned. Takes the
+    partitioning advisory lock, probes each month with to_regclass and scans
+    DEFAULT, so it runs from scheduled maintenance, never at boot.
+    """
+    with _transaction(bind) as conn:
+        if not is_partitioned(conn):
+            return []
+        conn.execute(text(_PARTITION_LOCK))
+        current = month_start()
+        months = {add_months(current, i) for i in range(months_ahead + 1)}
+        if conn.execute(text(f"SELECT to_regclass('{DEFAULT_PARTITION}')")).scalar() is not None:
+            months.update(conn.execute(text(f"SELECT DISTINCT event_month FROM {DEFAULT_PARTITION}")).scalars())
+        return [_create_partition(conn, month) for month in sorted(months)]
+
+
+def partition_usage_events(bind):
+    """
+    One-time Postgres conversion of a plain usage_events table into monthly
+    partitions, in a single transaction under an advisory lock. Existing
+    rows are copied with event_month taken from created_at. Returns True
+    when the table was converted.
+    """
+    with _transaction(bind) as conn:
+        if not _is_postgres(conn):
+            return False
+        conn.execute(text(_PARTITION_LOCK))
+        if is_partitioned(conn):
+            return False
+
+        first = conn.execute(text("SELECT min(created_at) FROM usage_events")).scalar()
+        max_id = conn.execute(text("SELECT coalesce(max(id), 0) FROM usage_events")).scalar()
+
+        conn.execute(text("ALTER TABLE usage_events RENAME TO usage_events_legacy"))
+        conn.execute(text("CREATE SEQUENCE IF NOT EXISTS usage_events_part_id_seq"))
+        conn.execute(text(f"SELECT setval('usage_events_part_id_seq', {int(max_id) + 1}, false)"))
+        conn.execute(text("""
+            CREATE TABLE usage_events (
+                id INTEGER NOT NULL DEFAULT nextval('usage_events_part_id_seq'),
+                store_id INTEGER NOT NULL REFERENCES shopify_stores (id) ON DELETE CASCADE,
+                event_type VARCHAR(50) NOT NULL,
+                description VARCHAR(255),
+                price NUMERIC(10, 2) NOT NULL,
+                idempotency_key VARCHAR(100) NOT NULL,
+                shopify_usage_record_id BIGINT,
+                reported_at TIMESTAMP WITH TIME ZONE,
+                event_month DATE NOT NULL,
+                created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+                updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+                CONSTRAINT usage_events_part_pkey PRIMARY KEY (id, event_month),
+                CONSTRAINT usage_events_part_idempotency_key UNIQUE (idempotency_key, event_month)
+            ) PARTITION BY RANGE (event_month)
+        """))
+        conn.execute(text("ALTER SEQUENCE usage_events_part_id_seq OWNED BY usage_events.id"))
+
+        month = month_start(first) if first else month_start()
+        last = add_months(month_start(), USAGE_PARTITIONS_AHEAD)
+        while month <= last:
+            _create_partition(conn, month)
+            month = add_months(month, 1)
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF usage_events DEFAULT"))
+
+        conn.execute(text("""
+            INSERT INTO usage_events (id, store_id, event_type, description, price, idempotency_key,
+                                      shopify_usage_record_id, reported_at, event_month, created_at, updated_at)
+            SELECT id, store_id, event_type, description, price, idempotency_key,
+                   shopify_usage_record_id, reported_at, date_trunc('month', created_at)::date, created_at, updated_at
+            FROM usage_events_legacy
+        """))
+        conn.execute(text("DROP TABLE usage_events_legacy"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_usage_events_store_id ON usage_events (store_id)"))
+        conn.execute(text(PENDING_INDEX_DDL))
+
+    logger.info("TITAN [USAGE] usage_events converted to monthly partitions")
+    return True
+
+
+def ensure_usage_storage(bind):
+    """Migration step: partial pending index, partitions on Postgres"""
+    with _transaction(bind) as conn:
+        if not is_partitioned(conn):
+            month_of = "date_trunc('month', created_at)::date" if _is_postgres(conn) else "date(created_at, 'start of month')"
+            conn.execute(text(f"UPDATE usage_events SET event_month = {month_of} WHERE event_month IS NULL"))
+        conn.execute(text(PENDING_INDEX_DDL))
+        partition_usage_events(conn)
+        ensure_partitions(conn)
+
+
+# Retention -------------------------------------------------------------------
+
+def _monthly_partitions(conn):
+    """[(month, partition name)] of the usage_events partitions, oldest first"""
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'usage_events'"
+    )).scalars()
+    partitions = []
+    for name in names:
+        try:
+            stamp = datetime.strptime(name[len(PARTITION_PREFIX):], "%Y_%m")
+        except ValueError:
+            continue  # The DEFAULT partition
+        partitions.append((date(stamp.year, stamp.month, 1), name))
+    return sorted(partitions)
+
+
+def drop_expired_usage(bind, retention_months=USAGE_RETENTION_MONTHS):
+    """
+    Drop usage history older than retention_months. Months that still
+    hold unreported (billable) events are kept. Returns what was removed:
+    partition names on Postgres, a deleted row count on the plain table.
+    """
+    cutoff = add_months(month_start(), -retention_months)
+    with _transaction(bind) as conn:
+        if not is_partitioned(conn):
+            deleted = conn.execute(text(
+                "DELETE FROM usage_events WHERE created_at < :cutoff AND reported_at IS NOT NULL"
+            ), {"cutoff": datetime(cutoff.year, cutoff.month, 1)}).rowcount
+            if deleted:
+                logger.info(f"TITAN [USAGE] Retention deleted {deleted} usage events before {cutoff}")
+            return deleted
+
+        conn.execute(text(_PARTITION_LOCK))
+        dropped = []
+        for month, name in _monthly_partitions(conn):
+            if month >= cutoff:
+                break
+            if conn.execute(text(f"SELECT 1 FROM {name} WHERE reported_at IS NULL LIMIT 1")).first():
+                logger.warning(f"TITAN [USAGE] Keeping {name}: it still has unreported events")
+                continue
+            conn.execute(text(f"ALTER TABLE usage_events DETACH PARTITION {name}"))
+            conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    if dropped:
+        logger.info(f"TITAN [USAGE] Retention dropped partitions {', '.join(dropped)}")
+    return dropped
+
+
+def run_usage_maintenance(bind):
+    """Daily job (cron endpoint / beat task): upcoming partitions, then retention"""
+    return {"partitions": ensure_partitions(bind), "dropped": drop_expired_usage(bind)}
@@ -17,9 +17,18 @@ app.conf.update(
     # We set a slightly lower limit to be safe for a single worker
     task_annotations={
         '*': {'rate_limit': '2/s'}
-    }
+    },
+    beat_schedule={
+        # Next months' usage partitions + drop history past USAGE_RETENTION_MONTHS.
+        # Only where celery beat runs; the web deploy hits /cron/usage-maintenance.
+        'usage-retention': {'task': 'worker.prune_usage_events', 'schedule': 24 * 3600},
+    },
 )
 
+# Query count / DB time / N+1 suspects per task (core/sql_profile.py)
+from core.sql_profile import install_celery_hooks
+install_celery_hooks()
+
 @app.task(bind=True, max_retries=5, default_retry_delay=300)
 def shopify_api_call(self, shop_domain, action, params=None):
     """
@@ -30,10 +39,11 @@ def shopify_api_call(self, shop_domain, action, params=None):
     
     try:
         store = ShopifyStore.query.filter_by(shop_url=shop_domain).first()
-        if not store or not store.access_token:
+        access_token = store.get_access_token() if store else None
+        if not access_token:
             return {"error": "Store or token missing", "shop": shop_domain}
             
-        client = ShopifyClient(shop_domain, store.access_token)
+        client = ShopifyClient(shop_domain, access_token)
         
         # Example action: sync_inventory
         if action == "sync_inventory":
@@ -121,16 +131,97 @@ def handle_subscription_update(self, shop_domain, data):
             print(f"Worker Error (sub update): {e}")
             raise self.retry(exc=e)
 
+@app.task(bind=True, max_retries=3)
+def rehome_store(self, shop_domain, user_id):
+    """
+    Async re-home for the cctv watchdog: move a store to the session's user.
+    Runs off the request path so page loads never commit ownership changes.
+    """
+    from models import db, ShopifyStore
+    from app_factory import create_app
+    
+    flask_app = create_app()
+    with flask_app.app_context():
+        try:
+            store = ShopifyStore.query.filter_by(shop_url=shop_domain).first()
+            if not store or store.user_id == user_id:
+                return
+            old_id = store.user_id
+            store.user_id = user_id # The Hijack
+            db.session.commit() # identity cache entry is dropped on commit
+            print(f"Worker: CCTV re-homed {shop_domain} from User {old_id} to User {user_id}.")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Worker Error (rehome): {e}")
+            raise self.retry(exc=e)
+
+# Usage sync pipeline tuning
+USAGE_SYNC_WINDOW = 2000          # pending events pulled per keyset window
+USAGE_SYNC_YIELD_PER = 500        # rows per DB fetch while streaming a window
+USAGE_SYNC_MAX_STORES = 8         # stores synced concurrently
+USAGE_SYNC_SHOP_INTERVAL = 0.5    # min seconds between requests to one shop
+
+
+def _sync_store_usage(shop_url, access_token, events):
+    """
+    Push one store's pending events (plain dicts) to Shopify.
+    Runs in a pool thread: HTTP only, no DB access.
+    Returns {event id: usage record GID}.
+    """
+    import requests
+    from billing_metered import (
+        USAGE_RECORDS_PER_REQUEST,
+        get_subscription_line_item_id_cached,
+        sync_usage_events_batch,
+    )
+
+    line_item_id = get_subscription_line_item_id_cached(shop_url, access_token)
+    if not line_item_id:
+        return None
+
+    synced = {}
+    last_request = 0.0
+    with requests.Session() as http:
+        for start in range(0, len(events), USAGE_RECORDS_PER_REQUEST):
+            # Per-shop throttle: one request in flight, spaced out
+            wait = USAGE_SYNC_SHOP_INTERVAL - (time.monotonic() - last_request)
+            if wait > 0:
+                time.sleep(wait)
+            last_request = time.monotonic()
+            synced.update(sync_usage_events_batch(
+                shop_url, access_token, line_item_id,
+                events[start:start + USAGE_RECORDS_PER_REQUEST], session=http
+            ))
+    return synced
+
+
+def _usage_record_id(record_id):
+    """Shopify GIDs are strings, the model column is BigInteger"""
+    try:
+        if isinstance(record_id, str) and "/" in record_id:
+            return int(record_id.split("/")[-1])
+        return int(record_id)
+    except (ValueError, TypeError):
+        return None
+
+
 @app.task(bind=True, max_retries=5)
 def sync_usage_to_shopify(self):
     """
     PASSIVE REVENUE SYNC
     Batch and sync pending UsageEvents to Shopify.
     Scheduled to run every hour or triggered by high usage.
+
+    Pipeline: stream pending events in keyset windows (yield_per), fan the
+    stores of each window out to a thread pool (one throttled lane per shop,
+    several usage records per aliased mutation), then write reported_at for
+    the whole window in one bulk UPDATE.
     """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    from sqlalchemy import update
     from models import db, UsageEvent, ShopifyStore
     from app_factory import create_app
-    from billing_metered import sync_usage_event_to_shopify, get_subscription_line_item_id
+    from billing_metered import invalidate_subscription_line_item
     from datetime import datetime
     import logging
     
@@ -138,58 +229,93 @@ def sync_usage_to_shopify(self):
     flask_app = create_app()
     with flask_app.app_context():
         try:
-            # 1. Fetch pending events
-            pending_events = UsageEvent.query.filter(UsageEvent.reported_at == None).all()
-            if not pending_events:
-                return {"status": "no_pending_events"}
-            
-            # 2. Group by store for efficiency
-            store_events = {}
-            for event in pending_events:
-                if event.store_id not in store_events:
-                    store_events[event.store_id] = []
-                store_events[event.store_id].append(event)
-            
             synced_count = 0
-            for store_id, events in store_events.items():
-                store = ShopifyStore.query.get(store_id)
-                if not store:
-                    continue
-                
-                access_token = store.get_access_token()
-                if not access_token:
-                    continue
-                
-                # 3. Get line item ID
-                # In a high-scale app, we would cache this in Redis for 24h
-                line_item_id = get_subscription_line_item_id(store.shop_url, access_token)
-                if not line_item_id:
-                    logger.warning(f"No metered subscription line item found for {store.shop_url}")
-                    continue
-                
-                for event in events:
-                    record_id = sync_usage_event_to_shopify(
-                        store.shop_url, 
-                        access_token, 
-                        line_item_id, 
-                        event
+            skipped_stores = set()
+            last_id = 0
+
+            with ThreadPoolExecutor(max_workers=USAGE_SYNC_MAX_STORES) as pool:
+                while True:
+                    # 1. Stream the next window of pending events as plain rows
+                    rows = (
+                        db.session.query(
+                            UsageEvent.id,
+                            UsageEvent.store_id,
+                            UsageEvent.event_type,
+                            UsageEvent.description,
+                            UsageEvent.price,
+                            UsageEvent.idempotency_key,
+                        )
+                        .filter(UsageEvent.reported_at == None, UsageEvent.id > last_id)
+                        .order_by(UsageEvent.id)
+                        .limit(USAGE_SYNC_WINDOW)
+                        .execution_options(yield_per=USAGE_SYNC_YIELD_PER)
                     )
-                    if record_id:
-                        # Extract record_id from GID if necessary, but we can store the whole GID
-                        # Shopify GIDs are strings, so cast if model expects int (it does)
+
+                    store_events = {}
+                    window_size = 0
+                    for row in rows:
+                        window_size += 1
+                        last_id = row.id
+                        if row.store_id in skipped_stores:
+                            continue
+                        store_events.setdefault(row.store_id, []).append({
+                            "id": row.id,
+                            "event_type": row.event_type,
+                            "description": row.description,
+                            "price": row.price,
+                            "idempotency_key": row.idempotency_key,
+                        })
+
+                    if window_size == 0:
+                        break
+
+                    # 2. One store lookup for the whole window
+                    stores = ShopifyStore.query.filter(ShopifyStore.id.in_(list(store_events))).all()
+                    futures = {}
+                    for store in stores:
+                        access_token = store.get_access_token()
+                        if not access_token:
+                            skipped_stores.add(store.id)
+                            continue
+                        future = pool.submit(_sync_store_usage, store.shop_url, access_token, store_events[store.id])
+                        futures[future] = store
+                    skipped_stores.update(set(store_events) - {store.id for store in stores})
+
+                    # 3. Collect results and mark the window reported in bulk
+                    reported_at = datetime.utcnow()
+                    updates = []
+                    for future in as_completed(futures):
+                        store = futures[future]
                         try:
-                            if isinstance(record_id, str) and "/" in record_id:
-                                event.shopify_usage_record_id = int(record_id.split("/")[-1])
-                            else:
-                                event.shopify_usage_record_id = int(record_id)
-                        except (ValueError, TypeError):
-                            # If we can't parse it as int, we'll just mark it reported without the ID
-                            pass
-                            
-                        event.reported_at = datetime.utcnow()
-                        synced_count += 1
-            
-            db.session.commit()
+                            synced = future.result()
+                        except Exception as e:
+                            logger.error(f"❌ [WORKER] Usage sync failed for {store.shop_url}: {e}")
+                            continue
+                        if synced is None:
+                            logger.warning(f"No metered subscription line item found for {store.shop_url}")
+                            skipped_stores.add(store.id)
+                            continue
+                        if len(synced) < len(store_events[store.id]):
+                            # Rejected records may mean a stale line item - refetch next run
+                            invalidate_subscription_line_item(store.shop_url)
+                        for event_id, record_id in synced.items():
+                            updates.append({
+                                "id": event_id,
+                                "reported_at": reported_at,
+                                "shopify_usage_record_id": _usage_record_id(record_id),
+                            })
+
+                    if updates:
+                        db.session.execute(update(UsageEvent), updates)
+                        db.session.commit()
+                        synced_count += len(updates)
+
+                    if window_size < USAGE_SYNC_WINDOW:
+                        break
+
+            if not synced_count and not last_id:
+                return {"status": "no_pending_events"}
+
             logger.info(f"✅ [WORKER] Synced {synced_count} usage events to Shopify.")
             return {"status": "success", "synced": synced_count}
             
@@ -198,6 +324,27 @@ def sync_usage_to_shopify(self):
             logger.error(f"❌ [WORKER] Usage Sync Failed: {e}", exc_info=True)
             raise self.retry(exc=e, countdown=600) # Retry in 10 minutes
 
+@app.task(bind=True, max_retries=3)
+def prune_usage_events(self):
+    """
+    USAGE RETENTION
+    Keep the next monthly partitions ready and drop usage history older
+    than USAGE_RETENTION_MONTHS (months with unreported events are kept).
+    """
+    from models import db
+    from app_factory import create_app
+    from usage_storage import run_usage_maintenance
+    import logging
+
+    logger = logging.getLogger(__name__)
+    flask_app = create_app()
+    with flask_app.app_context():
+        try:
+            return dict(run_usage_maintenance(db.engine), status="success")
+        except Exception as e:
+            logger.error(f"❌ [WORKER] Usage retention failed: {e}", exc_info=True)
+            raise self.retry(exc=e, countdown=3600)
+
 @app.task(bind=True, max_retries=3)
 def handle_order_created(self, shop_domain, order_data):
     """